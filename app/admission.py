@@ -0,0 +1,319 @@
+# ---------------------------------------------------
+# app/admission.py
+# ---------------------------------------------------
+"""
+Admission control: priority classes, a concurrency limit and rate limits.
+
+At dinner rush, menu browsing from customer devices can queue in front of
+the kitchen's status updates and new orders. AdmissionMiddleware puts
+every request in a priority class before it reaches a handler:
+
+- critical: placing orders and moving them through the kitchen
+  (POST /orders/, POST /orders/batch, PUT /orders/{id}/status);
+- low: menu browsing, analytics and order exports;
+- normal: everything else;
+- exempt: /metrics, the kitchen event stream and the API docs, which hold
+  no database connection.
+
+At most ADMISSION_CONCURRENCY requests run at once (by default two per CPU
+and at least 8, up to the connection pool size), ADMISSION_RESERVED of them
+only for critical requests. A request holds its slot until its response
+starts: a streamed response, like the order export, does not hold one
+while it streams. When the slots are all busy, the next free one goes to
+the highest class waiting, first come first served within it.
+Overload is shed rather than queued:
+
+- a low-priority request arriving while the oldest waiter has queued for
+  more than ADMISSION_TARGET_MS gets 503 at once, without waiting;
+- a request that waits longer than its class allows gets 503;
+- each client (scope["client"], so run uvicorn with --proxy-headers behind
+  a proxy) has a token bucket of RATE_LIMIT_PER_SECOND requests, bursting
+  to RATE_LIMIT_BURST, for low and normal requests; past it, 429.
+
+Critical requests are never rate-limited or shed on arrival, only after
+waiting ADMISSION_MAX_WAIT_SECONDS. Shed responses carry Retry-After.
+"""
+import asyncio
+import json
+import math
+import os
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Dict, NamedTuple, Optional, Tuple
+
+import app.metrics as metrics
+from app.database import DB_MAX_OVERFLOW, DB_POOL_SIZE
+
+# Requests running at once (0 disables the limit). Past a couple per core
+# they only time-slice the CPU, and past the pool size they wait for a
+# connection anyway; but at least 8, as most of a request's time is spent
+# waiting on the database, and small hosts still need several slots left
+# over once the critical ones are reserved.
+ADMISSION_CONCURRENCY = int(os.getenv(
+    "ADMISSION_CONCURRENCY", str(min(max(8, 2 * (os.cpu_count() or 1)), DB_POOL_SIZE + DB_MAX_OVERFLOW))
+))
+# Of those, slots only critical requests may take
+ADMISSION_RESERVED = int(os.getenv("ADMISSION_RESERVED", str(max(1, ADMISSION_CONCURRENCY // 4))))
+# Queueing delay past which low-priority requests are shed on arrival
+ADMISSION_TARGET = float(os.getenv("ADMISSION_TARGET_MS", "100")) / 1000
+ADMISSION_MAX_WAIT = float(os.getenv("ADMISSION_MAX_WAIT_SECONDS", "30"))
+# Per-client token bucket for low and normal requests (0 disables)
+RATE_LIMIT_PER_SECOND = float(os.getenv("RATE_LIMIT_PER_SECOND", "20"))
+RATE_LIMIT_BURST = float(os.getenv("RATE_LIMIT_BURST", "40"))
+
+CRITICAL, NORMAL, LOW = "critical", "normal", "low"
+EXEMPT = None
+PRIORITIES = (CRITICAL, NORMAL, LOW)  # highest first
+
+
+class Policy(NamedTuple):
+    max_wait: float  # seconds in the queue before 503
+    shed_after: Optional[float]  # queueing delay that sheds arrivals at once (None: never)
+    rate_limited: bool
+
+
+POLICIES = {
+    CRITICAL: Policy(ADMISSION_MAX_WAIT, None, False),
+    NORMAL: Policy(5.0, None, True),
+    LOW: Policy(1.0, ADMISSION_TARGET, True),
+}
+
+# (class, methods, path pattern); the first match wins, NORMAL otherwise
+ROUTE_CLASSES = [
+    (EXEMPT, {"GET", "HEAD"}, r"/metrics|/orders/stream|/docs.*|/redoc|/openapi\.json"),
+    (CRITICAL, {"POST"}, r"/orders/(batch)?"),
+    (CRITICAL, {"PUT"}, r"/orders/\d+/status"),
+    (LOW, {"GET", "HEAD"}, r"/menu(/.*)?|/analytics/.*|/orders/export"),
+]
+_ROUTE_CLASSES = [(priority, methods, re.compile(pattern)) for priority, methods, pattern in ROUTE_CLASSES]
+
+
+def classify(method: str, path: str) -> Optional[str]:
+    """Priority class of a request, or EXEMPT."""
+    for priority, methods, pattern in _ROUTE_CLASSES:
+        if method in methods and pattern.fullmatch(path):
+            return priority
+    return NORMAL
+
+
+class Rejected(Exception):
+    """Raised when a request is shed; becomes a 503 or 429 response."""
+
+    def __init__(self, status_code: int, reason: str, retry_after: float):
+        self.status_code = status_code
+        self.reason = reason
+        self.retry_after = retry_after
+        super().__init__(reason)
+
+
+# ---------------------------------------------------
+# Concurrency limit
+# ---------------------------------------------------
+class _Waiter:
+    __slots__ = ("loop", "future", "since", "granted")
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.future = loop.create_future()
+        self.since = time.monotonic()
+        self.granted = False
+
+
+class PriorityGate:
+    """
+    Up to ``limit`` holders at once, ``reserved`` of the slots for critical
+    requests only, so an order never waits for a read to finish. A released
+    slot goes to the oldest waiter of the highest class that may take it.
+    Waiters on any event loop are woken thread-safely.
+    """
+
+    def __init__(self, limit: int = ADMISSION_CONCURRENCY, reserved: int = None):
+        self.limit = limit
+        self.reserved = ADMISSION_RESERVED if reserved is None else reserved
+        self._held = dict.fromkeys(PRIORITIES, 0)
+        self._queues: Dict[str, Deque[_Waiter]] = {priority: deque() for priority in PRIORITIES}
+        self._lock = threading.Lock()
+
+    @property
+    def active(self) -> int:
+        return sum(self._held.values())
+
+    def queued(self, priority: str) -> int:
+        return len(self._queues[priority])
+
+    def queue_delay(self) -> float:
+        """How long the oldest queued request has waited, in seconds."""
+        with self._lock:
+            return self._queue_delay(time.monotonic())
+
+    def _queue_delay(self, now: float) -> float:
+        oldest = [queue[0].since for queue in self._queues.values() if queue]
+        return now - min(oldest) if oldest else 0.0
+
+    def _fits(self, priority: str) -> bool:
+        active = self.active
+        if priority == CRITICAL:
+            return active < self.limit
+        return active < self.limit and active - self._held[CRITICAL] < max(1, self.limit - self.reserved)
+
+    async def acquire(self, priority: str, policy: Policy) -> float:
+        """
+        Wait for a slot and return the seconds spent queued.
+        Raises Rejected when the request is shed instead.
+        """
+        if self.limit <= 0:
+            return 0.0
+        with self._lock:
+            ahead = any(self._queues[p] for p in PRIORITIES[:PRIORITIES.index(priority) + 1])
+            if self._fits(priority) and not ahead:
+                self._held[priority] += 1
+                return 0.0
+            delay = self._queue_delay(time.monotonic())
+            if policy.shed_after is not None and delay > policy.shed_after:
+                raise Rejected(503, "overloaded", 1)
+            waiter = _Waiter(asyncio.get_running_loop())
+            self._queues[priority].append(waiter)
+
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), policy.max_wait)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as exc:
+            with self._lock:
+                granted = waiter.granted
+                if not granted:
+                    self._queues[priority].remove(waiter)
+            if isinstance(exc, asyncio.CancelledError):
+                if granted:
+                    self.release(priority)
+                raise
+            if not granted:
+                raise Rejected(503, "queue_timeout", 1) from None
+        return time.monotonic() - waiter.since
+
+    def release(self, priority: str) -> None:
+        if self.limit <= 0:
+            return
+        with self._lock:
+            self._held[priority] -= 1
+            for candidate in PRIORITIES:
+                queue = self._queues[candidate]
+                while queue and self._fits(candidate):
+                    waiter = queue.popleft()
+                    try:
+                        waiter.loop.call_soon_threadsafe(_wake, waiter.future)
+                    except RuntimeError:
+                        continue  # its loop is gone
+                    self._held[candidate] += 1
+                    waiter.granted = True
+                    return
+
+
+def _wake(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+# ---------------------------------------------------
+# Rate limits
+# ---------------------------------------------------
+class RateLimiter:
+    """Token buckets by client, the least recently used dropped past ``max_clients``."""
+
+    def __init__(self, rate: float = RATE_LIMIT_PER_SECOND, burst: float = RATE_LIMIT_BURST,
+                 max_clients: int = 10_000):
+        self.rate = rate
+        self.burst = max(burst, 1.0)
+        self.max_clients = max_clients
+        # client -> (tokens, monotonic time of the last update)
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, client: str) -> float:
+        """Spend a token of ``client``'s bucket: 0 if there was one, else seconds until there is."""
+        if self.rate <= 0:
+            return 0.0
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(client, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            wait = 0.0 if tokens >= 1 else (1 - tokens) / self.rate
+            self._buckets[client] = (tokens - 1 if tokens >= 1 else tokens, now)
+            while len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        return wait
+
+    def clear(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+
+
+# ---------------------------------------------------
+# ASGI middleware
+# ---------------------------------------------------
+class AdmissionMiddleware:
+    """Admits, queues or sheds each HTTP request by its priority class (pure ASGI, like MetricsMiddleware)."""
+
+    def __init__(self, app, gate: PriorityGate = None, limiter: RateLimiter = None):
+        self.app = app
+        self.gate = gate if gate is not None else admission_gate
+        self.limiter = limiter if limiter is not None else rate_limiter
+
+    async def __call__(self, scope, receive, send):
+        priority = classify(scope["method"], scope["path"]) if scope["type"] == "http" else EXEMPT
+        if priority is EXEMPT:
+            await self.app(scope, receive, send)
+            return
+
+        policy = POLICIES[priority]
+        try:
+            if policy.rate_limited:
+                client = (scope.get("client") or ("unknown",))[0]
+                wait = self.limiter.take(client)
+                if wait:
+                    raise Rejected(429, "rate_limited", wait)
+            waited = await self.gate.acquire(priority, policy)
+        except Rejected as exc:
+            metrics.admission_shed.inc(priority=priority, reason=exc.reason)
+            await _reject(send, exc)
+            return
+
+        metrics.admission_wait.observe(waited, priority=priority)
+        held = True
+
+        def release():
+            nonlocal held
+            if held:
+                held = False
+                self.gate.release(priority)
+
+        async def send_and_release(message):
+            await send(message)
+            # the slot covers producing the response, not streaming it out
+            # (GET /orders/export runs for minutes)
+            if message["type"] == "http.response.start":
+                release()
+
+        try:
+            await self.app(scope, receive, send_and_release)
+        finally:
+            release()
+
+
+async def _reject(send, exc: Rejected) -> None:
+    detail = "Too many requests" if exc.status_code == 429 else "Server busy, try again shortly"
+    body = json.dumps({"detail": detail}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": exc.status_code,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(max(1, math.ceil(exc.retry_after))).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+admission_gate = PriorityGate()
+rate_limiter = RateLimiter()
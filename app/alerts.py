@@ -0,0 +1,290 @@
+# ---------------------------------------------------
+# app/alerts.py
+# ---------------------------------------------------
+"""
+Background delivery of staff alerts (new orders, low stock) to a chat bot.
+
+The dispatcher subscribes to ``order.created`` and ``inventory.low_stock``
+on the event bus; each event only puts an entry on an asyncio queue, so the
+HTTP response never waits for delivery. A single worker task drains the queue, coalesces
+bursts into one message, loads every order in the burst with one joined
+query, and sends it with retries, backoff and a minimum interval between
+messages to stay inside Telegram's rate limits.
+
+The bot is any object with a ``send_message(chat_id, text, parse_mode)``
+method, sync or async, so tests can use a local stub.
+"""
+import asyncio
+import inspect
+import logging
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.database import DEFAULT_BRANCH, branch_session
+from app.events import Event
+from app.models import MenuItem, Order, OrderItem
+
+logger = logging.getLogger(__name__)
+
+# Telegram rejects messages longer than this many characters
+MAX_MESSAGE_LENGTH = 4096
+
+
+@dataclass
+class OrderSummary:
+    id: int
+    customer_name: Optional[str]
+    table_number: Optional[int]
+    # (item name, quantity) per order line
+    lines: List[Tuple[str, int]] = field(default_factory=list)
+    total: Optional[float] = None
+
+
+def fetch_order_summaries(db: Session, order_ids: Iterable[int]) -> List[OrderSummary]:
+    """Load orders, their lines and menu names in one joined query."""
+    stmt = (
+        select(
+            Order.id,
+            Order.customer_name,
+            Order.table_number,
+            Order.total,
+            OrderItem.menu_item_id,
+            OrderItem.quantity,
+            MenuItem.name,
+        )
+        .outerjoin(OrderItem, OrderItem.order_id == Order.id)
+        .outerjoin(MenuItem, MenuItem.id == OrderItem.menu_item_id)
+        .where(Order.id.in_(list(order_ids)))
+        .order_by(Order.id, OrderItem.id)
+    )
+    summaries: Dict[int, OrderSummary] = {}
+    for order_id, customer_name, table_number, total, menu_item_id, quantity, name in db.execute(stmt):
+        summary = summaries.get(order_id)
+        if summary is None:
+            summary = summaries[order_id] = OrderSummary(order_id, customer_name, table_number, total=total)
+        if menu_item_id is not None:
+            summary.lines.append((name or f"[Unknown Item ID {menu_item_id}]", quantity))
+    return list(summaries.values())
+
+
+def format_order_alert(summary: OrderSummary) -> str:
+    """Render one order as a Markdown alert."""
+    lines = [
+        f"📣 *New Order Alert!* Order #{summary.id}",
+        f"👤 Customer: {summary.customer_name or 'Guest'}",
+        f"🍽️ Table: {summary.table_number or 'N/A'}",
+        "🧾 Items:",
+    ]
+    lines.extend(f"- {name} x {quantity}" for name, quantity in summary.lines)
+    if summary.total is not None:
+        lines.append(f"💰 Total: {summary.total:,.2f}")
+    return "\n".join(lines)
+
+
+def format_low_stock_alert(item: Dict[str, Any]) -> str:
+    """Render a low-stock crossing as a Markdown alert."""
+    return (
+        f"⚠️ *Low Stock!* {item['name']}: {item['quantity']:g} {item['unit']} left "
+        f"(threshold {item['threshold']:g})"
+    )
+
+
+def split_messages(blocks: Iterable[str], limit: int = MAX_MESSAGE_LENGTH) -> List[str]:
+    """Pack alert blocks into as few messages as fit under ``limit``."""
+    messages: List[str] = []
+    current = ""
+    for block in blocks:
+        block = block[:limit]
+        candidate = f"{current}\n\n{block}" if current else block
+        if len(candidate) > limit:
+            messages.append(current)
+            candidate = block
+        current = candidate
+    if current:
+        messages.append(current)
+    return messages
+
+
+class AlertDispatcher:
+    """Queue + background worker that batches staff alerts to one chat."""
+
+    def __init__(
+        self,
+        bot,
+        chat_id: int,
+        # None: load each order from its branch's database
+        session_factory: Optional[Callable[[], Session]] = None,
+        coalesce_window: float = 0.5,   # seconds to wait for more orders in a burst
+        max_batch: int = 20,            # alerts per burst at most
+        min_interval: float = 1.0,      # seconds between messages (rate limit)
+        max_retries: int = 5,
+        backoff: float = 1.0,           # first retry delay, doubled each attempt
+        max_queue: int = 10000,
+    ):
+        self.bot = bot
+        self.chat_id = chat_id
+        self.session_factory = session_factory
+        self.coalesce_window = coalesce_window
+        self.max_batch = max_batch
+        self.min_interval = min_interval
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_queue = max_queue
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+        self._last_sent = 0.0
+
+    def start(self) -> None:
+        """Start the worker on the running event loop."""
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(self.max_queue)
+        self._task = self._loop.create_task(self._run(), name="alert-dispatcher")
+
+    async def stop(self, timeout: float = 5.0) -> None:
+        """Flush queued alerts (up to ``timeout`` seconds) and stop the worker."""
+        if self._task is None:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Dropping %d queued alerts on shutdown", self._queue.qsize())
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def enqueue(self, order_id: int, branch_id: int = DEFAULT_BRANCH) -> None:
+        """Queue a new-order alert; safe to call from the loop or from worker threads."""
+        self._submit(("order", (branch_id, order_id)))
+
+    def enqueue_low_stock(self, item: Dict[str, Any]) -> None:
+        """Queue a low-stock alert (an ``inventory.low_stock`` event payload)."""
+        self._submit(("low_stock", item))
+
+    def _submit(self, alert: Tuple[str, Any]) -> None:
+        if self._loop is None:
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            self._put(alert)
+        else:
+            self._loop.call_soon_threadsafe(self._put, alert)
+
+    def _put(self, alert: Tuple[str, Any]) -> None:
+        try:
+            self._queue.put_nowait(alert)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            logger.warning("Alert queue full, dropping %s alert", alert[0])
+
+    async def _next_batch(self) -> List[Tuple[str, Any]]:
+        """Block for one alert, then gather the rest of the burst."""
+        batch = [await self._queue.get()]
+        deadline = self._loop.time() + self.coalesce_window
+        while len(batch) < self.max_batch:
+            remaining = deadline - self._loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    def _load(self, orders: List[Tuple[int, int]]) -> List[OrderSummary]:
+        """Summaries of (branch_id, order_id) pairs, one query per branch."""
+        by_branch: Dict[int, List[int]] = {}
+        for branch_id, order_id in orders:
+            by_branch.setdefault(branch_id, []).append(order_id)
+        summaries = []
+        for branch_id, order_ids in by_branch.items():
+            db = self.session_factory() if self.session_factory is not None else branch_session(branch_id)
+            try:
+                summaries += fetch_order_summaries(db, order_ids)
+            finally:
+                db.close()
+        return summaries
+
+    async def _run(self) -> None:
+        while True:
+            batch = await self._next_batch()
+            try:
+                orders = list(dict.fromkeys(value for kind, value in batch if kind == "order"))
+                # one alert per ingredient per burst, with its latest figures
+                low_stock = {value["inventory_item_id"]: value for kind, value in batch if kind == "low_stock"}
+                blocks = [format_low_stock_alert(item) for item in low_stock.values()]
+                if orders:
+                    summaries = await asyncio.to_thread(self._load, orders)
+                    blocks.extend(format_order_alert(s) for s in summaries)
+                for text in split_messages(blocks):
+                    await self._send(text)
+            except Exception:
+                logger.exception("Failed to deliver %d alerts", len(batch))
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _send(self, text: str) -> None:
+        for attempt in range(self.max_retries + 1):
+            wait = self._last_sent + self.min_interval - self._loop.time()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            try:
+                await self._call_bot(text)
+            except Exception as exc:
+                self._last_sent = self._loop.time()
+                if attempt == self.max_retries:
+                    self.failed += 1
+                    logger.error("Giving up on alert after %d attempts: %s", attempt + 1, exc)
+                    return
+                # telegram.error.RetryAfter tells us exactly how long to back off
+                delay = getattr(exc, "retry_after", None)
+                if isinstance(delay, timedelta):
+                    delay = delay.total_seconds()
+                delay = float(delay or self.backoff * 2 ** attempt)
+                logger.warning("Alert send failed (%s), retrying in %.1fs", exc, delay)
+                await asyncio.sleep(delay)
+            else:
+                self._last_sent = self._loop.time()
+                self.sent += 1
+                return
+
+    async def _call_bot(self, text: str) -> None:
+        send = self.bot.send_message
+        kwargs = dict(chat_id=self.chat_id, text=text, parse_mode="Markdown")
+        if inspect.iscoroutinefunction(send):
+            await send(**kwargs)
+        else:
+            # blocking client (e.g. python-telegram-bot < 20): keep it off the loop
+            result = await asyncio.to_thread(send, **kwargs)
+            if inspect.isawaitable(result):
+                await result
+
+
+# Set by app.main on startup when a bot is configured
+dispatcher: Optional[AlertDispatcher] = None
+
+
+def notify_order_created(event: Event) -> None:
+    """Event-bus subscriber for ``order.created``; a no-op when alerts are not configured."""
+    if dispatcher is not None:
+        dispatcher.enqueue(event.data["id"], event.data.get("branch_id", DEFAULT_BRANCH))
+
+
+def notify_low_stock(event: Event) -> None:
+    """Event-bus subscriber for ``inventory.low_stock``; a no-op when alerts are not configured."""
+    if dispatcher is not None:
+        dispatcher.enqueue_low_stock(event.data)
@@ -0,0 +1,189 @@
+# ---------------------------------------------------
+# app/analytics.py
+# ---------------------------------------------------
+"""
+Sales rollups behind the /analytics endpoints.
+
+create_orders adds every order to an hourly and a daily bucket in
+sales_rollups (units and revenue per menu item) and ticket_rollups (orders
+and revenue) inside the transaction that stores it, so dashboard queries
+read pre-summed rows and cost the same however long the history is.
+Ranges are answered from whole days where possible and hours at the edges.
+
+rebuild() recomputes both tables from the raw orders, e.g. after upgrading
+a database that already holds orders:
+
+    python -m app.analytics rebuild
+"""
+import argparse
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, delete, func, insert, literal, or_, select, union_all
+from sqlalchemy.orm import Session
+
+import app.models as models
+from app.database import upsert_insert
+
+HOUR = "hour"
+DAY = "day"
+PERIODS = (HOUR, DAY)
+
+
+def hour_start(ts: datetime) -> datetime:
+    return ts.replace(minute=0, second=0, microsecond=0)
+
+
+def day_start(ts: datetime) -> datetime:
+    return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def bucket_start(period: str, ts: datetime) -> datetime:
+    return hour_start(ts) if period == HOUR else day_start(ts)
+
+
+# ---------------------------------------------------
+# Incremental maintenance
+# ---------------------------------------------------
+def _upsert_add(db: Session, table, rows: List[Dict], keys: List[str], sums: List[str]) -> None:
+    """INSERT rows, adding ``sums`` onto any existing row with the same key."""
+    if not rows:
+        return
+    stmt = upsert_insert(db, table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=keys,
+        set_={column: table.c[column] + stmt.excluded[column] for column in sums},
+    )
+    db.execute(stmt, rows)
+
+
+def record_orders(db: Session, orders: List[models.Order]) -> None:
+    """
+    Add freshly flushed orders (lines attached, totals set) to their
+    branch's rollups, in the caller's transaction.
+    """
+    sales: Dict[Tuple[int, str, datetime, int], List] = defaultdict(lambda: [0, 0.0])
+    tickets: Dict[Tuple[int, str, datetime], List] = defaultdict(lambda: [0, 0.0])
+    for db_order in orders:
+        buckets = [(db_order.branch_id, period, bucket_start(period, db_order.timestamp)) for period in PERIODS]
+        for line in db_order.items:
+            for branch_id, period, bucket in buckets:
+                row = sales[(branch_id, period, bucket, line.menu_item_id)]
+                row[0] += line.quantity
+                row[1] += line.quantity * line.unit_price
+        for key in buckets:
+            row = tickets[key]
+            row[0] += 1
+            row[1] += db_order.total
+
+    _upsert_add(
+        db, models.SalesRollup.__table__,
+        [{"branch_id": br, "period": p, "bucket": b, "menu_item_id": m, "quantity": q, "revenue": r}
+         for (br, p, b, m), (q, r) in sales.items()],
+        ["branch_id", "period", "bucket", "menu_item_id"], ["quantity", "revenue"],
+    )
+    _upsert_add(
+        db, models.TicketRollup.__table__,
+        [{"branch_id": br, "period": p, "bucket": b, "orders": n, "revenue": r}
+         for (br, p, b), (n, r) in tickets.items()],
+        ["branch_id", "period", "bucket"], ["orders", "revenue"],
+    )
+
+
+def _bucket_sql(dialect: str, period: str, column):
+    """SQL expression truncating ``column`` to the start of its hour/day."""
+    if dialect == "postgresql":
+        return func.date_trunc(period, column)
+    # SQLite stores DateTime as text in this exact format; match it so
+    # rebuilt buckets compare equal to the ones record_orders writes
+    fmt = "%Y-%m-%d %H:00:00.000000" if period == HOUR else "%Y-%m-%d 00:00:00.000000"
+    return func.strftime(fmt, column)
+
+
+def rebuild(db: Session) -> Dict[str, int]:
+    """
+    Recompute both rollup tables, per branch, from live and archived
+    orders. Takes a session without a branch (it rebuilds them all).
+    Returns row counts.
+    """
+    dialect = db.get_bind().dialect.name
+    # lines are archived together with their order, so each tier joins within itself
+    lines = union_all(*(
+        select(order.branch_id, order.timestamp, line.menu_item_id, line.quantity, line.unit_price)
+        .join(order, order.id == line.order_id)
+        for order, line in ((models.Order, models.OrderItem), (models.OrderArchive, models.OrderItemArchive))
+    )).subquery()
+    orders = union_all(*(
+        select(order.branch_id, order.timestamp, order.total) for order in (models.Order, models.OrderArchive)
+    )).subquery()
+
+    db.execute(delete(models.SalesRollup))
+    db.execute(delete(models.TicketRollup))
+    for period in PERIODS:
+        bucket = _bucket_sql(dialect, period, lines.c.timestamp).label("bucket")
+        db.execute(insert(models.SalesRollup).from_select(
+            ["branch_id", "period", "bucket", "menu_item_id", "quantity", "revenue"],
+            select(lines.c.branch_id, literal(period), bucket, lines.c.menu_item_id, func.sum(lines.c.quantity),
+                   func.sum(lines.c.quantity * lines.c.unit_price))
+            .group_by(lines.c.branch_id, bucket, lines.c.menu_item_id),
+        ))
+        bucket = _bucket_sql(dialect, period, orders.c.timestamp).label("bucket")
+        db.execute(insert(models.TicketRollup).from_select(
+            ["branch_id", "period", "bucket", "orders", "revenue"],
+            select(orders.c.branch_id, literal(period), bucket, func.count(), func.sum(orders.c.total))
+            .group_by(orders.c.branch_id, bucket),
+        ))
+    db.commit()
+    return {
+        "sales_rollups": db.query(models.SalesRollup).count(),
+        "ticket_rollups": db.query(models.TicketRollup).count(),
+    }
+
+
+# ---------------------------------------------------
+# Range selection
+# ---------------------------------------------------
+def rollup_filter(rollup, since: Optional[datetime], until: Optional[datetime]):
+    """
+    WHERE clause selecting the buckets that cover [since, until): whole days
+    from the daily rows, the partial days at either end from the hourly
+    rows. Bounds are rounded down to the hour.
+    """
+    since = hour_start(since) if since is not None else None
+    until = hour_start(until) if until is not None else None
+    first_day = None
+    if since is not None:
+        first_day = day_start(since) if since == day_start(since) else day_start(since) + timedelta(days=1)
+    last_day = day_start(until) if until is not None else None
+
+    if first_day is not None and last_day is not None and first_day >= last_day:
+        return and_(rollup.period == HOUR, rollup.bucket >= since, rollup.bucket < until)
+
+    days = [rollup.period == DAY]
+    hours = []
+    if since is not None:
+        days.append(rollup.bucket >= first_day)
+        hours.append(and_(rollup.bucket >= since, rollup.bucket < first_day))
+    if until is not None:
+        days.append(rollup.bucket < last_day)
+        hours.append(and_(rollup.bucket >= last_day, rollup.bucket < until))
+    if not hours:
+        return and_(*days)
+    return or_(and_(*days), and_(rollup.period == HOUR, or_(*hours)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain the sales rollup tables.")
+    parser.add_argument("command", choices=["rebuild"])
+    parser.parse_args()
+
+    from app.database import Base, shards
+    for shard in shards():
+        Base.metadata.create_all(bind=shard.engine)
+        with shard.session() as db:
+            print(f"rebuilt {rebuild(db)}")
+
+
+if __name__ == "__main__":
+    main()
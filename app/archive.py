@@ -0,0 +1,158 @@
+# ---------------------------------------------------
+# app/archive.py
+# ---------------------------------------------------
+"""
+Move finished orders out of the hot tables.
+
+orders and order_items only ever grow; every index over them gets deeper
+and every live query pays for the history. This job moves Served and
+Cancelled orders older than ARCHIVE_AFTER_DAYS, with their lines, into
+orders_archive / order_items_archive:
+
+- in batches, each one short transaction (copy, then delete), so writers
+  are never locked out for long and an interruption loses nothing;
+- branch by branch and status by status, oldest first, each batch a
+  range of the (branch_id, status, timestamp, id) index, so orders that
+  are still active are never read;
+- recording the run's cutoff and progress in archive_progress, so an
+  interrupted run resumes with the same cutoff.
+
+orders and order_items use AUTOINCREMENT on SQLite, so the IDs of archived
+orders and lines are never handed out again.
+
+The archive tables live in the same database rather than an attached
+SQLite file: in WAL mode a transaction spanning two files is not atomic,
+and a crash between copy and delete could lose or duplicate orders.
+
+crud.get_order falls back to the archive, and analytics.rebuild reads
+both, so archived orders stay visible where history matters.
+
+    python -m app.archive --older-than-days 365 --batch-size 1000
+"""
+import argparse
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Iterator, Optional
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session
+
+import app.models as models
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_AFTER_DAYS = float(os.getenv("ARCHIVE_AFTER_DAYS", "365"))
+# Orders moved per transaction
+BATCH_SIZE = 1000
+JOB = "orders"
+# Statuses an order can no longer leave
+TERMINAL_STATUSES = tuple(status for status, following in models.ORDER_TRANSITIONS.items() if not following)
+
+
+def _copy(db: Session, source, target, where) -> None:
+    columns = [column.name for column in target.__table__.columns]
+    db.execute(insert(target).from_select(columns, select(*(source.__table__.c[name] for name in columns)).where(where)))
+
+
+def _branches(db: Session) -> Iterator[int]:
+    """Branches with live orders, each found by one seek on the branch-led indexes."""
+    branch_id = models.Order.branch_id
+    branch = db.scalar(select(func.min(branch_id)))
+    while branch is not None:
+        yield branch
+        branch = db.scalar(select(func.min(branch_id)).where(branch_id > branch))
+
+
+def archive_batch(
+    db: Session, progress: models.ArchiveProgress, branch_id: int, status: str, batch_size: int = BATCH_SIZE
+) -> int:
+    """
+    Move up to ``batch_size`` of a branch's oldest orders in a terminal
+    ``status`` in one transaction. Returns how many moved.
+    """
+    order, line = models.Order, models.OrderItem
+    # walks ix_orders_status_timestamp_id (branch_id, status, timestamp, id)
+    # from the oldest: active orders, however old, are outside the range
+    batch = db.execute(
+        select(order.id, order.timestamp)
+        .where(order.branch_id == branch_id, order.status == status, order.timestamp < progress.cutoff)
+        .order_by(order.timestamp, order.id)
+        .limit(batch_size)
+    ).all()
+    if not batch:
+        return 0
+    ids = [order_id for order_id, _ in batch]
+
+    _copy(db, order, models.OrderArchive, order.id.in_(ids))
+    _copy(db, line, models.OrderItemArchive, line.order_id.in_(ids))
+    db.execute(delete(line).where(line.order_id.in_(ids)))
+    db.execute(delete(order).where(order.id.in_(ids)))
+    progress.archived += len(ids)
+    progress.last_order_id, progress.last_timestamp = ids[-1], batch[-1][1]
+    db.commit()
+    return len(ids)
+
+
+def archive_orders(
+    session_factory: Callable[[], Session],
+    older_than: timedelta = timedelta(days=ARCHIVE_AFTER_DAYS),
+    batch_size: int = BATCH_SIZE,
+    pause: float = 0.0,
+    max_batches: Optional[int] = None,
+) -> models.ArchiveProgress:
+    """
+    Archive finished orders placed more than ``older_than`` ago, resuming an
+    unfinished run if there is one. ``pause`` seconds between batches leave
+    room for live writers; ``max_batches`` stops early (the run stays open).
+    """
+    with session_factory() as db:
+        progress = db.get(models.ArchiveProgress, JOB)
+        if progress is not None and progress.finished_at is None:
+            logger.info("Resuming archive run started %s (cutoff %s, %d archived)",
+                        progress.started_at, progress.cutoff, progress.archived)
+        else:
+            if progress is not None:
+                db.delete(progress)
+                db.flush()
+            progress = models.ArchiveProgress(job=JOB, cutoff=datetime.utcnow() - older_than, archived=0)
+            db.add(progress)
+            db.commit()
+
+        batches = 0
+        ranges = [(branch, status) for branch in list(_branches(db)) for status in TERMINAL_STATUSES]
+        for branch, status in ranges:
+            moved = batch_size
+            while moved == batch_size:
+                if max_batches is not None and batches == max_batches:
+                    break
+                moved = archive_batch(db, progress, branch, status, batch_size)
+                batches += 1
+                if pause and moved == batch_size:
+                    time.sleep(pause)
+            if moved == batch_size:
+                break  # stopped early
+        else:
+            progress.finished_at = datetime.utcnow()
+            db.commit()
+        logger.info("Archived %d orders placed before %s", progress.archived, progress.cutoff)
+        return progress
+
+
+def main():
+    from app.database import shards
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--older-than-days", type=float, default=ARCHIVE_AFTER_DAYS)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--pause", type=float, default=0.05, help="seconds between batches")
+    args = parser.parse_args()
+
+    logging.basicConfig(level="INFO")
+    for shard in shards():
+        archive_orders(shard.session, timedelta(days=args.older_than_days), args.batch_size, args.pause)
+
+
+if __name__ == "__main__":
+    main()
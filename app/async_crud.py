@@ -0,0 +1,245 @@
+"""
+Awaitable counterparts of the functions in app.crud.
+
+Each function runs the matching crud function either on an AsyncSession
+(through ``AsyncSession.run_sync``, so I/O goes through the async driver and
+never blocks the event loop) or, in DB_MODE=sync, on a blocking Session in
+the threadpool. app.crud stays the single place where queries are written.
+"""
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+import app.crud as crud
+import app.models as models
+import app.schemas as schemas
+from app.database import DbSession
+
+
+async def run(db: DbSession, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """Call a sync crud function with the session, without blocking the loop."""
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(fn, *args, **kwargs)
+    return await run_in_threadpool(fn, db, *args, **kwargs)
+
+# --------------------
+# MENU CRUD
+# --------------------
+
+async def get_menu_items(
+    db: DbSession, skip: int = 0, limit: int = 100, after: Optional[int] = None
+) -> List[models.MenuItem]:
+    """Retrieve a page of menu items in ID order."""
+    return await run(db, crud.get_menu_items, skip=skip, limit=limit, after=after)
+
+
+async def get_menu_item_rows(
+    db: DbSession, skip: int = 0, limit: int = 100, after: Optional[int] = None
+) -> List[Dict]:
+    """A page of menu items as projected rows."""
+    return await run(db, crud.get_menu_item_rows, skip=skip, limit=limit, after=after)
+
+
+async def get_menu_version(db: DbSession) -> int:
+    """Latest menu change version of the session's branch."""
+    return await run(db, crud.get_menu_version)
+
+
+async def get_menu_changes(db: DbSession, since: int = 0, limit: int = 500) -> Dict:
+    """Menu items written or deleted after change version ``since``."""
+    return await run(db, crud.get_menu_changes, since=since, limit=limit)
+
+
+async def get_menu_item(db: DbSession, item_id: int) -> models.MenuItem:
+    """Retrieve a single menu item by ID."""
+    return await run(db, crud.get_menu_item, item_id)
+
+
+async def search_menu_items(
+    db: DbSession, q: str, category: Optional[str] = None, available: Optional[bool] = None, limit: int = 20
+) -> List[models.MenuItem]:
+    """Search menu items, best match first."""
+    return await run(db, crud.search_menu_items, q, category=category, available=available, limit=limit)
+
+
+async def create_menu_item(db: DbSession, item: schemas.MenuItemCreate) -> models.MenuItem:
+    """Create a new menu item from a schema."""
+    return await run(db, crud.create_menu_item, item)
+
+
+async def update_menu_item(db: DbSession, item_id: int, item: schemas.MenuItemCreate) -> models.MenuItem:
+    """Update an existing menu item."""
+    return await run(db, crud.update_menu_item, item_id, item)
+
+
+async def upsert_menu_items(db: DbSession, items: List[schemas.MenuItemCreate]) -> Tuple[int, int]:
+    """Create or update menu items matched by name."""
+    return await run(db, crud.upsert_menu_items, items)
+
+
+async def delete_menu_item(db: DbSession, item_id: int) -> bool:
+    """Delete a menu item by ID."""
+    return await run(db, crud.delete_menu_item, item_id)
+
+# --------------------
+# RECIPE CRUD
+# --------------------
+
+async def get_recipe(db: DbSession, menu_item_id: int) -> List[models.RecipeItem]:
+    """Retrieve the recipe lines of a menu item."""
+    return await run(db, crud.get_recipe, menu_item_id)
+
+
+async def set_recipe(db: DbSession, menu_item_id: int, items: List[schemas.RecipeItemCreate]) -> Optional[List[models.RecipeItem]]:
+    """Replace the recipe of a menu item."""
+    return await run(db, crud.set_recipe, menu_item_id, items)
+
+# --------------------
+# ORDER CRUD
+# --------------------
+
+async def create_order(db: DbSession, order: schemas.OrderCreate) -> models.Order:
+    """Create a new order and its items in a single transaction."""
+    return await run(db, crud.create_order, order)
+
+
+async def create_orders(db: DbSession, orders: List[schemas.OrderCreate]) -> List[models.Order]:
+    """Create several orders in a single transaction."""
+    return await run(db, crud.create_orders, orders)
+
+
+async def get_idempotency_record(db: DbSession, key: str) -> Optional[models.IdempotencyKey]:
+    """Stored response for an unexpired Idempotency-Key, or None."""
+    return await run(db, crud.get_idempotency_record, key)
+
+
+async def create_order_once(
+    db: DbSession, order: schemas.OrderCreate, key: str, request_hash: str
+) -> models.IdempotencyKey:
+    """Create an order and store its response under ``key``, atomically."""
+    return await run(db, crud.create_order_once, order, key, request_hash)
+
+
+async def get_order(db: DbSession, order_id: int) -> models.Order:
+    """Retrieve an order by ID, including its items."""
+    return await run(db, crud.get_order, order_id)
+
+
+async def get_orders(
+    db: DbSession,
+    skip: int = 0,
+    limit: int = 100,
+    after: Optional[Tuple[datetime, int]] = None,
+    status: Optional[str] = None,
+    table_number: Optional[int] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+) -> List[models.Order]:
+    """Retrieve a filtered page of orders in (timestamp, id) order."""
+    return await run(
+        db, crud.get_orders, skip=skip, limit=limit, after=after,
+        status=status, table_number=table_number, since=since, until=until,
+    )
+
+
+async def get_order_rows(
+    db: DbSession,
+    skip: int = 0,
+    limit: int = 100,
+    after: Optional[Tuple[datetime, int]] = None,
+    status: Optional[str] = None,
+    table_number: Optional[int] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+) -> List[Dict]:
+    """A filtered page of orders as projected rows, lines nested."""
+    return await run(
+        db, crud.get_order_rows, skip=skip, limit=limit, after=after,
+        status=status, table_number=table_number, since=since, until=until,
+    )
+
+
+async def get_active_orders(db: DbSession, status: Optional[str] = None) -> List[models.Order]:
+    """Orders not yet Served or Cancelled, oldest first."""
+    return await run(db, crud.get_active_orders, status=status)
+
+
+async def update_order_status(db: DbSession, order_id: int, status: str) -> models.Order:
+    """Move an order to a new status, if its lifecycle allows it."""
+    return await run(db, crud.update_order_status, order_id, status)
+
+# --------------------
+# INVENTORY CRUD
+# --------------------
+
+async def get_inventory_items(
+    db: DbSession, skip: int = 0, limit: int = 100, after: Optional[int] = None
+) -> List[models.InventoryItem]:
+    """Retrieve a page of inventory items in ID order."""
+    return await run(db, crud.get_inventory_items, skip=skip, limit=limit, after=after)
+
+
+async def get_inventory_item_rows(
+    db: DbSession, skip: int = 0, limit: int = 100, after: Optional[int] = None
+) -> List[Dict]:
+    """A page of inventory items as projected rows."""
+    return await run(db, crud.get_inventory_item_rows, skip=skip, limit=limit, after=after)
+
+
+async def get_inventory_changes(db: DbSession, since: int = 0, limit: int = 500) -> Dict:
+    """Inventory items written or deleted after change version ``since``."""
+    return await run(db, crud.get_inventory_changes, since=since, limit=limit)
+
+
+async def get_low_stock_items(db: DbSession, limit: int = 100, after: Optional[int] = None) -> List[models.InventoryItem]:
+    """Retrieve inventory items at or below their threshold."""
+    return await run(db, crud.get_low_stock_items, limit=limit, after=after)
+
+
+async def get_inventory_item(db: DbSession, item_id: int) -> models.InventoryItem:
+    """Retrieve a single inventory item by ID."""
+    return await run(db, crud.get_inventory_item, item_id)
+
+
+async def create_inventory_item(db: DbSession, item: schemas.InventoryItemCreate) -> models.InventoryItem:
+    """Create a new inventory record."""
+    return await run(db, crud.create_inventory_item, item)
+
+
+async def update_inventory_item(db: DbSession, item_id: int, item: schemas.InventoryItemCreate) -> models.InventoryItem:
+    """Update an existing inventory item."""
+    return await run(db, crud.update_inventory_item, item_id, item)
+
+
+async def upsert_inventory_items(db: DbSession, items: List[schemas.InventoryItemCreate]) -> Tuple[int, int]:
+    """Create or update inventory items matched by name."""
+    return await run(db, crud.upsert_inventory_items, items)
+
+
+async def delete_inventory_item(db: DbSession, item_id: int) -> bool:
+    """Delete an inventory record."""
+    return await run(db, crud.delete_inventory_item, item_id)
+
+# --------------------
+# ANALYTICS
+# --------------------
+
+async def get_revenue(
+    db: DbSession, period: str = "hour", since: Optional[datetime] = None, until: Optional[datetime] = None
+) -> List:
+    """Orders and revenue per hour or day."""
+    return await run(db, crud.get_revenue, period=period, since=since, until=until)
+
+
+async def get_top_items(
+    db: DbSession, since: Optional[datetime] = None, until: Optional[datetime] = None, limit: int = 10
+) -> List:
+    """Best-selling menu items by units sold."""
+    return await run(db, crud.get_top_items, since=since, until=until, limit=limit)
+
+
+async def get_ticket_stats(db: DbSession, since: Optional[datetime] = None, until: Optional[datetime] = None) -> dict:
+    """Order count, revenue and average ticket size."""
+    return await run(db, crud.get_ticket_stats, since=since, until=until)
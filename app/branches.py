@@ -0,0 +1,63 @@
+# ---------------------------------------------------
+# app/branches.py
+# ---------------------------------------------------
+"""
+Branch scoping for sessions opened on behalf of one branch.
+
+A session carries its branch in ``session.info["branch_id"]`` (see
+app.database.branch_session and get_db). For such a session:
+
+- every ORM SELECT, UPDATE and DELETE touching a branch-owned model is
+  narrowed to the branch with ``with_loader_criteria``, so crud queries
+  stay as they are and still read only their branch, through the
+  branch-led composite indexes declared in app.models;
+- objects added to the session are stamped with the branch on flush.
+
+Core INSERTs (bulk upserts, rollups) bypass both and set branch_id
+themselves from branch_of(db). Sessions without a branch (migrations, the
+archive job, scripts) see every branch.
+"""
+import functools
+
+from sqlalchemy import event
+from sqlalchemy.orm import ORMExecuteState, Session, with_loader_criteria
+
+import app.models as models
+from app.database import DEFAULT_BRANCH
+
+# Models owned by a branch
+SCOPED = tuple(sorted(
+    (mapper.class_ for mapper in models.Base.registry.mappers if issubclass(mapper.class_, models.BranchOwned)),
+    key=lambda model: model.__tablename__,
+))
+
+
+def branch_of(db: Session) -> int:
+    """The branch ``db`` is scoped to, DEFAULT_BRANCH for unscoped sessions."""
+    return db.info.get("branch_id", DEFAULT_BRANCH)
+
+
+@functools.lru_cache(maxsize=1024)
+def _criteria(branch_id: int):
+    # one option covering every BranchOwned model, built once per branch
+    # (it is immutable, so statements can share it)
+    return with_loader_criteria(models.BranchOwned, lambda cls: cls.branch_id == branch_id, include_aliases=True)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _scope_statement(state: ORMExecuteState) -> None:
+    branch_id = state.session.info.get("branch_id")
+    if branch_id is None or state.is_column_load or state.is_relationship_load:
+        return
+    if state.is_select or state.is_update or state.is_delete:
+        state.statement = state.statement.options(_criteria(branch_id))
+
+
+@event.listens_for(Session, "before_flush")
+def _stamp_new_objects(session: Session, flush_context, instances) -> None:
+    branch_id = session.info.get("branch_id")
+    if branch_id is None:
+        return
+    for instance in session.new:
+        if isinstance(instance, models.BranchOwned) and instance.branch_id is None:
+            instance.branch_id = branch_id
@@ -0,0 +1,127 @@
+# ---------------------------------------------------
+# app/bulk.py
+# ---------------------------------------------------
+"""
+Request parsing for the bulk import endpoints (POST /menu/bulk and
+POST /inventory/bulk).
+
+The body is decoded as it arrives and validated one record at a time.
+The format follows Content-Type:
+- application/json: a JSON array of objects (decoded in one piece)
+- application/x-ndjson: one object per line
+- text/csv: a header row naming the fields, then one row per item
+
+Fields a record leaves out (or CSV cells left empty) keep their current
+value on an existing item and take the field's default on a new one.
+
+A record that fails validation, or repeats a name seen earlier in the same
+upload, becomes a per-row error. The other records are imported.
+"""
+import codecs
+import csv
+import io
+import json
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple, Type, TypeVar
+
+from fastapi import HTTPException, Request
+from pydantic import BaseModel, ValidationError
+
+Model = TypeVar("Model", bound=BaseModel)
+
+NDJSON_TYPES = ("application/x-ndjson", "application/jsonl")
+CSV_TYPES = ("text/csv", "application/csv")
+
+
+async def _lines(request: Request) -> AsyncIterator[str]:
+    """Decoded lines of the body (newline kept), as the chunks arrive."""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    async for chunk in request.stream():
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line + "\n"
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+
+async def _csv_rows(request: Request) -> AsyncIterator[List[str]]:
+    record = ""
+    async for line in _lines(request):
+        record += line
+        # a newline inside a quoted cell leaves an odd number of quotes
+        if record.count('"') % 2 == 0:
+            row = next(csv.reader(io.StringIO(record)), [])
+            record = ""
+            if row:
+                yield row
+    if record:
+        yield next(csv.reader(io.StringIO(record)), [])
+
+
+async def _records(request: Request) -> AsyncIterator[Tuple[Any, Optional[str]]]:
+    """(record, error) pairs; error is set when the record itself could not be decoded."""
+    content_type = request.headers.get("content-type", "application/json").split(";")[0].strip().lower()
+    if content_type == "application/json":
+        try:
+            data = json.loads(await request.body())
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Body is not valid JSON")
+        if not isinstance(data, list):
+            raise HTTPException(status_code=400, detail="Expected a JSON array")
+        for record in data:
+            yield record, None
+    elif content_type in NDJSON_TYPES:
+        async for line in _lines(request):
+            if line.strip():
+                try:
+                    yield json.loads(line), None
+                except ValueError as exc:
+                    yield None, f"Invalid JSON: {exc}"
+    elif content_type in CSV_TYPES:
+        header = None
+        async for row in _csv_rows(request):
+            if header is None:
+                header = [cell.strip() for cell in row]
+            elif len(row) != len(header):
+                yield None, f"Expected {len(header)} cells, got {len(row)}"
+            else:
+                yield {field: cell for field, cell in zip(header, row) if cell != ""}, None
+    else:
+        raise HTTPException(
+            status_code=415,
+            detail="Send application/json, application/x-ndjson or text/csv",
+        )
+
+
+def _describe(exc: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" if error["loc"] else error["msg"]
+        for error in exc.errors()
+    )
+
+
+async def read_rows(request: Request, schema: Type[Model]) -> Tuple[List[Model], List[Dict[str, Any]]]:
+    """Validate every record in the body against ``schema``. Returns (valid items, row errors)."""
+    items: List[Model] = []
+    errors: List[Dict[str, Any]] = []
+    seen: Dict[str, int] = {}
+    row = 0
+    async for record, error in _records(request):
+        row += 1
+        name = record.get("name") if isinstance(record, dict) else None
+        if error is None:
+            try:
+                item = schema.model_validate(record)
+            except ValidationError as exc:
+                error = _describe(exc)
+            else:
+                if item.name in seen:
+                    error = f"Duplicate of row {seen[item.name]}"
+                else:
+                    seen[item.name] = row
+                    items.append(item)
+        if error is not None:
+            errors.append({"row": row, "name": name if isinstance(name, str) else None, "error": error})
+    return items, errors
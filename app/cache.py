@@ -0,0 +1,136 @@
+# ---------------------------------------------------
+# app/cache.py
+# ---------------------------------------------------
+"""
+In-process cache of pre-serialized menu responses.
+
+The menu changes a handful of times a day but is read on every tablet
+refresh, so GET /menu/ and GET /menu/{item_id} keep the JSON bytes they
+produced together with an ETag. The crud functions that write menu items
+call ``menu_cache.invalidate()`` after committing.
+
+Each worker process has a cache of its own and only sees its own
+invalidations, so entries also carry the branch's menu change version
+(see app.changes) they were filled at. A lookup passes the current
+version, one primary-key read of change_counters, and an entry from
+before a write through any worker is a miss.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, NamedTuple, Optional, Tuple
+
+from fastapi import Request, Response
+
+
+class CachedResponse(NamedTuple):
+    body: bytes     # serialized JSON, exactly as sent to clients
+    etag: str       # quoted strong validator derived from the body
+    headers: Tuple[Tuple[str, str], ...] = ()  # extra headers, e.g. X-Next-Cursor
+    version: Optional[int] = None  # menu change version the body was read at
+
+
+class MenuCache:
+    """Thread-safe LRU of serialized responses with hit/miss counters."""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._entries: "OrderedDict[Hashable, CachedResponse]" = OrderedDict()
+        # Bumped on every invalidation; a fill computed under an older
+        # generation may be stale and is not stored.
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def get(self, key: Hashable, version: Optional[int] = None) -> Optional[CachedResponse]:
+        """The entry for ``key``, unless it was filled at another ``version``."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.version != version:
+                del self._entries[key]  # written since, maybe through another worker
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(
+        self, key: Hashable, body: bytes, generation: int, headers: Optional[Dict[str, str]] = None,
+        version: Optional[int] = None,
+    ) -> CachedResponse:
+        entry = CachedResponse(
+            body, '"%s"' % hashlib.sha1(body).hexdigest(), tuple((headers or {}).items()), version
+        )
+        with self._lock:
+            if generation == self._generation:
+                self._entries[key] = entry
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return entry
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+            self.invalidations += 1
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
+
+
+menu_cache = MenuCache()
+
+
+async def get_or_fill(
+    cache: MenuCache, key: Hashable, fill: Callable, version: Optional[int] = None
+) -> Optional[CachedResponse]:
+    """
+    Return the cached entry for ``key`` filled at ``version``, or await
+    ``fill()`` and cache what it returns: the JSON bytes, or a (bytes,
+    headers) pair. ``fill`` may return None (e.g. item not found), which is
+    passed through and not cached. Read ``version`` before filling, so a
+    body is never older than the version it is stored under.
+    """
+    entry = cache.get(key, version)
+    if entry is not None:
+        return entry
+    generation = cache.generation
+    filled = await fill()
+    if filled is None:
+        return None
+    body, headers = filled if isinstance(filled, tuple) else (filled, None)
+    return cache.put(key, body, generation, headers, version)
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """True if the request's If-None-Match header covers ``etag``."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [value.strip() for value in header.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+def cached_response(request: Request, entry: CachedResponse) -> Response:
+    """Build a 200 with the cached body, or a bodiless 304 if the client has it."""
+    headers = {"ETag": entry.etag, "Cache-Control": "no-cache", **dict(entry.headers)}
+    if etag_matches(request, entry.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
@@ -0,0 +1,89 @@
+# ---------------------------------------------------
+# app/changes.py
+# ---------------------------------------------------
+"""
+Change versions for delta sync of the menu and inventory.
+
+Every write to a menu or inventory item stamps the row with the next
+version of its table (its "feed", counted per branch), and deleting a row
+leaves a tombstone with a version of its own. GET /menu/changes?since=v
+and GET /inventory/changes?since=v then return only what changed after
+v, so a tablet reconnecting downloads its missed edits, not the catalog.
+
+- ORM inserts and updates are stamped on flush, by the listener below.
+- Core writes (bulk upserts, stock deductions) take versions with
+  allocate(); deletes call tombstone().
+
+Versions come from a counter row per (branch, feed), bumped inside the
+writing transaction. The row lock that takes orders the writers, so
+versions commit in increasing order and a client that has seen version v
+has seen everything below it, which a database sequence would not
+guarantee. Each row gets a version of its own, so clients can page
+through changes by version alone.
+"""
+from collections import defaultdict
+from typing import Iterable
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+import app.models as models
+from app.branches import branch_of
+from app.database import upsert_insert
+
+# Versioned models
+VERSIONED = (models.MenuItem, models.InventoryItem)
+
+
+def allocate(db: Session, model, count: int = 1, branch_id: int = None) -> int:
+    """
+    Reserve ``count`` consecutive versions of ``model``'s feed in the branch
+    (the session's by default), in the current transaction. Returns the first.
+    """
+    counter = models.ChangeCounter.__table__
+    branch_id = branch_of(db) if branch_id is None else branch_id
+    stmt = upsert_insert(db, counter).values(branch_id=branch_id, feed=model.__tablename__, version=count)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["branch_id", "feed"], set_={"version": counter.c.version + count}
+    )
+    return db.scalar(stmt.returning(counter.c.version)) - count + 1
+
+
+def current_version(db: Session, model) -> int:
+    """Latest version of ``model``'s feed in the session's branch (0 before any write)."""
+    counter = models.ChangeCounter
+    return db.scalar(select(counter.version).where(counter.feed == model.__tablename__)) or 0
+
+
+def tombstone(db: Session, model, ids: Iterable[int]) -> None:
+    """Record the deletion of rows ``ids`` of ``model`` in the current transaction."""
+    ids = sorted(ids)
+    if not ids:
+        return
+    branch_id = branch_of(db)
+    first = allocate(db, model, len(ids), branch_id)
+    table = models.Tombstone.__table__
+    stmt = upsert_insert(db, table)
+    # an ID SQLite hands out again can be deleted twice
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["branch_id", "feed", "row_id"], set_={"version": stmt.excluded.version}
+    )
+    db.execute(stmt, [
+        {"branch_id": branch_id, "feed": model.__tablename__, "row_id": row_id, "version": first + offset}
+        for offset, row_id in enumerate(ids)
+    ])
+
+
+@event.listens_for(Session, "before_flush")
+def _stamp_versions(session: Session, flush_context, instances) -> None:
+    pending = defaultdict(list)
+    for instance in session.new:
+        if isinstance(instance, VERSIONED):
+            pending[type(instance), instance.branch_id or branch_of(session)].append(instance)
+    for instance in session.dirty:
+        if isinstance(instance, VERSIONED) and session.is_modified(instance, include_collections=False):
+            pending[type(instance), instance.branch_id].append(instance)
+    for (model, branch_id), instances in pending.items():
+        first = allocate(session, model, len(instances), branch_id)
+        for offset, instance in enumerate(instances):
+            instance.version = first + offset
@@ -1,15 +1,160 @@
-from sqlalchemy.orm import Session
-from typing import List
+from datetime import datetime
+from collections import defaultdict
+from itertools import groupby
+from contextlib import contextmanager
+from sqlalchemy import bindparam, case, delete, func, insert, select, tuple_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
 import app.models as models
 import app.schemas as schemas
+import app.analytics as analytics
+import app.search as search
+from app import changes
+from app.branches import branch_of
+from app.cache import menu_cache
+from app.database import upsert_insert
+from app.events import LOW_STOCK, ORDER_CREATED, ORDER_STATUS_CHANGED, bus
+from app.idempotency import IDEMPOTENCY_TTL, KeyInUseError
 
 # --------------------
 # MENU CRUD
 # --------------------
 
-def get_menu_items(db: Session, skip: int = 0, limit: int = 100) -> List[models.MenuItem]:
-    """Retrieve a list of menu items with pagination."""
-    return db.query(models.MenuItem).offset(skip).limit(limit).all()
+class DuplicateNameError(Exception):
+    """Raised when a create/update would give two menu or inventory items the same name."""
+
+    def __init__(self, name: str):
+        self.name = name
+        super().__init__(f"An item named {name!r} already exists")
+
+
+@contextmanager
+def _unique_name(db: Session, name: str):
+    """Turn a unique-name violation inside the block into DuplicateNameError."""
+    try:
+        yield
+    except IntegrityError:
+        db.rollback()
+        raise DuplicateNameError(name)
+
+
+def _projected(model, schema, nested: Sequence[str] = ()) -> Tuple[List, List[str]]:
+    """
+    The columns of ``model`` behind the fields of ``schema`` (except the
+    ``nested`` lists), and the schema's field names in order.
+    """
+    fields = list(schema.model_fields)
+    return [getattr(model, name) for name in fields if name not in nested], fields
+
+
+def _records(rows, fields: List[str]) -> List[Dict]:
+    """
+    One dict per row, keyed in schema field order (nested lists left None
+    for the caller), so it serializes exactly like the schema would.
+    """
+    records = []
+    for row in rows:
+        record = dict.fromkeys(fields)
+        record.update(row._mapping)
+        records.append(record)
+    return records
+
+
+# Columns and field order behind each list endpoint's response schema
+_MENU_COLUMNS, _MENU_FIELDS = _projected(models.MenuItem, schemas.MenuItem)
+_INVENTORY_COLUMNS, _INVENTORY_FIELDS = _projected(models.InventoryItem, schemas.InventoryItem)
+_ORDER_COLUMNS, _ORDER_FIELDS = _projected(models.Order, schemas.Order, nested=["items"])
+_LINE_COLUMNS, _LINE_FIELDS = _projected(models.OrderItem, schemas.OrderItem)
+
+
+def _upsert_by_name(db: Session, model, rows: List[Dict], batch_size: int) -> Tuple[List[int], int]:
+    """
+    INSERT ... ON CONFLICT (branch_id, name) DO UPDATE ``rows`` in batches,
+    into the session's branch and inside the caller's transaction. A row
+    updates only the fields it carries; new rows take the column defaults
+    for the rest. Returns the IDs written and how many already existed.
+    """
+    table = model.__table__
+    branch_id = branch_of(db)
+    first = changes.allocate(db, model, len(rows), branch_id)
+    rows = [{**row, "branch_id": branch_id, "version": first + offset} for offset, row in enumerate(rows)]
+    ids: List[int] = []
+    existing = 0
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start:start + batch_size]
+        existing += db.scalar(
+            select(func.count()).select_from(table)
+            .where(table.c.branch_id == branch_id, table.c.name.in_([row["name"] for row in batch]))
+        )
+        # a statement per run of rows with the same fields (an executemany
+        # shares its columns), so new rows still get IDs in upload order
+        for fields, group in groupby(batch, key=lambda row: sorted(row)):
+            stmt = upsert_insert(db, table)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["branch_id", "name"],
+                set_={column: stmt.excluded[column] for column in fields if column not in ("branch_id", "name")},
+            )
+            ids += db.scalars(stmt.returning(table.c.id), list(group)).all()
+    return ids, existing
+
+
+def _changes(db: Session, model, columns: List, fields: List[str], since: int, limit: int) -> Dict:
+    """
+    Rows of ``model`` written and deleted after version ``since``, merged in
+    version order and cut at ``limit``, shaped like schemas.MenuChanges.
+    """
+    tombstone = models.Tombstone
+    written = [
+        (record["version"], record)
+        for record in _records(
+            db.execute(select(*columns).where(model.version > since).order_by(model.version).limit(limit + 1)), fields
+        )
+    ]
+    deleted = db.execute(
+        select(tombstone.version, tombstone.row_id)
+        .where(tombstone.feed == model.__tablename__, tombstone.version > since)
+        .order_by(tombstone.version)
+        .limit(limit + 1)
+    ).all()
+    entries = sorted(written + [tuple(row) for row in deleted], key=lambda entry: entry[0])
+    page = entries[:limit]
+    return {
+        "version": page[-1][0] if page else changes.current_version(db, model),
+        "more": len(entries) > limit,
+        "changed": [entry for _, entry in page if isinstance(entry, dict)],
+        "deleted": [entry for _, entry in page if not isinstance(entry, dict)],
+    }
+
+def get_menu_items(
+    db: Session, skip: int = 0, limit: int = 100, after: Optional[int] = None
+) -> List[models.MenuItem]:
+    """Retrieve a page of menu items in ID order, starting after the ``after`` ID."""
+    query = db.query(models.MenuItem)
+    if after is not None:
+        query = query.filter(models.MenuItem.id > after)
+    return query.order_by(models.MenuItem.id).offset(skip).limit(limit).all()
+
+
+def get_menu_item_rows(
+    db: Session, skip: int = 0, limit: int = 100, after: Optional[int] = None
+) -> List[Dict]:
+    """get_menu_items as projected rows (see _projected), for serializing straight to JSON."""
+    stmt = select(*_MENU_COLUMNS)
+    if after is not None:
+        stmt = stmt.where(models.MenuItem.id > after)
+    return _records(db.execute(stmt.order_by(models.MenuItem.id).offset(skip).limit(limit)), _MENU_FIELDS)
+
+
+def get_menu_version(db: Session) -> int:
+    """Latest menu change version of the session's branch; cached menu responses are checked against it."""
+    return changes.current_version(db, models.MenuItem)
+
+
+def get_menu_changes(db: Session, since: int = 0, limit: int = 500) -> Dict:
+    """Menu items written or deleted after change version ``since`` (see app.changes)."""
+    return _changes(db, models.MenuItem, _MENU_COLUMNS, _MENU_FIELDS, since, limit)
 
 
 def get_menu_item(db: Session, item_id: int) -> models.MenuItem:
@@ -17,6 +162,13 @@ def get_menu_item(db: Session, item_id: int) -> models.MenuItem:
     return db.query(models.MenuItem).filter(models.MenuItem.id == item_id).first()
 
 
+def search_menu_items(
+    db: Session, q: str, category: Optional[str] = None, available: Optional[bool] = None, limit: int = 20
+) -> List[models.MenuItem]:
+    """Prefix and typo-tolerant search over name, category and ingredients, best match first."""
+    return search.search_menu_items(db, q, category=category, available=available, limit=limit)
+
+
 def create_menu_item(db: Session, item: schemas.MenuItemCreate) -> models.MenuItem:
     """Create a new menu item from a schema."""
     db_item = models.MenuItem(
@@ -27,85 +179,595 @@ def create_menu_item(db: Session, item: schemas.MenuItemCreate) -> models.MenuIt
         ingredients=item.ingredients,
     )
     db.add(db_item)
-    db.commit()
+    with _unique_name(db, item.name):
+        db.commit()
     db.refresh(db_item)  # load generated ID
+    menu_cache.invalidate()
     return db_item
 
 
 def update_menu_item(db: Session, item_id: int, item: schemas.MenuItemCreate) -> models.MenuItem:
-    """Update an existing menu item."""
+    """Update an existing menu item; optional fields left out of the payload keep their values."""
     db_item = db.query(models.MenuItem).filter(models.MenuItem.id == item_id).first()
     if not db_item:
         return None
-    for field, value in item.dict().items():
+    for field, value in item.model_dump(exclude_unset=True).items():
         setattr(db_item, field, value)
-    db.commit()
+    with _unique_name(db, item.name):
+        db.commit()
     db.refresh(db_item)
+    menu_cache.invalidate()
     return db_item
 
 
+def upsert_menu_items(db: Session, items: List[schemas.MenuItemCreate], batch_size: int = 500) -> Tuple[int, int]:
+    """
+    Create or update menu items matched by name, in batched upserts and
+    one transaction. Returns (created, updated).
+    """
+    if not items:
+        return 0, 0
+    ids, existing = _upsert_by_name(
+        db, models.MenuItem, [item.model_dump(exclude_unset=True) for item in items], batch_size
+    )
+    db.commit()
+    menu_cache.invalidate()
+    return len(ids) - existing, existing
+
+
+class MenuItemOrderedError(Exception):
+    """Raised when deleting a menu item that live order lines still reference."""
+
+    def __init__(self, item_id: int):
+        self.item_id = item_id
+        super().__init__(f"Menu item {item_id} has been ordered; mark it unavailable instead")
+
+
 def delete_menu_item(db: Session, item_id: int) -> bool:
-    """Delete a menu item by ID."""
-    deleted = db.query(models.MenuItem).filter(models.MenuItem.id == item_id).delete()
-    if deleted:
-        db.commit()
-        return True
-    return False
+    """
+    Delete a menu item by ID, with its recipe. Raises MenuItemOrderedError
+    while order lines reference it (archived ones do not count).
+    """
+    if db.scalar(select(models.MenuItem.id).where(models.MenuItem.id == item_id)) is None:
+        return False
+    if db.scalar(select(models.OrderItem.id).where(models.OrderItem.menu_item_id == item_id).limit(1)) is not None:
+        raise MenuItemOrderedError(item_id)
+    # children first: foreign keys are enforced
+    db.query(models.RecipeItem).filter(models.RecipeItem.menu_item_id == item_id).delete()
+    db.query(models.MenuItem).filter(models.MenuItem.id == item_id).delete()
+    changes.tombstone(db, models.MenuItem, [item_id])
+    db.commit()
+    menu_cache.invalidate()
+    return True
 
 # --------------------
-# ORDER CRUD
+# RECIPE CRUD
 # --------------------
 
-def create_order(db: Session, order: schemas.OrderCreate) -> models.Order:
-    """Create a new order with associated order items."""
-    db_order = models.Order(
-        customer_name=order.customer_name,
-        table_number=order.table_number,
+def get_recipe(db: Session, menu_item_id: int) -> List[models.RecipeItem]:
+    """Retrieve the recipe lines of a menu item."""
+    return (
+        db.query(models.RecipeItem)
+        .filter(models.RecipeItem.menu_item_id == menu_item_id)
+        .order_by(models.RecipeItem.id)
+        .all()
     )
-    db.add(db_order)
+
+
+class UnknownInventoryItemError(Exception):
+    """Raised when a recipe references inventory items that do not exist in the branch."""
+
+    def __init__(self, inventory_item_ids: List[int]):
+        self.inventory_item_ids = inventory_item_ids
+        super().__init__(f"Unknown inventory items {inventory_item_ids}")
+
+
+def set_recipe(db: Session, menu_item_id: int, items: List[schemas.RecipeItemCreate]) -> Optional[List[models.RecipeItem]]:
+    """
+    Replace the recipe of a menu item. Lines naming the same ingredient are
+    merged, their quantities summed. Returns None if the menu item does not
+    exist; raises UnknownInventoryItemError for ingredients not in the branch.
+    """
+    if get_menu_item(db, menu_item_id) is None:
+        return None
+    quantities: Dict[int, float] = {}
+    for item in items:
+        quantities[item.inventory_item_id] = quantities.get(item.inventory_item_id, 0) + item.quantity
+    found = set(db.scalars(select(models.InventoryItem.id).where(models.InventoryItem.id.in_(quantities))))
+    missing = sorted(set(quantities) - found)
+    if missing:
+        raise UnknownInventoryItemError(missing)
+    db.query(models.RecipeItem).filter(models.RecipeItem.menu_item_id == menu_item_id).delete()
+    db_items = [
+        models.RecipeItem(menu_item_id=menu_item_id, inventory_item_id=inventory_item_id, quantity=quantity)
+        for inventory_item_id, quantity in quantities.items()
+    ]
+    db.add_all(db_items)
     db.commit()
-    db.refresh(db_order)
-
-    # add items
-    for item in order.items:
-        db_item = models.OrderItem(
-            order_id=db_order.id,
-            menu_item_id=item.menu_item_id,
-            quantity=item.quantity,
+    return db_items
+
+# --------------------
+# ORDER CRUD
+# --------------------
+
+def _insert_order_items(
+    db: Session, orders: List[Tuple[models.Order, List[schemas.OrderItemCreate]]], prices: Dict[int, float]
+) -> None:
+    """
+    Insert the lines of already-flushed orders with one bulk INSERT, each
+    priced from ``prices``, and attach them to their parents so
+    serialization needs no lazy loads.
+    """
+    rows = [
+        {"order_id": db_order.id, "menu_item_id": item.menu_item_id, "quantity": item.quantity,
+         "unit_price": prices[item.menu_item_id]}
+        for db_order, items in orders
+        for item in items
+    ]
+    db_items = []
+    if rows:
+        stmt = insert(models.OrderItem).returning(models.OrderItem, sort_by_parameter_order=True)
+        db_items = db.scalars(stmt, rows).all()
+
+    by_order = {db_order.id: [] for db_order, _ in orders}
+    for db_item in db_items:
+        by_order[db_item.order_id].append(db_item)
+    for db_order, _ in orders:
+        set_committed_value(db_order, "items", by_order[db_order.id])
+
+
+class UnknownMenuItemError(Exception):
+    """Raised when an order references menu items that do not exist."""
+
+    def __init__(self, menu_item_ids: List[int]):
+        self.menu_item_ids = menu_item_ids
+        super().__init__(f"Unknown menu items {menu_item_ids}")
+
+
+def _menu_prices(db: Session, orders: List[schemas.OrderCreate]) -> Dict[int, float]:
+    """Current price of every menu item the orders reference (one query)."""
+    ids = {item.menu_item_id for order in orders for item in order.items}
+    if not ids:
+        return {}
+    prices = dict(
+        db.execute(select(models.MenuItem.id, models.MenuItem.price).where(models.MenuItem.id.in_(ids))).all()
+    )
+    missing = sorted(ids - prices.keys())
+    if missing:
+        raise UnknownMenuItemError(missing)
+    return prices
+
+
+class InsufficientStockError(Exception):
+    """Raised when an order needs more of an ingredient than is in stock."""
+
+    def __init__(self, shortages: Dict[int, float]):
+        # inventory_item_id -> amount missing
+        self.shortages = shortages
+        super().__init__(f"Insufficient stock for inventory items {sorted(shortages)}")
+
+
+def _stock_needed(db: Session, orders: List[schemas.OrderCreate]) -> Dict[int, float]:
+    """Total amount of each ingredient consumed by the given orders (one query)."""
+    portions: Dict[int, int] = defaultdict(int)
+    for order in orders:
+        for item in order.items:
+            portions[item.menu_item_id] += item.quantity
+    if not portions:
+        return {}
+
+    needs: Dict[int, float] = defaultdict(float)
+    recipe = db.execute(
+        select(models.RecipeItem.menu_item_id, models.RecipeItem.inventory_item_id, models.RecipeItem.quantity)
+        .where(models.RecipeItem.menu_item_id.in_(list(portions)))
+    )
+    for menu_item_id, inventory_item_id, quantity in recipe:
+        needs[inventory_item_id] += quantity * portions[menu_item_id]
+    return {inventory_item_id: amount for inventory_item_id, amount in needs.items() if amount > 0}
+
+
+def _deduct_stock(db: Session, needs: Dict[int, float]) -> List[Dict]:
+    """
+    Take ``needs`` out of inventory with one guarded, set-based UPDATE in the
+    current transaction. Every row must still hold enough stock at write time,
+    otherwise nothing is deducted and InsufficientStockError is raised.
+    Returns the low-stock crossings caused by the deduction.
+    """
+    if not needs:
+        return []
+    ids = sorted(needs)
+    # before the row locks, in the order every inventory write takes them
+    first = changes.allocate(db, models.InventoryItem, len(ids))
+    if db.get_bind().dialect.name != "sqlite":
+        # Lock the rows in a fixed order so concurrent orders queue up instead
+        # of deadlocking. SQLite already serializes writers.
+        db.execute(
+            select(models.InventoryItem.id)
+            .where(models.InventoryItem.id.in_(ids))
+            .order_by(models.InventoryItem.id)
+            .with_for_update()
+        )
+    amount = case(needs, value=models.InventoryItem.id)
+    result = db.execute(
+        update(models.InventoryItem)
+        .where(models.InventoryItem.id.in_(ids), models.InventoryItem.quantity >= amount)
+        .values(
+            quantity=models.InventoryItem.quantity - amount,
+            version=case({item_id: first + offset for offset, item_id in enumerate(ids)}, value=models.InventoryItem.id),
         )
-        db.add(db_item)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount == len(ids):
+        return _refresh_low_stock(db, ids)
+
+    db.rollback()
+    in_stock = dict(
+        db.execute(
+            select(models.InventoryItem.id, models.InventoryItem.quantity)
+            .where(models.InventoryItem.id.in_(ids))
+        ).all()
+    )
+    raise InsufficientStockError({
+        inventory_item_id: need - in_stock.get(inventory_item_id, 0.0)
+        for inventory_item_id, need in needs.items()
+        if in_stock.get(inventory_item_id, 0.0) < need
+    })
+
+
+def _order_event(db_order: models.Order) -> dict:
+    """Event payload for an order: the same JSON GET /orders/{id} returns."""
+    return schemas.Order.model_validate(db_order).model_dump(mode="json")
+
+
+def create_order(db: Session, order: schemas.OrderCreate) -> models.Order:
+    """Create a new order and its items in a single transaction."""
+    return create_orders(db, [order])[0]
+
+
+def create_orders(db: Session, orders: List[schemas.OrderCreate]) -> List[models.Order]:
+    """
+    Create several orders in a single transaction: one price lookup, one
+    set-based stock deduction, one flush for the headers, one bulk insert
+    for every line, the sales rollup upserts and one commit. Lines keep the
+    menu price of the moment and each order stores its total. Raises
+    UnknownMenuItemError or InsufficientStockError (and stores nothing) if
+    an item does not exist or an ingredient would go negative.
+    """
+    db_orders, crossings = _place_orders(db, orders)
+    _commit_orders(db, db_orders, crossings)
+    return db_orders
+
+
+def _place_orders(db: Session, orders: List[schemas.OrderCreate]) -> Tuple[List[models.Order], List[Dict]]:
+    """Everything create_orders does before the commit; returns the orders and low-stock crossings."""
+    prices = _menu_prices(db, orders)
+    crossings = _deduct_stock(db, _stock_needed(db, orders))
+
+    db_orders = [
+        models.Order(
+            customer_name=order.customer_name,
+            table_number=order.table_number,
+            total=sum(prices[item.menu_item_id] * item.quantity for item in order.items),
+            item_count=sum(item.quantity for item in order.items),
+        )
+        for order in orders
+    ]
+    db.add_all(db_orders)
+    db.flush()  # load generated order IDs
+
+    _insert_order_items(db, [(db_order, order.items) for db_order, order in zip(db_orders, orders)], prices)
+    analytics.record_orders(db, db_orders)
+    return db_orders, crossings
+
+
+def _commit_orders(db: Session, db_orders: List[models.Order], crossings: List[Dict]) -> None:
     db.commit()
-    db.refresh(db_order)
-    return db_order
+    for db_order in db_orders:
+        bus.publish(ORDER_CREATED, _order_event(db_order))
+    _publish_low_stock(crossings)
+
+
+def get_idempotency_record(db: Session, key: str) -> Optional[models.IdempotencyKey]:
+    """Stored response for an unexpired Idempotency-Key, or None."""
+    return db.scalars(
+        select(models.IdempotencyKey).where(
+            models.IdempotencyKey.key == key,
+            models.IdempotencyKey.created_at >= datetime.utcnow() - IDEMPOTENCY_TTL,
+        )
+    ).first()
+
+
+def create_order_once(db: Session, order: schemas.OrderCreate, key: str, request_hash: str) -> models.IdempotencyKey:
+    """
+    Create an order and store its response under ``key`` in the same
+    transaction, so a retry can never place it twice. The key row is
+    inserted first: a concurrent request with the same key in another
+    process waits on it, then fails with KeyInUseError and stores nothing.
+    Expired keys are purged on the way.
+    """
+    db.execute(
+        delete(models.IdempotencyKey)
+        .where(models.IdempotencyKey.created_at < datetime.utcnow() - IDEMPOTENCY_TTL)
+    )
+    record = models.IdempotencyKey(key=key, request_hash=request_hash, status_code=201, response="")
+    db.add(record)
+    try:
+        db.flush()
+    except IntegrityError:
+        db.rollback()
+        raise KeyInUseError(key)
+    try:
+        db_orders, crossings = _place_orders(db, [order])
+    except Exception:
+        db.rollback()
+        raise
+    record.response = schemas.Order.model_validate(db_orders[0]).model_dump_json()
+    _commit_orders(db, db_orders, crossings)
+    return record
 
 
 def get_order(db: Session, order_id: int) -> models.Order:
-    """Retrieve an order by ID, including its items."""
-    return db.query(models.Order).filter(models.Order.id == order_id).first()
+    """Retrieve an order by ID, including its items, from the archive if it has been moved there."""
+    db_order = (
+        db.query(models.Order)
+        .options(selectinload(models.Order.items))
+        .filter(models.Order.id == order_id)
+        .first()
+    )
+    if db_order is None:
+        db_order = (
+            db.query(models.OrderArchive)
+            .options(selectinload(models.OrderArchive.items))
+            .filter(models.OrderArchive.id == order_id)
+            .first()
+        )
+    return db_order
+
+
+def get_orders(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    after: Optional[Tuple[datetime, int]] = None,
+    status: Optional[str] = None,
+    table_number: Optional[int] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+) -> List[models.Order]:
+    """
+    Retrieve a page of orders in (timestamp, id) order, items loaded in one
+    extra query. ``after`` is the (timestamp, id) of the last order already
+    seen; filters narrow the scan to an index range.
+    """
+    return (
+        db.query(models.Order)
+        .options(selectinload(models.Order.items))
+        .filter(*_order_filters(after, status, table_number, since, until))
+        .order_by(models.Order.timestamp, models.Order.id)
+        .offset(skip)
+        .limit(limit)
+        .all()
+    )
+
+
+def _order_filters(
+    after: Optional[Tuple[datetime, int]],
+    status: Optional[str],
+    table_number: Optional[int],
+    since: Optional[datetime],
+    until: Optional[datetime],
+) -> List:
+    order = models.Order
+    filters = []
+    if status is not None:
+        filters.append(order.status == status)
+    if table_number is not None:
+        filters.append(order.table_number == table_number)
+    if since is not None:
+        filters.append(order.timestamp >= since)
+    if until is not None:
+        filters.append(order.timestamp < until)
+    if after is not None:
+        filters.append(tuple_(order.timestamp, order.id) > tuple_(*after))
+    return filters
+
+
+def get_order_rows(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    after: Optional[Tuple[datetime, int]] = None,
+    status: Optional[str] = None,
+    table_number: Optional[int] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+) -> List[Dict]:
+    """
+    get_orders as projected rows: one query for the page's columns, one for
+    all of its lines (in line ID order), grouped under their orders.
+    """
+    orders = _records(
+        db.execute(
+            select(*_ORDER_COLUMNS)
+            .where(*_order_filters(after, status, table_number, since, until))
+            .order_by(models.Order.timestamp, models.Order.id)
+            .offset(skip)
+            .limit(limit)
+        ),
+        _ORDER_FIELDS,
+    )
+    if not orders:
+        return orders
+    by_order = {}
+    for order in orders:
+        order["items"] = by_order[order["id"]] = []
+    lines = db.execute(
+        select(models.OrderItem.order_id, *_LINE_COLUMNS)
+        .where(models.OrderItem.order_id.in_(list(by_order)))
+        .order_by(models.OrderItem.order_id, models.OrderItem.id)
+    )
+    for order_id, *values in lines:
+        by_order[order_id].append(dict(zip(_LINE_FIELDS, values)))
+    return orders
+
+
+def get_active_orders(db: Session, status: Optional[str] = None) -> List[models.Order]:
+    """
+    The kitchen queue: orders not yet Served or Cancelled, oldest first,
+    read through the partial index on active orders.
+    """
+    # literal values, so SQLite can match the partial index's predicate
+    active = bindparam("active_statuses", models.ACTIVE_STATUSES, expanding=True, literal_execute=True)
+    query = (
+        db.query(models.Order)
+        .options(selectinload(models.Order.items))
+        .filter(models.Order.status.in_(active))
+    )
+    if status is not None:
+        query = query.filter(models.Order.status == status)
+    return query.order_by(models.Order.timestamp, models.Order.id).all()
 
 
-def get_orders(db: Session, skip: int = 0, limit: int = 100) -> List[models.Order]:
-    """Retrieve a list of orders with pagination."""
-    return db.query(models.Order).offset(skip).limit(limit).all()
+def iter_order_lines(
+    db: Session,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    batch_size: int = 2000,
+) -> Iterator[Sequence]:
+    """
+    Stream every order joined with its lines, in (timestamp, id) order, as
+    batches of plain rows (no ORM objects). Rows are fetched ``batch_size``
+    at a time from a server-side cursor, so memory does not grow with the
+    result. Orders without lines yield one row whose line columns are None.
+    """
+    order, line = models.Order, models.OrderItem
+    stmt = (
+        select(
+            order.id, order.branch_id, order.customer_name, order.table_number, order.status, order.timestamp,
+            order.total, order.item_count,
+            order.in_kitchen_at, order.ready_at, order.served_at, order.cancelled_at,
+            line.id.label("line_id"), line.menu_item_id, line.quantity, line.unit_price,
+        )
+        .outerjoin(line, line.order_id == order.id)
+        .order_by(order.timestamp, order.id, line.id)
+        .execution_options(yield_per=batch_size)
+    )
+    if since is not None:
+        stmt = stmt.where(order.timestamp >= since)
+    if until is not None:
+        stmt = stmt.where(order.timestamp < until)
+    yield from db.execute(stmt).partitions()
+
+
+class InvalidTransitionError(Exception):
+    """Raised when an order's lifecycle does not allow the requested status."""
+
+    def __init__(self, current: str, status: str):
+        self.current = current
+        self.status = status
+        self.allowed = list(models.ORDER_TRANSITIONS.get(current, ()))
+        super().__init__(f"Cannot move an order from {current!r} to {status!r}")
 
 
 def update_order_status(db: Session, order_id: int, status: str) -> models.Order:
-    """Update only the status field of an order."""
-    db_order = db.query(models.Order).filter(models.Order.id == order_id).first()
+    """
+    Move an order to ``status`` and stamp when it got there. Raises
+    InvalidTransitionError unless models.ORDER_TRANSITIONS allows the step;
+    the UPDATE is guarded by the status it was checked against, so of two
+    concurrent changes only one applies.
+    """
+    db_order = get_order(db, order_id)
     if not db_order:
         return None
-    db_order.status = status
+    current = db_order.status
+    if status not in models.ORDER_TRANSITIONS.get(current, ()):
+        raise InvalidTransitionError(current, status)
+    values = {"status": status, models.STATUS_TIMESTAMPS[status]: datetime.utcnow()}
+    result = db.execute(
+        update(models.Order)
+        .where(models.Order.id == order_id, models.Order.status == current)
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount != 1:
+        db.rollback()
+        raise InvalidTransitionError(db.scalar(select(models.Order.status).where(models.Order.id == order_id)), status)
     db.commit()
-    db.refresh(db_order)
+    for name, value in values.items():
+        set_committed_value(db_order, name, value)
+    bus.publish(ORDER_STATUS_CHANGED, _order_event(db_order))
     return db_order
 
 # --------------------
 # INVENTORY CRUD
 # --------------------
 
-def get_inventory_items(db: Session, skip: int = 0, limit: int = 100) -> List[models.InventoryItem]:
-    """Retrieve a list of inventory items."""
-    return db.query(models.InventoryItem).offset(skip).limit(limit).all()
+def get_inventory_items(
+    db: Session, skip: int = 0, limit: int = 100, after: Optional[int] = None
+) -> List[models.InventoryItem]:
+    """Retrieve a page of inventory items in ID order, starting after the ``after`` ID."""
+    query = db.query(models.InventoryItem)
+    if after is not None:
+        query = query.filter(models.InventoryItem.id > after)
+    return query.order_by(models.InventoryItem.id).offset(skip).limit(limit).all()
+
+
+def get_inventory_item_rows(
+    db: Session, skip: int = 0, limit: int = 100, after: Optional[int] = None
+) -> List[Dict]:
+    """get_inventory_items as projected rows, for serializing straight to JSON."""
+    stmt = select(*_INVENTORY_COLUMNS)
+    if after is not None:
+        stmt = stmt.where(models.InventoryItem.id > after)
+    return _records(
+        db.execute(stmt.order_by(models.InventoryItem.id).offset(skip).limit(limit)), _INVENTORY_FIELDS
+    )
+
+
+def get_inventory_changes(db: Session, since: int = 0, limit: int = 500) -> Dict:
+    """Inventory items written or deleted after change version ``since`` (see app.changes)."""
+    return _changes(db, models.InventoryItem, _INVENTORY_COLUMNS, _INVENTORY_FIELDS, since, limit)
+
+
+def get_low_stock_items(db: Session, limit: int = 100, after: Optional[int] = None) -> List[models.InventoryItem]:
+    """Retrieve inventory items at or below their threshold, via the low-stock partial index."""
+    query = db.query(models.InventoryItem).filter(models.InventoryItem.low_stock.is_(True))
+    if after is not None:
+        query = query.filter(models.InventoryItem.id > after)
+    return query.order_by(models.InventoryItem.id).limit(limit).all()
+
+
+def _refresh_low_stock(db: Session, ids: List[int]) -> List[Dict]:
+    """
+    Bring the low_stock flag of ``ids`` up to date inside the current
+    transaction. Returns the rows that just crossed below their threshold;
+    since the flag flips under the write lock, each crossing is reported once.
+    """
+    item = models.InventoryItem
+    is_low = item.threshold.is_not(None) & (item.quantity <= item.threshold)
+    db.execute(
+        update(item)
+        .where(item.id.in_(ids), item.low_stock.is_(True), ~is_low)
+        .values(low_stock=False)
+        .execution_options(synchronize_session=False)
+    )
+    crossed = db.execute(
+        update(item)
+        .where(item.id.in_(ids), item.low_stock.is_(False), is_low)
+        .values(low_stock=True)
+        .returning(item.id, item.branch_id, item.name, item.quantity, item.unit, item.threshold)
+        .execution_options(synchronize_session=False)
+    )
+    return [
+        {"inventory_item_id": row.id, "branch_id": row.branch_id, "name": row.name, "quantity": row.quantity,
+         "unit": row.unit, "threshold": row.threshold}
+        for row in crossed
+    ]
+
+
+def _publish_low_stock(crossings: List[Dict]) -> None:
+    for crossing in crossings:
+        bus.publish(LOW_STOCK, crossing)
 
 
 def get_inventory_item(db: Session, item_id: int) -> models.InventoryItem:
@@ -122,27 +784,101 @@ def create_inventory_item(db: Session, item: schemas.InventoryItemCreate) -> mod
         threshold=item.threshold,
     )
     db.add(db_item)
+    with _unique_name(db, item.name):
+        db.flush()
+    crossings = _refresh_low_stock(db, [db_item.id])
     db.commit()
     db.refresh(db_item)
+    _publish_low_stock(crossings)
     return db_item
 
 
 def update_inventory_item(db: Session, item_id: int, item: schemas.InventoryItemCreate) -> models.InventoryItem:
-    """Update an existing inventory item."""
+    """Update an existing inventory item; a threshold left out of the payload is kept."""
     db_item = db.query(models.InventoryItem).filter(models.InventoryItem.id == item_id).first()
     if not db_item:
         return None
-    for field, value in item.dict().items():
+    for field, value in item.model_dump(exclude_unset=True).items():
         setattr(db_item, field, value)
+    with _unique_name(db, item.name):
+        db.flush()
+    crossings = _refresh_low_stock(db, [item_id])
     db.commit()
     db.refresh(db_item)
+    _publish_low_stock(crossings)
     return db_item
 
 
+def upsert_inventory_items(
+    db: Session, items: List[schemas.InventoryItemCreate], batch_size: int = 500
+) -> Tuple[int, int]:
+    """
+    Create or update inventory items matched by name, in batched upserts
+    and one transaction, keeping low-stock flags and alerts in step.
+    Returns (created, updated).
+    """
+    if not items:
+        return 0, 0
+    ids, existing = _upsert_by_name(
+        db, models.InventoryItem, [item.model_dump(exclude_unset=True) for item in items], batch_size
+    )
+    crossings = _refresh_low_stock(db, ids)
+    db.commit()
+    _publish_low_stock(crossings)
+    return len(ids) - existing, existing
+
+
 def delete_inventory_item(db: Session, item_id: int) -> bool:
     """Delete an inventory record."""
-    deleted = db.query(models.InventoryItem).filter(models.InventoryItem.id == item_id).delete()
-    if deleted:
-        db.commit()
-        return True
-    return False
+    if db.scalar(select(models.InventoryItem.id).where(models.InventoryItem.id == item_id)) is None:
+        return False
+    # recipe lines first: foreign keys are enforced
+    db.query(models.RecipeItem).filter(models.RecipeItem.inventory_item_id == item_id).delete()
+    db.query(models.InventoryItem).filter(models.InventoryItem.id == item_id).delete()
+    changes.tombstone(db, models.InventoryItem, [item_id])
+    db.commit()
+    return True
+
+# --------------------
+# ANALYTICS
+# --------------------
+
+def get_revenue(
+    db: Session, period: str = analytics.HOUR, since: Optional[datetime] = None, until: Optional[datetime] = None
+) -> List:
+    """Orders and revenue per hour or day in [since, until), from the ticket rollup."""
+    rollup = models.TicketRollup
+    query = db.query(rollup.bucket, rollup.orders, rollup.revenue).filter(rollup.period == period)
+    if since is not None:
+        query = query.filter(rollup.bucket >= analytics.bucket_start(period, since))
+    if until is not None:
+        query = query.filter(rollup.bucket < analytics.bucket_start(period, until))
+    return query.order_by(rollup.bucket).all()
+
+
+def get_top_items(
+    db: Session, since: Optional[datetime] = None, until: Optional[datetime] = None, limit: int = 10
+) -> List:
+    """Best-selling menu items by units sold in [since, until), from the sales rollup."""
+    rollup = models.SalesRollup
+    quantity = func.sum(rollup.quantity).label("quantity")
+    return (
+        db.query(rollup.menu_item_id, models.MenuItem.name, quantity, func.sum(rollup.revenue).label("revenue"))
+        .outerjoin(models.MenuItem, models.MenuItem.id == rollup.menu_item_id)
+        .filter(analytics.rollup_filter(rollup, since, until))
+        .group_by(rollup.menu_item_id, models.MenuItem.name)
+        .order_by(quantity.desc(), rollup.menu_item_id)
+        .limit(limit)
+        .all()
+    )
+
+
+def get_ticket_stats(db: Session, since: Optional[datetime] = None, until: Optional[datetime] = None) -> dict:
+    """Order count, revenue and average ticket size in [since, until), from the ticket rollup."""
+    rollup = models.TicketRollup
+    orders, revenue = (
+        db.query(func.coalesce(func.sum(rollup.orders), 0), func.coalesce(func.sum(rollup.revenue), 0.0))
+        .filter(analytics.rollup_filter(rollup, since, until))
+        .one()
+    )
+    return {"orders": orders, "revenue": revenue, "average_ticket": revenue / orders if orders else 0.0}
@@ -1,19 +1,300 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import declarative_base, sessionmaker
+import logging
+import os
+from typing import Any, Dict, List, NamedTuple, Optional, Union
 
-DATABASE_URL = "sqlite:///./eato.db"  # Later: PostgreSQL when scaling
-engine = create_engine(
-    DATABASE_URL, connect_args={"check_same_thread": False}  # SQLite only
+from fastapi import Depends, Header, Request
+from sqlalchemy import create_engine, event, make_url, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, declarative_base, sessionmaker
+
+from app.metrics import timed_pool_class
+from app.replicas import ReplicaSet, pinned_to_primary
+
+logger = logging.getLogger(__name__)
+
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.getenv(name, str(default)))
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    return os.getenv(name, "1" if default else "0").strip().lower() in ("1", "true", "yes", "on")
+
+
+# ---------------------------------------------------
+# Settings (all overridable from the environment)
+# ---------------------------------------------------
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./eato.db")
+# "async" (default): handlers await an AsyncSession on an async driver.
+# "sync": crud runs on a blocking Session in the threadpool, for comparison.
+DB_MODE = os.getenv("DB_MODE", "async").lower()
+if DB_MODE not in ("async", "sync"):
+    raise ValueError(f"DB_MODE must be 'async' or 'sync', got {DB_MODE!r}")
+
+# Connection pool (ignored for in-memory SQLite, which keeps one connection)
+DB_POOL_SIZE = _env_int("DB_POOL_SIZE", 5)
+DB_MAX_OVERFLOW = _env_int("DB_MAX_OVERFLOW", 10)
+DB_POOL_PRE_PING = _env_bool("DB_POOL_PRE_PING", True)
+DB_POOL_RECYCLE = _env_int("DB_POOL_RECYCLE", 1800)  # seconds, -1 disables
+
+# Branches (restaurants) served by this process. Each request names its
+# branch in the X-Branch-ID header; without one it belongs to DEFAULT_BRANCH.
+# Every branch lives in DATABASE_URL unless BRANCH_DATABASES gives it a
+# database of its own (a shard), e.g. "2=sqlite:///./branch2.db,3=postgresql://...".
+DEFAULT_BRANCH = 1
+BRANCH_HEADER = "X-Branch-ID"
+
+
+def parse_branch_databases(value: str) -> Dict[int, str]:
+    """``"2=url,3=url"`` -> {2: url, 3: url}."""
+    databases: Dict[int, str] = {}
+    for entry in filter(None, (part.strip() for part in value.split(","))):
+        branch, sep, url = entry.partition("=")
+        if not sep or not branch.strip().isdigit() or not url.strip():
+            raise ValueError(f"BRANCH_DATABASES entries look like '2=sqlite:///./branch2.db', got {entry!r}")
+        databases[int(branch)] = url.strip()
+    return databases
+
+
+BRANCH_DATABASES = parse_branch_databases(os.getenv("BRANCH_DATABASES", ""))
+
+# Read-only replicas of DATABASE_URL, comma-separated; GET handlers read
+# from them (see app.replicas). Branch databases have no replicas.
+DATABASE_REPLICAS = [url.strip() for url in os.getenv("DATABASE_REPLICAS", "").split(",") if url.strip()]
+
+# SQLite connect-time pragmas: WAL lets readers proceed while a writer holds
+# the lock, and busy_timeout makes writers wait instead of failing with
+# "database is locked". Foreign keys are enforced, as PostgreSQL does.
+SQLITE_PRAGMAS = {
+    "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "busy_timeout": _env_int("SQLITE_BUSY_TIMEOUT_MS", 5000),
+    "mmap_size": _env_int("SQLITE_MMAP_SIZE", 256 * 1024 * 1024),
+    "cache_size": _env_int("SQLITE_CACHE_SIZE", -64000),  # negative = KiB
+    "foreign_keys": "ON",
+}
+
+
+def is_sqlite(url: str) -> bool:
+    return make_url(url).get_backend_name() == "sqlite"
+
+
+def _is_memory_sqlite(url: str) -> bool:
+    database = make_url(url).database
+    return not database or database == ":memory:" or "mode=memory" in url
+
+
+def engine_options(url: str) -> Dict[str, Any]:
+    """Keyword arguments for create_engine/create_async_engine for this URL."""
+    # the pool the dialect would pick, with checkout waits timed for /metrics
+    parsed = make_url(url)
+    pool_class = timed_pool_class(parsed.get_dialect().get_pool_class(parsed))
+    options: Dict[str, Any] = {"pool_pre_ping": DB_POOL_PRE_PING, "poolclass": pool_class}
+    if is_sqlite(url):
+        options["connect_args"] = {"check_same_thread": False}
+        if _is_memory_sqlite(url):
+            return options
+    options.update(
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_recycle=DB_POOL_RECYCLE,
+    )
+    return options
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+    finally:
+        cursor.close()
+
+
+def configure_engine(sync_engine: Engine) -> Engine:
+    """Attach connect-time hooks (SQLite pragmas) to a sync engine."""
+    if sync_engine.dialect.name == "sqlite":
+        event.listen(sync_engine, "connect", _set_sqlite_pragmas)
+    return sync_engine
+
+
+def upsert_insert(db: Session, table):
+    """insert() for ``table`` with on_conflict_do_update(), in the session's dialect."""
+    from sqlalchemy.dialects import postgresql, sqlite
+
+    dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+    return dialect.insert(table)
+
+
+def to_async_url(url: str) -> str:
+    """Map a sync database URL onto its async driver (aiosqlite / asyncpg)."""
+    scheme, rest = url.split(":", 1)
+    dialect = scheme.split("+", 1)[0]
+    if dialect == "postgres":
+        dialect = "postgresql"
+    driver = {"sqlite": "aiosqlite", "postgresql": "asyncpg"}.get(dialect)
+    if driver is None:
+        return url
+    return f"{dialect}+{driver}:{rest}"
+
+
+# ---------------------------------------------------
+# Engines and sessions
+# ---------------------------------------------------
+class Shard(NamedTuple):
+    """One database and its session factories; several branches may share it."""
+    url: str
+    engine: Engine
+    # expire_on_commit=False keeps committed objects loaded, so responses built
+    # right after a commit do not trigger another round-trip per attribute.
+    session: sessionmaker
+    async_engine: Optional[AsyncEngine] = None
+    async_session: Optional[async_sessionmaker] = None
+    # read replicas of this database, themselves Shards without replicas
+    replicas: ReplicaSet = ReplicaSet()
+
+
+def _open_shard(url: str) -> Shard:
+    sync_engine = configure_engine(create_engine(url, **engine_options(url)))
+    session = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=sync_engine)
+    shard = Shard(url, sync_engine, session)
+    if DB_MODE == "async":
+        async_url = to_async_url(url)
+        async_engine = create_async_engine(async_url, **engine_options(async_url))
+        configure_engine(async_engine.sync_engine)
+        shard = shard._replace(
+            async_engine=async_engine,
+            async_session=async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False),
+        )
+    return shard
+
+
+default_shard = _open_shard(DATABASE_URL)._replace(
+    replicas=ReplicaSet([_open_shard(url) for url in DATABASE_REPLICAS])
 )
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# one shard per distinct database, however many branches point at it
+_shards: Dict[str, Shard] = {DATABASE_URL: default_shard}
+for _url in BRANCH_DATABASES.values():
+    if _url not in _shards:
+        _shards[_url] = _open_shard(_url)
+_branch_shards: Dict[int, Shard] = {branch: _shards[url] for branch, url in BRANCH_DATABASES.items()}
+
+engine = default_shard.engine
+SessionLocal = default_shard.session
 Base = declarative_base()
 
-def get_db():
+# Either session flavour, depending on DB_MODE
+DbSession = Union[Session, AsyncSession]
+
+ASYNC_DATABASE_URL = to_async_url(DATABASE_URL)
+async_engine = default_shard.async_engine
+AsyncSessionLocal = default_shard.async_session
+
+
+def shards() -> List[Shard]:
+    """Every primary database this process talks to, the default one first (replicas hang off each)."""
+    return list(_shards.values())
+
+
+def shard_for(branch_id: int) -> Shard:
+    return _branch_shards.get(branch_id, default_shard)
+
+
+def branch_session(branch_id: int) -> Session:
+    """A blocking session on the branch's database, scoped to the branch (see app.branches)."""
+    return shard_for(branch_id).session(info={"branch_id": branch_id})
+
+
+def reader_for(branch_id: int, primary: bool = False) -> Shard:
+    """Where to read the branch from: a healthy replica of its database, else (or with ``primary``) the database itself."""
+    shard = shard_for(branch_id)
+    replica = None if primary else shard.replicas.pick()
+    return replica or shard
+
+
+def read_session(branch_id: int) -> Session:
+    """Like branch_session, on a replica when one is healthy; for reads that tolerate replication lag."""
+    return reader_for(branch_id).session(info={"branch_id": branch_id})
+
+
+def check_database() -> Dict[str, Any]:
+    """
+    Startup self-check: open a connection, read back the effective settings
+    and log them. Returns the settings so callers and tests can inspect them.
+    """
+    settings: Dict[str, Any] = {
+        "url": make_url(DATABASE_URL).render_as_string(hide_password=True),
+        "mode": DB_MODE,
+        "pool": type(engine.pool).__name__,
+        "replicas": len(DATABASE_REPLICAS),
+    }
+    settings.update(
+        (key, value) for key, value in engine_options(DATABASE_URL).items() if key != "connect_args"
+    )
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        if engine.dialect.name == "sqlite":
+            for name in SQLITE_PRAGMAS:
+                settings[name] = conn.exec_driver_sql(f"PRAGMA {name}").scalar()
+    logger.info("Database settings: %s", ", ".join(f"{k}={v}" for k, v in settings.items()))
+
+    journal_mode = settings.get("journal_mode")
+    if journal_mode and not _is_memory_sqlite(DATABASE_URL) and str(journal_mode).lower() != "wal":
+        logger.warning("SQLite is not in WAL mode (journal_mode=%s); readers will block on writers", journal_mode)
+    return settings
+
+
+def get_branch_id(x_branch_id: int = Header(DEFAULT_BRANCH, alias=BRANCH_HEADER, ge=1)) -> int:
+    """
+    Dependency that reads the request's branch from the X-Branch-ID header.
+    """
+    return x_branch_id
+
+
+def get_sync_db(branch_id: int = Depends(get_branch_id)):
+    """
+    Dependency that provides a SQLAlchemy session on the request's branch
+    and ensures it's closed.
+    """
+    db = branch_session(branch_id)
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_db(branch_id: int = Depends(get_branch_id)):
+    """
+    Dependency that provides an AsyncSession on the request's branch and
+    ensures it's closed.
+    """
+    async with shard_for(branch_id).async_session(info={"branch_id": branch_id}) as db:
+        yield db
+
+
+def get_sync_read_db(request: Request, branch_id: int = Depends(get_branch_id)):
     """
-    Dependency that provides a SQLAlchemy session and ensures it's closed.
+    Dependency that provides a read session on the request's branch: on a
+    replica, unless the client wrote recently (see app.replicas).
     """
-    db = SessionLocal()
+    db = reader_for(branch_id, pinned_to_primary(request)).session(info={"branch_id": branch_id})
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+async def get_async_read_db(request: Request, branch_id: int = Depends(get_branch_id)):
+    """
+    Dependency that provides a read AsyncSession on the request's branch:
+    on a replica, unless the client wrote recently (see app.replicas).
+    """
+    async with reader_for(branch_id, pinned_to_primary(request)).async_session(info={"branch_id": branch_id}) as db:
+        yield db
+
+
+# Routers depend on get_db for writes and get_read_db for reads; DB_MODE
+# decides which session flavour they receive
+get_db = get_async_db if DB_MODE == "async" else get_sync_db
+get_read_db = get_async_read_db if DB_MODE == "async" else get_sync_read_db
@@ -0,0 +1,70 @@
+# ---------------------------------------------------
+# app/events.py
+# ---------------------------------------------------
+"""
+In-process publish/subscribe for domain events.
+
+crud functions publish after they commit (e.g. "order.created");
+consumers such as the alert dispatcher and the kitchen feed subscribe to a
+topic prefix. Callbacks run synchronously in the publishing thread, which
+may be a threadpool worker, and under the bus lock so every subscriber
+sees events in ID order. They must be quick, thread-safe and must not
+publish themselves (typically they hand the event to an asyncio queue).
+"""
+import itertools
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Event:
+    id: int                 # monotonically increasing within this process
+    topic: str              # e.g. "inventory.low_stock"
+    data: Dict[str, Any]    # JSON-serializable payload
+
+
+Subscriber = Callable[[Event], None]
+
+
+class EventBus:
+    def __init__(self):
+        self._ids = itertools.count(1)
+        self._subscribers: List[Tuple[str, Subscriber]] = []
+        self._lock = threading.RLock()
+
+    def subscribe(self, prefix: str, callback: Subscriber) -> Callable[[], None]:
+        """Call ``callback`` for every event whose topic starts with ``prefix``.
+        Returns a function that removes the subscription."""
+        entry = (prefix, callback)
+        with self._lock:
+            self._subscribers.append(entry)
+
+        def unsubscribe():
+            with self._lock:
+                if entry in self._subscribers:
+                    self._subscribers.remove(entry)
+
+        return unsubscribe
+
+    def publish(self, topic: str, data: Dict[str, Any]) -> Event:
+        with self._lock:
+            event = Event(next(self._ids), topic, data)
+            for prefix, callback in self._subscribers:
+                if topic.startswith(prefix):
+                    try:
+                        callback(event)
+                    except Exception:
+                        logger.exception("Subscriber %r failed on %s", callback, topic)
+        return event
+
+
+bus = EventBus()
+
+# Topics
+ORDER_CREATED = "order.created"
+ORDER_STATUS_CHANGED = "order.status_changed"
+LOW_STOCK = "inventory.low_stock"
@@ -0,0 +1,102 @@
+# ---------------------------------------------------
+# app/export.py
+# ---------------------------------------------------
+"""
+Streaming order export (NDJSON or CSV) for accounting.
+
+Rows come from crud.iter_order_lines in batches and each batch is encoded
+and handed to the response before the next one is fetched, so memory stays
+flat however many orders are exported. The export runs on its own
+blocking session on the requested branch: StreamingResponse drives the
+generator in the threadpool, which works the same in both DB modes.
+"""
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Callable, Iterable, Iterator, Optional, Sequence
+
+import app.crud as crud
+from app.database import DEFAULT_BRANCH, branch_session
+
+FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+CSV_COLUMNS = [
+    "order_id", "branch_id", "timestamp", "status", "customer_name", "table_number", "order_total", "item_count",
+    "in_kitchen_at", "ready_at", "served_at", "cancelled_at", "line_id", "menu_item_id", "quantity", "unit_price", "line_total",
+]
+
+
+def _iso(ts: Optional[datetime]) -> Optional[str]:
+    return ts.isoformat() if ts is not None else None
+
+
+def ndjson_chunks(batches: Iterable[Sequence]) -> Iterator[str]:
+    """One JSON object per order, shaped like GET /orders/{id}."""
+    dumps = json.JSONEncoder(separators=(",", ":")).encode
+    current = None
+    for rows in batches:
+        out = []
+        for (order_id, branch_id, customer_name, table_number, status, ts, total, item_count,
+             in_kitchen_at, ready_at, served_at, cancelled_at,
+             line_id, menu_item_id, quantity, unit_price) in rows:
+            if current is None or current["id"] != order_id:
+                if current is not None:
+                    out.append(dumps(current))
+                current = {
+                    "customer_name": customer_name, "table_number": table_number,
+                    "id": order_id, "branch_id": branch_id, "status": status, "timestamp": _iso(ts),
+                    "total": total, "item_count": item_count, "items": [],
+                    "in_kitchen_at": _iso(in_kitchen_at), "ready_at": _iso(ready_at),
+                    "served_at": _iso(served_at), "cancelled_at": _iso(cancelled_at),
+                }
+            if line_id is not None:
+                current["items"].append({
+                    "menu_item_id": menu_item_id, "quantity": quantity, "id": line_id, "unit_price": unit_price,
+                })
+        # an order's lines may continue in the next batch; it is written
+        # once a different order starts
+        if out:
+            yield "\n".join(out) + "\n"
+    if current is not None:
+        yield dumps(current) + "\n"
+
+
+def csv_chunks(batches: Iterable[Sequence]) -> Iterator[str]:
+    """One CSV row per order line (order columns repeated), with a header."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_COLUMNS)
+    for rows in batches:
+        writer.writerows(
+            (
+                order_id, branch_id, _iso(ts), status, customer_name, table_number, total, item_count,
+                _iso(in_kitchen_at), _iso(ready_at), _iso(served_at), _iso(cancelled_at),
+                line_id, menu_item_id, quantity, unit_price,
+                quantity * unit_price if line_id is not None else None,
+            )
+            for order_id, branch_id, customer_name, table_number, status, ts, total, item_count,
+                in_kitchen_at, ready_at, served_at, cancelled_at,
+                line_id, menu_item_id, quantity, unit_price in rows
+        )
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():  # header only: nothing in range
+        yield buffer.getvalue()
+
+
+def stream_orders(
+    format: str,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    branch_id: int = DEFAULT_BRANCH,
+    session_factory: Optional[Callable] = None,
+) -> Iterator[str]:
+    """Encoded export chunks of one branch; the session lives exactly as long as the stream."""
+    encode = ndjson_chunks if format == "ndjson" else csv_chunks
+    with (session_factory() if session_factory is not None else branch_session(branch_id)) as db:
+        yield from encode(crud.iter_order_lines(db, since=since, until=until))
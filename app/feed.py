@@ -0,0 +1,151 @@
+# ---------------------------------------------------
+# app/feed.py
+# ---------------------------------------------------
+"""
+Server-Sent Events feed of order events for kitchen displays.
+
+An EventFeed subscribes once to the event bus and fans each event out to
+per-client bounded queues on the event loop. An idle client costs one
+queue and one suspended generator. Recent events are kept in a ring
+buffer, so a client that reconnects with ``Last-Event-ID`` gets what it
+missed. A client that falls too far behind is disconnected and catches up
+the same way; if the buffer no longer reaches back far enough, it receives
+a ``reset`` event and should reload its state from GET /orders/.
+Clients subscribe to one branch and only see that branch's orders.
+"""
+import asyncio
+import json
+from collections import deque
+from typing import AsyncIterator, Deque, Optional, Set
+
+from app.events import Event, bus
+
+# Events kept for resuming clients
+BUFFER_SIZE = 1000
+# Events queued per client before it is considered stuck and disconnected
+CLIENT_QUEUE_SIZE = 256
+# Seconds between keepalive comments on an idle stream
+KEEPALIVE_INTERVAL = 15.0
+
+
+def format_sse(event: Event) -> str:
+    data = json.dumps(event.data, separators=(",", ":"))
+    return f"id: {event.id}\nevent: {event.topic}\ndata: {data}\n\n"
+
+
+class Subscription:
+    def __init__(self, maxsize: int, branch_id: Optional[int] = None):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize)
+        # Only events of this branch (every branch when None)
+        self.branch_id = branch_id
+        # True when the client must reload full state (missed events are gone)
+        self.reset = False
+
+    def wants(self, event: Event) -> bool:
+        return self.branch_id is None or event.data.get("branch_id") == self.branch_id
+
+
+class EventFeed:
+    def __init__(self, prefix: str, buffer_size: int = BUFFER_SIZE, client_queue_size: int = CLIENT_QUEUE_SIZE):
+        self.prefix = prefix
+        self.client_queue_size = client_queue_size
+        self.disconnected_slow = 0
+        self._buffer: Deque[Event] = deque(maxlen=buffer_size)
+        self._evicted_upto = 0          # highest event ID dropped from the buffer
+        self._subscribers: Set[Subscription] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._unsubscribe = None
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def start(self) -> None:
+        """Begin collecting events; call from the running event loop."""
+        if self._unsubscribe is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._unsubscribe = bus.subscribe(self.prefix, self._on_event)
+
+    def stop(self) -> None:
+        """Stop collecting events and end every open stream."""
+        if self._unsubscribe is not None:
+            self._unsubscribe()
+            self._unsubscribe = None
+        for subscription in list(self._subscribers):
+            self._close(subscription)
+        self._subscribers.clear()
+
+    def _on_event(self, event: Event) -> None:
+        # Bus callbacks may run in threadpool workers; fan out on the loop
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            self._fanout(event)
+        else:
+            self._loop.call_soon_threadsafe(self._fanout, event)
+
+    def _fanout(self, event: Event) -> None:
+        if len(self._buffer) == self._buffer.maxlen:
+            self._evicted_upto = self._buffer[0].id
+        self._buffer.append(event)
+        for subscription in list(self._subscribers):
+            if not subscription.wants(event):
+                continue
+            try:
+                subscription.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # Too slow: drop it; it resumes from the buffer on reconnect
+                self.disconnected_slow += 1
+                self._subscribers.discard(subscription)
+                self._close(subscription)
+
+    @staticmethod
+    def _close(subscription: Subscription) -> None:
+        while not subscription.queue.empty():
+            subscription.queue.get_nowait()
+        subscription.queue.put_nowait(None)
+
+    def subscribe(self, last_event_id: Optional[int] = None, branch_id: Optional[int] = None) -> Subscription:
+        """Register a client, replaying buffered events after ``last_event_id``."""
+        subscription = Subscription(self.client_queue_size, branch_id)
+        if last_event_id is not None:
+            latest = self._buffer[-1].id if self._buffer else self._evicted_upto
+            missed = [event for event in self._buffer if event.id > last_event_id and subscription.wants(event)]
+            # IDs from before a restart, older than the buffer, or more missed
+            # events than the client queue holds: state is unknown
+            subscription.reset = (
+                last_event_id > latest
+                or last_event_id < self._evicted_upto
+                or len(missed) > self.client_queue_size
+            )
+            for event in missed[-self.client_queue_size:]:
+                subscription.queue.put_nowait(event)
+        self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self._subscribers.discard(subscription)
+
+    async def stream(self, subscription: Subscription, keepalive: float = KEEPALIVE_INTERVAL) -> AsyncIterator[str]:
+        """Yield SSE frames for one client until it disconnects or is dropped."""
+        try:
+            yield "retry: 2000\n\n"
+            if subscription.reset:
+                yield "event: reset\ndata: {}\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscription.queue.get(), keepalive)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if event is None:
+                    return
+                yield format_sse(event)
+        finally:
+            self.unsubscribe(subscription)
+
+
+order_feed = EventFeed("order.")
@@ -0,0 +1,168 @@
+# ---------------------------------------------------
+# app/idempotency.py
+# ---------------------------------------------------
+"""
+Idempotency-Key support for POST /orders/.
+
+Tablets on flaky Wi-Fi retry order submissions. A request that carries an
+``Idempotency-Key`` header runs once. Its response is stored in
+idempotency_keys in the same transaction as the order, and a retry with the
+same key gets those bytes back (marked ``Idempotent-Replayed: true``) instead
+of placing another order.
+
+- An LRU of recent responses answers most retries without a query.
+- Concurrent requests with one key in this process wait for the one already
+  running and share its outcome. Across processes the table's primary key
+  decides: the loser rolls back and replays the winner's row.
+- Keys are namespaced by a scope (the branch), so clients of different
+  scopes cannot collide.
+- A key reused with a different body is rejected. Failed requests store
+  nothing, so retrying them runs them again. Keys expire after
+  IDEMPOTENCY_TTL_HOURS.
+"""
+import asyncio
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from typing import Any, Awaitable, Callable, Dict, Hashable, NamedTuple, Optional, Tuple
+
+IDEMPOTENCY_TTL = timedelta(hours=float(os.getenv("IDEMPOTENCY_TTL_HOURS", "24")))
+MAX_KEY_LENGTH = 255
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+
+class KeyReusedError(Exception):
+    """Raised when a key comes back with a different request body."""
+
+    def __init__(self, key: str):
+        self.key = key
+        super().__init__(f"Idempotency-Key {key!r} was already used for a different request")
+
+
+class KeyInUseError(Exception):
+    """Raised when another process stores the key first and its response cannot be read yet."""
+
+    def __init__(self, key: str):
+        self.key = key
+        super().__init__(f"Idempotency-Key {key!r} is in use by another request")
+
+
+class StoredResponse(NamedTuple):
+    request_hash: str
+    status_code: int
+    body: bytes
+
+
+def request_hash(body: str) -> str:
+    return hashlib.sha256(body.encode()).hexdigest()
+
+
+def _stored(record: Any) -> Optional[StoredResponse]:
+    """StoredResponse from a models.IdempotencyKey row (or None)."""
+    if record is None:
+        return None
+    return StoredResponse(record.request_hash, record.status_code, record.response.encode())
+
+
+class IdempotencyStore:
+    """LRU of stored responses plus the requests currently running, by (scope, key)."""
+
+    def __init__(self, max_entries: int = 10_000, ttl: timedelta = IDEMPOTENCY_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl.total_seconds()
+        self.replays = 0
+        # (scope, key) -> (monotonic time stored, response)
+        self._entries: "OrderedDict[Tuple[Hashable, str], Tuple[float, StoredResponse]]" = OrderedDict()
+        self._in_flight: Dict[Tuple[Hashable, str], asyncio.Future] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str, scope: Hashable = None) -> Optional[StoredResponse]:
+        slot = (scope, key)
+        with self._lock:
+            entry = self._entries.get(slot)
+            if entry is None:
+                return None
+            stored_at, stored = entry
+            if time.monotonic() - stored_at > self.ttl:
+                del self._entries[slot]
+                return None
+            self._entries.move_to_end(slot)
+            return stored
+
+    def put(self, key: str, stored: StoredResponse, scope: Hashable = None) -> None:
+        slot = (scope, key)
+        with self._lock:
+            self._entries[slot] = (time.monotonic(), stored)
+            self._entries.move_to_end(slot)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    async def run(
+        self,
+        key: str,
+        request_hash: str,
+        lookup: Callable[[], Awaitable[Any]],
+        execute: Callable[[], Awaitable[Any]],
+        scope: Hashable = None,
+    ) -> Tuple[StoredResponse, bool]:
+        """
+        Return (response, replayed) for ``key`` in ``scope``: from the LRU, from the
+        request already running with this key, from the table via
+        ``lookup()``, or by awaiting ``execute()``, which must store the key
+        with its response and may raise KeyInUseError if another process
+        got there first. Both return a models.IdempotencyKey row.
+        Raises KeyReusedError if the stored request hash differs.
+        """
+        while True:
+            stored, replayed = self.get(key, scope), True
+            if stored is None:
+                running = self._in_flight.get((scope, key))
+                if running is not None:
+                    await asyncio.wait([running])
+                    if running.cancelled():
+                        continue  # the first request was abandoned; try again
+                    stored = running.result()
+                else:
+                    stored, replayed = await self._execute(key, scope, lookup, execute)
+            break
+        if stored.request_hash != request_hash:
+            raise KeyReusedError(key)
+        if replayed:
+            self.replays += 1
+        return stored, replayed
+
+    async def _execute(self, key, scope, lookup, execute) -> Tuple[StoredResponse, bool]:
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[(scope, key)] = future
+        try:
+            stored, replayed = _stored(await lookup()), True
+            if stored is None:
+                try:
+                    stored, replayed = _stored(await execute()), False
+                except KeyInUseError:
+                    stored = _stored(await lookup())
+                    if stored is None:
+                        raise
+            self.put(key, stored, scope)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as exc:
+            future.set_exception(exc)
+            future.exception()  # waiters re-raise it; nobody else needs to retrieve it
+            raise
+        else:
+            future.set_result(stored)
+        finally:
+            del self._in_flight[(scope, key)]
+        return stored, replayed
+
+
+order_keys = IdempotencyStore()
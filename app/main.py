@@ -1,17 +1,182 @@
+"""
+The EATO app.
+
+Importing this module wires up process-wide instrumentation and event
+subscriptions and builds ``app``; it opens no database connections and
+runs no schema changes (see app.migrations). Serve ``app``, or build one
+with the factory:
+
+    uvicorn app.main:create_app --factory
+
+Run a single worker. Several (--workers, or gunicorn --preload forking
+warmed workers) share the databases but nothing held in memory:
+
+- the kitchen feed (GET /orders/stream) only carries events of orders
+  written through its own worker, and its event IDs are per worker, so
+  kitchen displays need the single worker;
+- admission limits and rate limits are counted per worker, so N workers
+  admit N times ADMISSION_CONCURRENCY.
+
+The menu cache is per worker too, but checks its entries against the
+menu change version in the database, so it stays correct with several.
+"""
+import logging
+import os
+from datetime import datetime
+
 from fastapi import FastAPI
-from app.database import engine, Base
-import app.models # ensure ORM classes are loaded
+from fastapi.responses import PlainTextResponse
+from sqlalchemy.orm import configure_mappers
+from app.admission import PRIORITIES, AdmissionMiddleware, admission_gate
+from app.database import check_database, shards
+import app.alerts as alerts
+import app.metrics as metrics
+import app.migrations as migrations
+from app.cache import menu_cache
+from app.events import LOW_STOCK, ORDER_CREATED, ORDER_STATUS_CHANGED, bus
+from app.feed import order_feed
+from app.models import STATUS_TIMESTAMPS  # also loads the ORM classes
+from app.replicas import ReadYourWritesMiddleware, replica_monitor, safe_url
+
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"))
+logger = logging.getLogger(__name__)
+
+def _databases():
+    """Every shard and every replica."""
+    for shard in shards():
+        yield shard
+        yield from shard.replicas.replicas
+
+# SQL statement counts and DB time per request, on every database (pool
+# waits are timed by the pool class app.database creates engines with)
+for database in _databases():
+    metrics.instrument_engine(database.engine)
+    if database.async_engine is not None:
+        metrics.instrument_engine(database.async_engine.sync_engine)
+
+def _reset_pools():
+    """A forked worker starts with empty pools instead of sharing the parent's connections."""
+    for database in _databases():
+        database.engine.dispose(close=False)
+        if database.async_engine is not None:
+            database.async_engine.sync_engine.dispose(close=False)
+
+os.register_at_fork(after_in_child=_reset_pools)
+
+def _app_gauges():
+    cache = menu_cache.stats()
+    return (
+        metrics.gauge_lines("eato_menu_cache_lookups", "Menu cache lookups since start.", {
+            (("result", "hit"),): cache["hits"], (("result", "miss"),): cache["misses"],
+        })
+        + metrics.gauge_lines("eato_menu_cache_entries", "Responses held in the menu cache.", {(): cache["entries"]})
+        + metrics.gauge_lines("eato_order_feed_subscribers", "Open kitchen feed streams.", {(): order_feed.subscriber_count})
+        + metrics.gauge_lines("eato_db_replica_healthy", "1 while a read replica passes its health check.", {
+            (("replica", safe_url(replica.url)),): float(replica in shard.replicas.healthy)
+            for shard in shards() for replica in shard.replicas.replicas
+        })
+        + metrics.gauge_lines("eato_admission_queued", "Requests waiting for an admission slot, by priority.", {
+            (("priority", priority),): admission_gate.queued(priority) for priority in PRIORITIES
+        })
+        + metrics.gauge_lines("eato_admission_active", "Requests holding an admission slot.", {(): admission_gate.active})
+    )
+
+metrics.add_collector(_app_gauges)
+
+def _observe_order_stage(event):
+    """Prep-time metrics from the lifecycle timestamps of a status change."""
+    order = event.data
+    column = STATUS_TIMESTAMPS.get(order["status"])
+    if column is None or not order.get(column):
+        return
+    earlier = [
+        datetime.fromisoformat(order[name])
+        for name in ("timestamp", "in_kitchen_at", "ready_at") if name != column and order.get(name)
+    ]
+    if earlier:
+        seconds = (datetime.fromisoformat(order[column]) - max(earlier)).total_seconds()
+        metrics.order_stage.observe(seconds, status=order["status"])
+
+bus.subscribe(ORDER_STATUS_CHANGED, _observe_order_stage)
+
+def read_metrics():
+    """Prometheus scrape endpoint."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+# New orders and low-stock crossings become staff alerts (no-op while alerts are disabled)
+bus.subscribe(ORDER_CREATED, alerts.notify_order_created)
+bus.subscribe(LOW_STOCK, alerts.notify_low_stock)
+
+def check_databases():
+    """Refuse to start on a database with pending migrations; schema changes are app.migrations' job."""
+    for shard in shards():
+        migrations.check_schema(shard.engine)
+    check_database()
+
+async def dispose_engines():
+    # aiosqlite keeps a worker thread per pooled connection; close them so
+    # the process can exit
+    for database in _databases():
+        if database.async_engine is not None:
+            await database.async_engine.dispose()
+
+async def start_feed():
+    order_feed.start()
+
+async def stop_feed():
+    order_feed.stop()
+
+async def start_replica_monitor():
+    await replica_monitor.start([shard.replicas for shard in shards()])
+
+async def stop_replica_monitor():
+    await replica_monitor.stop()
+
+async def start_alerts():
+    from app.telegram_bot import build_dispatcher
+
+    try:
+        alerts.dispatcher = build_dispatcher()
+    except (ImportError, ValueError) as exc:
+        logger.info("Telegram alerts disabled: %s", exc)
+        return
+    alerts.dispatcher.start()
+
+async def stop_alerts():
+    if alerts.dispatcher is not None:
+        await alerts.dispatcher.stop()
+        alerts.dispatcher = None
+
+STARTUP = [check_databases, start_feed, start_replica_monitor, start_alerts]
+SHUTDOWN = [dispose_engines, stop_feed, stop_replica_monitor, stop_alerts]
 
-app = FastAPI(title="EATO")
+def create_app() -> FastAPI:
+    """
+    Build the FastAPI app. Cheap and side-effect free: connections, the
+    kitchen feed, replica checks and alerts start in each worker's startup
+    hooks. Mappers are configured here, so a preloading parent hands its
+    workers that work done.
+    """
+    from app.routers import menu, order, inventory, analytics
 
-@app.on_event("startup")
-def create_tables():
-    Base.metadata.create_all(bind=engine)
+    configure_mappers()
+    app = FastAPI(title="EATO")
+    app.add_middleware(ReadYourWritesMiddleware)
+    # inside MetricsMiddleware, so shed requests still show in the request counts
+    app.add_middleware(AdmissionMiddleware)
+    app.add_middleware(metrics.MetricsMiddleware)
 
-from app.routers import menu, order, inventory
+    app.add_api_route("/metrics", read_metrics, response_class=PlainTextResponse, include_in_schema=False)
+    # Include routers (prefixes and tags are declared on each APIRouter)
+    app.include_router(menu.router)
+    app.include_router(order.router)
+    app.include_router(inventory.router)
+    app.include_router(analytics.router)
 
-# Include routers
-app.include_router(menu.router, prefix="/menu", tags=["Menu"])
-app.include_router(order.router, prefix="/orders", tags=["Orders"])
-app.include_router(inventory.router, prefix="/inventory", tags=["Inventory"])
+    for handler in STARTUP:
+        app.add_event_handler("startup", handler)
+    for handler in SHUTDOWN:
+        app.add_event_handler("shutdown", handler)
+    return app
 
+app = create_app()
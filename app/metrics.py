@@ -0,0 +1,273 @@
+# ---------------------------------------------------
+# app/metrics.py
+# ---------------------------------------------------
+"""
+Request and SQL instrumentation, exposed in Prometheus text format.
+
+- MetricsMiddleware (pure ASGI) records per-route latency, status counts
+  and in-flight requests.
+- instrument_engine() hooks SQLAlchemy cursor events to count statements
+  and DB time per request (carried in a ContextVar, which follows the
+  request into threadpool workers and AsyncSession.run_sync) and logs
+  statements slower than SLOW_QUERY_MS when that variable is set.
+- timed_pool_class() times connection-pool checkouts; app.database
+  creates every engine with it.
+- render() produces the /metrics payload; collectors registered with
+  add_collector() contribute gauges computed at scrape time.
+"""
+import bisect
+import contextvars
+import functools
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# Opt-in slow query log: statements slower than this many milliseconds
+_slow = os.getenv("SLOW_QUERY_MS")
+SLOW_QUERY_MS: Optional[float] = float(_slow) if _slow else None
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200)
+WAIT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+STAGE_BUCKETS = (30, 60, 120, 300, 600, 900, 1200, 1800, 2700, 3600, 7200)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _format_labels(labels: Labels, extra: Iterable[Tuple[str, str]] = ()) -> str:
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (
+        (name, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in pairs
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+class Counter:
+    def __init__(self, name: str, help: str):
+        self.name, self.help = name, help
+        self._values: Dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            lines += [f"{self.name}{_format_labels(k)} {v:g}" for k, v in sorted(self._values.items())]
+        return lines
+
+
+class Gauge(Counter):
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        lines[1] = f"# TYPE {self.name} gauge"
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, buckets: Sequence[float]):
+        self.name, self.help = name, help
+        self.buckets = tuple(buckets)
+        # labels -> [bucket counts..., sum, count]
+        self._values: Dict[Labels, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            row = self._values.get(key)
+            if row is None:
+                row = self._values[key] = [0.0] * (len(self.buckets) + 2)
+            if index < len(self.buckets):
+                row[index] += 1
+            row[-2] += value
+            row[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, row in sorted(self._values.items()):
+                cumulative = 0.0
+                for bound, count in zip(self.buckets, row):
+                    cumulative += count
+                    lines.append(f"{self.name}_bucket{_format_labels(key, [('le', f'{bound:g}')])} {cumulative:g}")
+                lines.append(f"{self.name}_bucket{_format_labels(key, [('le', '+Inf')])} {row[-1]:g}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {row[-2]:g}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {row[-1]:g}")
+        return lines
+
+
+# ---------------------------------------------------
+# Metric definitions
+# ---------------------------------------------------
+http_requests = Counter("eato_http_requests_total", "HTTP requests by route and status.")
+http_latency = Histogram("eato_http_request_duration_seconds", "HTTP request latency by route.", LATENCY_BUCKETS)
+http_in_flight = Gauge("eato_http_requests_in_flight", "HTTP requests currently being served.")
+db_statements = Histogram("eato_db_statements_per_request", "SQL statements executed per request.", COUNT_BUCKETS)
+db_time = Histogram("eato_db_time_per_request_seconds", "Time spent in SQL per request.", LATENCY_BUCKETS)
+pool_wait = Histogram("eato_db_pool_checkout_wait_seconds", "Time waiting for a pooled connection.", WAIT_BUCKETS)
+slow_queries = Counter("eato_db_slow_queries_total", "Statements slower than SLOW_QUERY_MS.")
+order_stage = Histogram(
+    "eato_order_stage_seconds", "Time an order spent before entering each status, since the previous one.", STAGE_BUCKETS
+)
+admission_shed = Counter("eato_admission_shed_total", "Requests shed by admission control, by priority and reason.")
+admission_wait = Histogram(
+    "eato_admission_queue_wait_seconds", "Time admitted requests queued for a slot, by priority.", WAIT_BUCKETS
+)
+
+_metrics = [
+    http_requests, http_latency, http_in_flight, db_statements, db_time, pool_wait, slow_queries, order_stage,
+    admission_shed, admission_wait,
+]
+_collectors: List[Callable[[], List[str]]] = []
+
+
+def add_collector(collector: Callable[[], List[str]]) -> None:
+    """Register a callable returning extra exposition lines at scrape time."""
+    _collectors.append(collector)
+
+
+def gauge_lines(name: str, help: str, values: Dict[Labels, float]) -> List[str]:
+    """Exposition lines for a gauge computed at scrape time."""
+    lines = [f"# HELP {name} {help}", f"# TYPE {name} gauge"]
+    lines += [f"{name}{_format_labels(k)} {v:g}" for k, v in values.items()]
+    return lines
+
+
+def render() -> str:
+    lines: List[str] = []
+    for metric in _metrics:
+        lines += metric.render()
+    for collector in _collectors:
+        lines += collector()
+    return "\n".join(lines) + "\n"
+
+
+# ---------------------------------------------------
+# Per-request SQL accounting
+# ---------------------------------------------------
+class RequestStats:
+    __slots__ = ("route", "statements", "db_time")
+
+    def __init__(self, route: str = ""):
+        self.route = route
+        self.statements = 0
+        self.db_time = 0.0
+
+
+current_request: contextvars.ContextVar[Optional[RequestStats]] = contextvars.ContextVar("eato_request", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("eato_query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["eato_query_start"].pop()
+    stats = current_request.get()
+    if stats is not None:
+        stats.statements += 1
+        stats.db_time += elapsed
+    if SLOW_QUERY_MS is not None and elapsed * 1000 >= SLOW_QUERY_MS:
+        slow_queries.inc()
+        logger.warning(
+            "Slow query (%.1f ms) on %s: %s",
+            elapsed * 1000, stats.route if stats else "<no request>", " ".join(statement.split()),
+        )
+
+
+def _handle_error(exception_context):
+    starts = exception_context.connection.info.get("eato_query_start") if exception_context.connection else None
+    if starts:
+        starts.pop()
+
+
+@functools.lru_cache(maxsize=None)
+def timed_pool_class(pool_class: type) -> type:
+    """
+    ``pool_class`` with checkout waits observed in pool_wait; pass it as
+    create_engine(poolclass=...). Pool events only fire once a connection
+    is checked out, too late to time the wait for one.
+    """
+    class TimedPool(pool_class):
+        def connect(self):
+            start = time.perf_counter()
+            try:
+                return super().connect()
+            finally:
+                pool_wait.observe(time.perf_counter() - start)
+
+    TimedPool.__name__ = pool_class.__name__
+    return TimedPool
+
+
+def instrument_engine(engine: Engine) -> Engine:
+    """
+    Attach statement counting and slow-query logging to a sync engine.
+    Pool waits are timed by the engine's pool class (see timed_pool_class).
+    """
+    if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        return engine
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+    return engine
+
+
+# ---------------------------------------------------
+# ASGI middleware
+# ---------------------------------------------------
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(scope["path"])  # replaced by the route template once routed
+        token = current_request.set(stats)
+        method = scope["method"]
+        status = {"code": 500, "streaming": False}
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                for name, value in message.get("headers", ()):
+                    if name == b"content-type" and value.startswith(b"text/event-stream"):
+                        status["streaming"] = True
+            await send(message)
+
+        http_in_flight.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_in_flight.dec()
+            current_request.reset(token)
+            route = getattr(scope.get("route"), "path", "<unmatched>")
+            stats.route = route
+            http_requests.inc(method=method, route=route, status=str(status["code"]))
+            # long-lived event streams would swamp the latency histogram
+            if not status["streaming"]:
+                http_latency.observe(time.perf_counter() - start, method=method, route=route)
+                db_statements.observe(stats.statements, route=route)
+                db_time.observe(stats.db_time, route=route)
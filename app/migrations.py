@@ -0,0 +1,404 @@
+# ---------------------------------------------------
+# app/migrations.py
+# ---------------------------------------------------
+"""
+Versioned schema migrations.
+
+MIGRATIONS lists every step in order, and a database's schema version
+(the schema_version table) is how many of them it has had. Bring every
+database (each shard) up to date with:
+
+    python -m app.migrations
+
+The app never migrates on boot: it checks the version with check_schema()
+and refuses to start on a database that is behind.
+
+Base.metadata.create_all() adds missing tables but never alters existing
+ones. Each step here brings an older database up to date and is safe to
+run again, so databases from before versioning (version 0) run them all.
+A change to the models needs a step of its own, appended to MIGRATIONS:
+the first step creates only the tables a database does not have yet.
+"""
+import logging
+from typing import Dict
+
+from sqlalchemy import Column, delete, func, insert, inspect, select, text, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.sql import visitors
+
+import app.models as models
+from app.branches import SCOPED
+from app.changes import VERSIONED
+from app.database import DEFAULT_BRANCH, Base
+from app.replicas import safe_url
+
+logger = logging.getLogger(__name__)
+
+# Orders backfilled per transaction, so writers are never blocked for long
+BACKFILL_CHUNK = 10_000
+
+
+def _add_columns(engine: Engine, table: str, columns: Dict[str, str]) -> None:
+    existing = {column["name"] for column in inspect(engine).get_columns(table)}
+    with engine.begin() as conn:
+        for name, ddl_type in columns.items():
+            if name not in existing:
+                # added nullable: SQLite cannot add a NOT NULL column without a default
+                conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {name} {ddl_type}"))
+                logger.info("Added %s.%s", table, name)
+
+
+def add_order_totals(engine: Engine, chunk: int = BACKFILL_CHUNK) -> int:
+    """
+    Add order_items.unit_price and orders.total/item_count, then backfill
+    rows that predate them. Old lines are priced at the current menu price
+    (0 for deleted items), the best information left. Returns the number of
+    orders backfilled.
+    """
+    _add_columns(engine, "order_items", {"unit_price": "FLOAT"})
+    _add_columns(engine, "orders", {"total": "FLOAT", "item_count": "INTEGER"})
+
+    order, line, menu = models.Order, models.OrderItem, models.MenuItem
+    line_price = (
+        select(func.coalesce(func.max(menu.price), 0.0)).where(menu.id == line.menu_item_id).scalar_subquery()
+    )
+    order_total = (
+        select(func.coalesce(func.sum(line.quantity * line.unit_price), 0.0))
+        .where(line.order_id == order.id)
+        .scalar_subquery()
+    )
+    order_count = select(func.coalesce(func.sum(line.quantity), 0)).where(line.order_id == order.id).scalar_subquery()
+
+    with engine.connect() as conn:
+        max_id = conn.scalar(select(func.max(order.id))) or 0
+    backfilled = 0
+    for low in range(0, max_id, chunk):
+        high = low + chunk
+        with engine.begin() as conn:
+            conn.execute(
+                update(line)
+                .where(line.unit_price.is_(None), line.order_id > low, line.order_id <= high)
+                .values(unit_price=line_price)
+            )
+            backfilled += conn.execute(
+                update(order)
+                .where(order.total.is_(None), order.id > low, order.id <= high)
+                .values(total=order_total, item_count=order_count)
+            ).rowcount
+
+    if engine.dialect.name == "postgresql":
+        with engine.begin() as conn:
+            conn.execute(text("ALTER TABLE order_items ALTER COLUMN unit_price SET NOT NULL"))
+            conn.execute(text("ALTER TABLE orders ALTER COLUMN total SET NOT NULL"))
+            conn.execute(text("ALTER TABLE orders ALTER COLUMN item_count SET NOT NULL"))
+    return backfilled
+
+
+def unique_item_names(engine: Engine) -> None:
+    """
+    Make names unique per branch in menu_items and inventory_items (bulk
+    imports upsert on (branch_id, name)), replacing the index on name
+    alone. Runs after branch_scoping. A table that already holds duplicate
+    names within a branch is left as it is, with a warning naming them,
+    until they are renamed or merged.
+    """
+    for table in ("menu_items", "inventory_items"):
+        index = f"ix_{table}_branch_name"
+        current = {ix["name"]: ix for ix in inspect(engine).get_indexes(table)}
+        if index in current and current[index]["unique"]:
+            continue
+        with engine.begin() as conn:
+            duplicates = conn.execute(
+                text(f"SELECT branch_id, name FROM {table} GROUP BY branch_id, name HAVING COUNT(*) > 1 LIMIT 10")
+            ).all()
+            if duplicates:
+                logger.warning("Not making %s names unique per branch; duplicates: %s", table, duplicates)
+                continue
+            for name in (f"ix_{table}_name", index):
+                if name in current:
+                    conn.execute(text(f"DROP INDEX {name}"))
+            conn.execute(text(f"CREATE UNIQUE INDEX {index} ON {table} (branch_id, name)"))
+            logger.info("Made %s names unique per branch", table)
+
+
+def order_lifecycle(engine: Engine) -> None:
+    """
+    Add the per-status timestamp columns. Orders keep their status; when
+    earlier transitions happened is unknown, so their timestamps stay NULL.
+    The partial index over active orders leads with branch_id and is built
+    by branch_scoping.
+    """
+    _add_columns(engine, "orders", {column: "TIMESTAMP" for column in models.STATUS_TIMESTAMPS.values()})
+
+
+def _index_columns(index, dialect: str) -> set:
+    """Columns an index covers or filters on (partial indexes)."""
+    columns = {column.name for column in index.columns}
+    where = index.dialect_options[dialect]["where"] if dialect in ("sqlite", "postgresql") else None
+    if where is not None:
+        columns |= {node.name for node in visitors.iterate(where) if isinstance(node, Column)}
+    return columns
+
+
+def _sync_indexes(engine: Engine, model) -> None:
+    """
+    Create the model's non-unique indexes, rebuilding any whose columns
+    changed. Indexes over columns the table does not have yet are skipped.
+    """
+    existing = {column["name"] for column in inspect(engine).get_columns(model.__tablename__)}
+    current = {ix["name"]: ix["column_names"] for ix in inspect(engine).get_indexes(model.__tablename__)}
+    for index in model.__table__.indexes:
+        if index.unique:
+            continue  # may need duplicates resolved first (see unique_item_names)
+        columns = [column.name for column in index.columns]
+        if current.get(index.name) == columns or not _index_columns(index, engine.dialect.name) <= existing:
+            continue
+        with engine.begin() as conn:
+            if index.name in current:
+                conn.execute(text(f"DROP INDEX {index.name}"))
+            index.create(conn)
+        logger.info("Built %s on %s", index.name, columns)
+
+
+def _rekey(engine: Engine, model) -> None:
+    """Give an existing table the model's primary key, keeping its rows."""
+    table = model.__table__
+    key = [column.name for column in table.primary_key]
+    if inspect(engine).get_pk_constraint(table.name)["constrained_columns"] == key:
+        return
+    with engine.begin() as conn:
+        if engine.dialect.name == "postgresql":
+            conn.execute(text(f"ALTER TABLE {table.name} DROP CONSTRAINT {table.name}_pkey"))
+            conn.execute(text(f"ALTER TABLE {table.name} ADD PRIMARY KEY ({', '.join(key)})"))
+        else:
+            # SQLite cannot alter a primary key: copy the rows into a new table
+            old = f"{table.name}_old"
+            conn.execute(text(f"ALTER TABLE {table.name} RENAME TO {old}"))
+            for index in inspect(conn).get_indexes(old):
+                conn.execute(text(f"DROP INDEX {index['name']}"))
+            table.create(conn)
+            columns = ", ".join(column.name for column in table.columns)
+            conn.execute(text(f"INSERT INTO {table.name} ({columns}) SELECT {columns} FROM {old}"))
+            conn.execute(text(f"DROP TABLE {old}"))
+    logger.info("Keyed %s by %s", table.name, key)
+
+
+def branch_scoping(engine: Engine) -> None:
+    """
+    Add branch_id to every branch-owned table (existing rows belong to
+    DEFAULT_BRANCH), lead the order, menu and inventory indexes with it,
+    and key the rollups and idempotency keys by branch.
+    """
+    existing = set(inspect(engine).get_table_names())
+    for model in SCOPED:
+        if model.__tablename__ not in existing:
+            continue
+        _add_columns(engine, model.__tablename__, {"branch_id": f"INTEGER NOT NULL DEFAULT {DEFAULT_BRANCH}"})
+        _rekey(engine, model)
+        _sync_indexes(engine, model)
+
+
+def change_versions(engine: Engine) -> None:
+    """
+    Add the change version (see app.changes) to menu and inventory items.
+    Rows without one take their ID, which is unique as versions must be,
+    and each branch's counter moves past them. Runs after branch_scoping.
+    """
+    counter = models.ChangeCounter
+    for table in (counter.__table__, models.Tombstone.__table__):
+        table.create(engine, checkfirst=True)
+    existing = set(inspect(engine).get_table_names())
+    for model in VERSIONED:
+        table = model.__tablename__
+        if table not in existing:
+            continue
+        _add_columns(engine, table, {"version": "BIGINT NOT NULL DEFAULT 0"})
+        with engine.begin() as conn:
+            conn.execute(update(model.__table__).where(model.version == 0).values(version=model.id))
+            latest = conn.execute(select(model.branch_id, func.max(model.version)).group_by(model.branch_id)).all()
+            for branch_id, version in latest:
+                where = (counter.branch_id == branch_id) & (counter.feed == table)
+                current = conn.scalar(select(counter.version).where(where))
+                if current is None:
+                    conn.execute(insert(counter.__table__).values(branch_id=branch_id, feed=table, version=version))
+                elif current < version:
+                    conn.execute(update(counter.__table__).where(where).values(version=version))
+        _sync_indexes(engine, model)
+
+
+def menu_search_index(engine: Engine) -> None:
+    """Create the menu search index (see app.models.MENU_SEARCH_DDL) and fill it from menu_items."""
+    statements = models.MENU_SEARCH_DDL.get(engine.dialect.name, [])
+    if not statements:
+        return
+    if engine.dialect.name == "sqlite" and inspect(engine).has_table("menu_search"):
+        return
+    with engine.begin() as conn:
+        for statement in statements:
+            conn.execute(text(statement))
+        if engine.dialect.name == "sqlite":
+            conn.execute(text("INSERT INTO menu_search(menu_search) VALUES ('rebuild')"))
+    logger.info("Built the menu search index")
+
+
+def autoincrement_order_ids(engine: Engine) -> None:
+    """
+    Rebuild orders and order_items with AUTOINCREMENT on SQLite, whose
+    plain integer keys reuse max(id) + 1 once the newest rows are archived,
+    and move each table's sequence past the IDs already in the archive.
+    PostgreSQL sequences never go back; nothing to do there.
+    """
+    if engine.dialect.name != "sqlite":
+        return
+    existing = set(inspect(engine).get_table_names())
+    with engine.connect() as conn:
+        # the rebuilt tables are referenced by foreign keys, which must not
+        # follow the rename or block the drop
+        foreign_keys = conn.scalar(text("PRAGMA foreign_keys"))
+        conn.execute(text("PRAGMA foreign_keys=OFF"))
+        conn.execute(text("PRAGMA legacy_alter_table=ON"))
+        try:
+            conn.execute(text("BEGIN"))  # the driver would only begin at the first INSERT
+            for model, archive in ((models.Order, models.OrderArchive), (models.OrderItem, models.OrderItemArchive)):
+                table = model.__table__
+                if table.name not in existing:
+                    continue
+                ddl = conn.scalar(text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                                  {"name": table.name})
+                if "AUTOINCREMENT" not in ddl.upper():
+                    old = f"{table.name}_old"
+                    conn.execute(text(f"ALTER TABLE {table.name} RENAME TO {old}"))
+                    for index in inspect(conn).get_indexes(old):
+                        conn.execute(text(f"DROP INDEX {index['name']}"))
+                    table.create(conn)
+                    columns = ", ".join(column.name for column in table.columns)
+                    conn.execute(text(f"INSERT INTO {table.name} ({columns}) SELECT {columns} FROM {old}"))
+                    conn.execute(text(f"DROP TABLE {old}"))
+                    logger.info("Rebuilt %s with AUTOINCREMENT", table.name)
+                if archive.__tablename__ in existing:
+                    archived = conn.scalar(select(func.max(archive.id))) or 0
+                    current = conn.scalar(text("SELECT seq FROM sqlite_sequence WHERE name = :name"),
+                                          {"name": table.name})
+                    if current is None or current < archived:
+                        conn.execute(text("DELETE FROM sqlite_sequence WHERE name = :name"), {"name": table.name})
+                        conn.execute(text("INSERT INTO sqlite_sequence (name, seq) VALUES (:name, :seq)"),
+                                     {"name": table.name, "seq": archived})
+            conn.commit()
+        finally:
+            conn.rollback()
+            conn.execute(text("PRAGMA legacy_alter_table=OFF"))
+            conn.execute(text(f"PRAGMA foreign_keys={int(foreign_keys)}"))
+
+
+def low_stock_flag(engine: Engine) -> None:
+    """
+    Add inventory_items.low_stock, set it from each row's quantity and
+    threshold, and build the low-stock partial index. Runs after
+    branch_scoping: the index leads with branch_id.
+    """
+    if not inspect(engine).has_table("inventory_items"):
+        return
+    _add_columns(engine, "inventory_items", {"low_stock": "BOOLEAN NOT NULL DEFAULT FALSE"})
+    item = models.InventoryItem
+    with engine.begin() as conn:
+        conn.execute(
+            update(item.__table__).values(low_stock=item.threshold.is_not(None) & (item.quantity <= item.threshold))
+        )
+    _sync_indexes(engine, item)
+
+
+def _create_tables(engine: Engine) -> None:
+    Base.metadata.create_all(bind=engine)
+
+
+def _backfill_order_totals(engine: Engine) -> None:
+    logger.info("Backfilled totals for %d orders", add_order_totals(engine))
+
+
+def _rebuild_rollups(engine: Engine) -> None:
+    """Rebuild the sales rollups, which derive from the backfilled prices."""
+    from sqlalchemy.orm import Session
+
+    import app.analytics as analytics
+
+    with Session(engine) as db:
+        logger.info("Rebuilt sales rollups: %s", analytics.rebuild(db))
+
+
+# ---------------------------------------------------
+# Versions
+# ---------------------------------------------------
+# Append only: a database at version N has had the first N steps
+MIGRATIONS = [
+    _create_tables,
+    _backfill_order_totals,
+    order_lifecycle,
+    branch_scoping,
+    change_versions,
+    unique_item_names,
+    menu_search_index,
+    _rebuild_rollups,
+    autoincrement_order_ids,
+    low_stock_flag,
+]
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+class SchemaVersionError(RuntimeError):
+    """Raised at boot when a database is behind the schema this code expects."""
+
+    def __init__(self, url: str, version: int):
+        self.url = url
+        self.version = version
+        super().__init__(
+            f"Database {url} is at schema version {version}, this code needs {SCHEMA_VERSION}; "
+            "run `python -m app.migrations`"
+        )
+
+
+def schema_version(engine: Engine) -> int:
+    """The database's schema version, 0 for one that is empty or predates versioning."""
+    if not inspect(engine).has_table(models.SchemaVersion.__tablename__):
+        return 0
+    with engine.connect() as conn:
+        return conn.scalar(select(func.max(models.SchemaVersion.version))) or 0
+
+
+def migrate(engine: Engine) -> int:
+    """Run the steps the database has not had, recording each one. Returns its new version."""
+    version = schema_version(engine)
+    for step in MIGRATIONS[version:]:
+        version += 1
+        logger.info("Migrating %s to version %d (%s)", safe_url(str(engine.url)), version, step.__name__.strip("_"))
+        step(engine)
+        with engine.begin() as conn:
+            conn.execute(delete(models.SchemaVersion))
+            conn.execute(insert(models.SchemaVersion).values(version=version))
+    return version
+
+
+def check_schema(engine: Engine) -> int:
+    """
+    Boot check: the database's schema version, read without changing
+    anything. Raises SchemaVersionError when migrations are pending.
+    """
+    version = schema_version(engine)
+    url = safe_url(str(engine.url))
+    if version < SCHEMA_VERSION:
+        raise SchemaVersionError(url, version)
+    if version > SCHEMA_VERSION:
+        # a rollback, or older workers during a rolling deploy
+        logger.warning("Database %s is at schema version %d, newer than this code's %d", url, version, SCHEMA_VERSION)
+    return version
+
+
+def main():
+    from app.database import shards
+
+    logging.basicConfig(level="INFO")
+    for shard in shards():
+        logger.info("%s is at schema version %d", safe_url(shard.url), migrate(shard.engine))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,28 @@
-from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, ForeignKey
+from sqlalchemy import BigInteger, Column, Integer, String, Float, Boolean, DateTime, ForeignKey, Index, UniqueConstraint, DDL, event
 from sqlalchemy.orm import relationship
 from datetime import datetime
-from app.database import Base
+from app.database import Base, DEFAULT_BRANCH
+
+# ---------------------------------------------------
+# BranchOwned: rows belonging to one branch (restaurant); app.branches
+# scopes queries on these models to the session's branch
+# ---------------------------------------------------
+class BranchOwned:
+    # Branch the row belongs to (part of the primary key on tables keyed by branch)
+    branch_id = Column(Integer, nullable=False, default=DEFAULT_BRANCH)
+
 
 # ---------------------------------------------------
 # MenuItem: represents a dish or drink available to order
 # ---------------------------------------------------
-class MenuItem(Base):
+class MenuItem(BranchOwned, Base):
     __tablename__ = "menu_items"  # Table name in the database
 
     # Unique identifier for each menu item
     id = Column(Integer, primary_key=True, index=True)
-    # Name of the dish or drink (e.g., 'Cappuccino', 'Nasi Goreng')
-    name = Column(String, nullable=False, index=True)
+    # Name of the dish or drink (e.g., 'Cappuccino', 'Nasi Goreng');
+    # unique within the branch, so bulk imports can upsert by name
+    name = Column(String, nullable=False)
     # Price in the local currency
     price = Column(Float, nullable=False)
     # Category grouping (e.g., 'Food', 'Drink', 'Dessert')
@@ -21,15 +31,48 @@ class MenuItem(Base):
     available = Column(Boolean, default=True, nullable=False)
     # JSON-encoded string or comma-separated list of ingredients
     ingredients = Column(String, nullable=True)
+    # Change version of the latest write (see app.changes)
+    version = Column(BigInteger, nullable=False, default=0)
 
     # Relationship to OrderItem: one menu item may appear in many orders
     orders = relationship("OrderItem", back_populates="menu_item")
+    # Structured recipe: stock consumed by one portion of this item
+    recipe = relationship("RecipeItem", back_populates="menu_item")
+
+    # Every query is narrowed to one branch, so indexes lead with branch_id
+    __table_args__ = (
+        Index("ix_menu_items_branch_id", "branch_id", "id"),
+        Index("ix_menu_items_branch_name", "branch_id", "name", unique=True),
+        Index("ix_menu_items_branch_version", "branch_id", "version"),
+    )
+
+
+# ---------------------------------------------------
+# Order lifecycle
+# ---------------------------------------------------
+# Statuses move forward one step at a time and any active order may be
+# cancelled; Served and Cancelled are terminal.
+ORDER_TRANSITIONS = {
+    "Received": ("In Kitchen", "Cancelled"),
+    "In Kitchen": ("Ready", "Cancelled"),
+    "Ready": ("Served", "Cancelled"),
+    "Served": (),
+    "Cancelled": (),
+}
+ACTIVE_STATUSES = ("Received", "In Kitchen", "Ready")
+# Column stamped when an order enters each status (Received is Order.timestamp)
+STATUS_TIMESTAMPS = {
+    "In Kitchen": "in_kitchen_at",
+    "Ready": "ready_at",
+    "Served": "served_at",
+    "Cancelled": "cancelled_at",
+}
 
 
 # ---------------------------------------------------
 # Order: represents a customer order
 # ---------------------------------------------------
-class Order(Base):
+class Order(BranchOwned, Base):
     __tablename__ = "orders"
 
     id = Column(Integer, primary_key=True, index=True)  # Unique order ID
@@ -37,14 +80,45 @@ class Order(Base):
     customer_name = Column(String, nullable=True)
     # Table number for dine-in orders
     table_number = Column(Integer, nullable=True)
-    # Order status: Received -> In Kitchen -> Ready
+    # Order status: Received -> In Kitchen -> Ready -> Served, or Cancelled
     status = Column(String, default="Received", nullable=False)
     # Timestamp when the order was created (UTC by default)
     timestamp = Column(DateTime, default=datetime.utcnow)
+    # When the order entered each later status (see STATUS_TIMESTAMPS)
+    in_kitchen_at = Column(DateTime, nullable=True)
+    ready_at = Column(DateTime, nullable=True)
+    served_at = Column(DateTime, nullable=True)
+    cancelled_at = Column(DateTime, nullable=True)
+    # Sum of quantity * unit_price over the lines, set once at creation
+    total = Column(Float, nullable=False, default=0.0)
+    # Number of portions (sum of line quantities)
+    item_count = Column(Integer, nullable=False, default=0)
 
     # Relationship to OrderItem: one order can contain multiple items
     items = relationship("OrderItem", back_populates="order")
 
+    # Composite indexes backing keyset pagination over (timestamp, id)
+    # within a branch, alone or narrowed by status / table number.
+    # AUTOINCREMENT: SQLite would otherwise hand out max(id) + 1 again once
+    # the newest orders are archived, colliding in orders_archive.
+    __table_args__ = (
+        Index("ix_orders_timestamp_id", "branch_id", "timestamp", "id"),
+        Index("ix_orders_status_timestamp_id", "branch_id", "status", "timestamp", "id"),
+        Index("ix_orders_table_timestamp_id", "branch_id", "table_number", "timestamp", "id"),
+        {"sqlite_autoincrement": True},
+    )
+
+
+# Partial index over open tickets only: the kitchen queue reads it in
+# order, so its cost follows the number of active orders, not the history.
+# Queries must repeat the predicate with literal values (see
+# crud.get_active_orders) for SQLite to pick it.
+ACTIVE_ORDER = Order.status.in_(ACTIVE_STATUSES)
+Index(
+    "ix_orders_active_timestamp_id", Order.branch_id, Order.timestamp, Order.id,
+    sqlite_where=ACTIVE_ORDER, postgresql_where=ACTIVE_ORDER,
+)
+
 
 # ---------------------------------------------------
 # OrderItem: junction table linking orders and menu items
@@ -53,30 +127,259 @@ class OrderItem(Base):
     __tablename__ = "order_items"
 
     id = Column(Integer, primary_key=True, index=True)
-    # Foreign key linking to Order
-    order_id = Column(Integer, ForeignKey("orders.id"), nullable=False)
+    # Foreign key linking to Order (indexed: items are loaded per page of orders)
+    order_id = Column(Integer, ForeignKey("orders.id"), nullable=False, index=True)
     # Foreign key linking to MenuItem
     menu_item_id = Column(Integer, ForeignKey("menu_items.id"), nullable=False)
     # Quantity of this menu item in the order
     quantity = Column(Integer, nullable=False)
+    # Menu price when the order was placed (later price changes don't apply)
+    unit_price = Column(Float, nullable=False)
 
     # Relationships for easy ORM navigation
     order = relationship("Order", back_populates="items")
     menu_item = relationship("MenuItem", back_populates="orders")
 
+    # IDs are never reused once archived (see Order)
+    __table_args__ = {"sqlite_autoincrement": True}
+
+
+# ---------------------------------------------------
+# Order archive: finished orders moved out of the hot tables (app.archive)
+# ---------------------------------------------------
+class OrderArchive(BranchOwned, Base):
+    __tablename__ = "orders_archive"
+
+    # Same columns as Order; the ID is kept, not generated
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    customer_name = Column(String, nullable=True)
+    table_number = Column(Integer, nullable=True)
+    status = Column(String, nullable=False)
+    timestamp = Column(DateTime)
+    total = Column(Float, nullable=False)
+    item_count = Column(Integer, nullable=False)
+    in_kitchen_at = Column(DateTime, nullable=True)
+    ready_at = Column(DateTime, nullable=True)
+    served_at = Column(DateTime, nullable=True)
+    cancelled_at = Column(DateTime, nullable=True)
+
+    items = relationship("OrderItemArchive", back_populates="order")
+
+    __table_args__ = (
+        Index("ix_orders_archive_timestamp_id", "branch_id", "timestamp", "id"),
+    )
+
+
+class OrderItemArchive(Base):
+    __tablename__ = "order_items_archive"
+
+    # Same columns as OrderItem; no menu_items foreign key, history outlives deleted items
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    order_id = Column(Integer, ForeignKey("orders_archive.id"), nullable=False, index=True)
+    menu_item_id = Column(Integer, nullable=False)
+    quantity = Column(Integer, nullable=False)
+    unit_price = Column(Float, nullable=False)
+
+    order = relationship("OrderArchive", back_populates="items")
+
+
+class ArchiveProgress(Base):
+    __tablename__ = "archive_progress"
+
+    # One row per archival job (currently only "orders")
+    job = Column(String, primary_key=True)
+    # The run archives finished orders placed before this; a resumed run keeps it
+    cutoff = Column(DateTime, nullable=False)
+    # Orders moved by the run so far, and the newest of them
+    archived = Column(Integer, nullable=False, default=0)
+    last_timestamp = Column(DateTime, nullable=True)
+    last_order_id = Column(Integer, nullable=True)
+    started_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    # None while the run is in progress (or was interrupted)
+    finished_at = Column(DateTime, nullable=True)
+
 
 # ---------------------------------------------------
 # InventoryItem: tracks raw ingredients or stock
 # ---------------------------------------------------
-class InventoryItem(Base):
+class InventoryItem(BranchOwned, Base):
     __tablename__ = "inventory_items"
 
     id = Column(Integer, primary_key=True, index=True)  # Unique ingredient ID
-    # Ingredient name (e.g., 'Chicken Breast', 'Espresso Beans')
-    name = Column(String, nullable=False, index=True)
+    # Ingredient name (e.g., 'Chicken Breast', 'Espresso Beans'); unique within the branch
+    name = Column(String, nullable=False)
     # Current stock quantity
     quantity = Column(Float, nullable=False)
     # Unit of measurement (e.g., 'kg', 'pcs', 'liters')
     unit = Column(String, nullable=False)
     # Threshold to trigger a low-stock alert
     threshold = Column(Float, default=10.0)
+    # Maintained by crud: quantity <= threshold. Kept as a flag so the
+    # low-stock list reads a partial index holding only low rows.
+    low_stock = Column(Boolean, default=False, nullable=False)
+    # Change version of the latest write (see app.changes)
+    version = Column(BigInteger, nullable=False, default=0)
+
+    __table_args__ = (
+        Index("ix_inventory_items_branch_id", "branch_id", "id"),
+        Index("ix_inventory_items_branch_name", "branch_id", "name", unique=True),
+        Index("ix_inventory_items_branch_version", "branch_id", "version"),
+        Index(
+            "ix_inventory_items_low_stock", "branch_id", "id",
+            sqlite_where=low_stock.is_(True),
+            postgresql_where=low_stock.is_(True),
+        ),
+    )
+
+
+# ---------------------------------------------------
+# RecipeItem: stock consumed by one portion of a menu item
+# ---------------------------------------------------
+class RecipeItem(Base):
+    __tablename__ = "recipe_items"
+
+    id = Column(Integer, primary_key=True, index=True)
+    # Menu item this recipe line belongs to
+    menu_item_id = Column(Integer, ForeignKey("menu_items.id"), nullable=False, index=True)
+    # Ingredient consumed
+    inventory_item_id = Column(Integer, ForeignKey("inventory_items.id"), nullable=False, index=True)
+    # Amount used per portion, in the inventory item's unit
+    quantity = Column(Float, nullable=False)
+
+    menu_item = relationship("MenuItem", back_populates="recipe")
+    inventory_item = relationship("InventoryItem")
+
+    __table_args__ = (
+        UniqueConstraint("menu_item_id", "inventory_item_id", name="uq_recipe_menu_inventory"),
+    )
+
+
+# ---------------------------------------------------
+# Sales rollups: pre-aggregated sales per hour and per day
+# ---------------------------------------------------
+class SalesRollup(BranchOwned, Base):
+    __tablename__ = "sales_rollups"
+
+    branch_id = Column(Integer, primary_key=True, default=DEFAULT_BRANCH)
+    # "hour" or "day"
+    period = Column(String, primary_key=True)
+    # Start of the hour/day (UTC)
+    bucket = Column(DateTime, primary_key=True)
+    # No foreign key: sales history outlives deleted menu items
+    menu_item_id = Column(Integer, primary_key=True)
+    # Units sold and revenue in the bucket
+    quantity = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0.0)
+
+
+class TicketRollup(BranchOwned, Base):
+    __tablename__ = "ticket_rollups"
+
+    branch_id = Column(Integer, primary_key=True, default=DEFAULT_BRANCH)
+    period = Column(String, primary_key=True)
+    bucket = Column(DateTime, primary_key=True)
+    # Orders placed and their combined value in the bucket
+    orders = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0.0)
+
+
+# ---------------------------------------------------
+# Change versions and tombstones for delta sync (see app.changes)
+# ---------------------------------------------------
+class ChangeCounter(BranchOwned, Base):
+    __tablename__ = "change_counters"
+
+    branch_id = Column(Integer, primary_key=True, default=DEFAULT_BRANCH)
+    # Table whose rows are versioned: "menu_items" or "inventory_items"
+    feed = Column(String, primary_key=True)
+    # Last version handed out
+    version = Column(BigInteger, nullable=False, default=0)
+
+
+class Tombstone(BranchOwned, Base):
+    __tablename__ = "tombstones"
+
+    branch_id = Column(Integer, primary_key=True, default=DEFAULT_BRANCH)
+    feed = Column(String, primary_key=True)
+    # ID of the deleted row
+    row_id = Column(Integer, primary_key=True)
+    # Version of the deletion
+    version = Column(BigInteger, nullable=False)
+
+    __table_args__ = (
+        Index("ix_tombstones_feed_version", "branch_id", "feed", "version"),
+    )
+
+
+# ---------------------------------------------------
+# Idempotency keys: stored responses of POST /orders/
+# ---------------------------------------------------
+class IdempotencyKey(BranchOwned, Base):
+    __tablename__ = "idempotency_keys"
+
+    # Keys are per branch: two branches' tablets may pick the same one
+    branch_id = Column(Integer, primary_key=True, default=DEFAULT_BRANCH)
+    # Idempotency-Key header value chosen by the client
+    key = Column(String(255), primary_key=True)
+    # sha256 of the request body, to reject a key reused for another request
+    request_hash = Column(String(64), nullable=False)
+    # The first response, replayed verbatim to retries
+    status_code = Column(Integer, nullable=False)
+    response = Column(String, nullable=False)
+    # Keys older than IDEMPOTENCY_TTL_HOURS are ignored and purged
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+
+# ---------------------------------------------------
+# SchemaVersion: how many of app.migrations.MIGRATIONS the database has had
+# ---------------------------------------------------
+class SchemaVersion(Base):
+    __tablename__ = "schema_version"
+
+    # One row; checked at boot against app.migrations.SCHEMA_VERSION
+    version = Column(Integer, primary_key=True)
+
+
+# ---------------------------------------------------
+# Menu search index, created with menu_items
+# ---------------------------------------------------
+# SQLite: an external-content FTS5 table over name, category and
+# ingredients, kept in sync by triggers (so bulk upserts and raw inserts
+# are covered too), plus an fts5vocab view of its terms for typo
+# correction. Ranked with bm25, name weighted highest.
+# Postgres: a pg_trgm GIN index over the same text, as one expression.
+MENU_SEARCH_TEXT = "(name || ' ' || category || ' ' || coalesce(ingredients, ''))"
+
+MENU_SEARCH_DDL = {
+    "sqlite": [
+        """CREATE VIRTUAL TABLE IF NOT EXISTS menu_search USING fts5(
+            name, category, ingredients,
+            content='menu_items', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+        )""",
+        "INSERT INTO menu_search(menu_search, rank) VALUES ('rank', 'bm25(10.0, 2.0, 1.0)')",
+        "CREATE VIRTUAL TABLE IF NOT EXISTS menu_search_vocab USING fts5vocab(menu_search, 'row')",
+        """CREATE TRIGGER IF NOT EXISTS menu_search_ai AFTER INSERT ON menu_items BEGIN
+            INSERT INTO menu_search(rowid, name, category, ingredients)
+            VALUES (new.id, new.name, new.category, new.ingredients);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS menu_search_ad AFTER DELETE ON menu_items BEGIN
+            INSERT INTO menu_search(menu_search, rowid, name, category, ingredients)
+            VALUES ('delete', old.id, old.name, old.category, old.ingredients);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS menu_search_au AFTER UPDATE OF name, category, ingredients ON menu_items BEGIN
+            INSERT INTO menu_search(menu_search, rowid, name, category, ingredients)
+            VALUES ('delete', old.id, old.name, old.category, old.ingredients);
+            INSERT INTO menu_search(rowid, name, category, ingredients)
+            VALUES (new.id, new.name, new.category, new.ingredients);
+        END""",
+    ],
+    "postgresql": [
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+        f"CREATE INDEX IF NOT EXISTS ix_menu_items_search_trgm ON menu_items USING gin ({MENU_SEARCH_TEXT} gin_trgm_ops)",
+    ],
+}
+
+for _dialect, _statements in MENU_SEARCH_DDL.items():
+    for _statement in _statements:
+        event.listen(MenuItem.__table__, "after_create", DDL(_statement).execute_if(dialect=_dialect))
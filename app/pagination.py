@@ -0,0 +1,80 @@
+# ---------------------------------------------------
+# app/pagination.py
+# ---------------------------------------------------
+"""
+Opaque keyset cursors for the list endpoints.
+
+A cursor is the sort key of the last row of a page, JSON-encoded and
+base64url-wrapped so clients treat it as a token. Orders are keyed by
+(timestamp, id); menu and inventory items by id. The next page is then a
+range scan on an index instead of an OFFSET that re-reads skipped rows.
+"""
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException
+
+# Response header carrying the cursor of the next page (absent on the last page)
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    raw = json.dumps(list(values), separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token: str) -> List[Any]:
+    """Decode a cursor; raises ValueError if it was not produced by encode_cursor."""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        values = json.loads(raw)
+    except (binascii.Error, UnicodeDecodeError, json.JSONDecodeError) as exc:
+        raise ValueError("malformed cursor") from exc
+    if not isinstance(values, list):
+        raise ValueError("malformed cursor")
+    return values
+
+
+def _field(row, name: str) -> Any:
+    # list endpoints page over ORM objects or projected dict rows
+    return row[name] if isinstance(row, dict) else getattr(row, name)
+
+
+def order_cursor(order) -> str:
+    return encode_cursor([_field(order, "timestamp").isoformat(), _field(order, "id")])
+
+
+def parse_order_cursor(token: Optional[str]) -> Optional[Tuple[datetime, int]]:
+    """(timestamp, id) of the last order seen, or a 400 for a bad token."""
+    if token is None:
+        return None
+    try:
+        timestamp, order_id = decode_cursor(token)
+        return datetime.fromisoformat(timestamp), int(order_id)
+    except (ValueError, TypeError) as exc:
+        raise HTTPException(status_code=400, detail="Invalid cursor") from exc
+
+
+def id_cursor(row) -> str:
+    return encode_cursor([_field(row, "id")])
+
+
+def parse_id_cursor(token: Optional[str]) -> Optional[int]:
+    """id of the last row seen, or a 400 for a bad token."""
+    if token is None:
+        return None
+    try:
+        (row_id,) = decode_cursor(token)
+        return int(row_id)
+    except (ValueError, TypeError) as exc:
+        raise HTTPException(status_code=400, detail="Invalid cursor") from exc
+
+
+def next_cursor(rows: Sequence[Any], limit: int, make_cursor) -> Optional[str]:
+    """Cursor for the page after ``rows``, or None when this page is the last."""
+    if limit <= 0 or len(rows) < limit:
+        return None
+    return make_cursor(rows[-1])
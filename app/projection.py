@@ -0,0 +1,33 @@
+# ---------------------------------------------------
+# app/projection.py
+# ---------------------------------------------------
+"""
+Fast serialization for the list endpoints.
+
+The crud ``*_rows`` functions select only the columns a response schema
+needs and return plain dicts, keyed in the schema's field order (orders
+with their lines nested). JSON is encoded from those dicts in one call
+into pydantic-core, instead of hydrating ORM objects and validating each
+one back into ``schemas.*`` before encoding. The bytes match what the
+response_model path emits, the same way the cached menu responses do.
+"""
+from typing import Any, Dict, List, Sequence
+
+from fastapi import Response
+from pydantic import TypeAdapter
+
+_rows_adapter = TypeAdapter(List[Dict[str, Any]])
+
+
+def dump_rows(rows: Sequence[Dict[str, Any]]) -> bytes:
+    """Encode projected rows as a JSON array."""
+    return _rows_adapter.dump_json(rows)
+
+
+class RowsResponse(Response):
+    """JSON response for projected rows; returning it skips response_model validation."""
+
+    media_type = "application/json"
+
+    def render(self, content: Sequence[Dict[str, Any]]) -> bytes:
+        return dump_rows(content)
@@ -0,0 +1,278 @@
+# ---------------------------------------------------
+# app/replicas.py
+# ---------------------------------------------------
+"""
+Read replicas: routing, health checks and read-your-writes.
+
+DATABASE_REPLICAS lists read-only copies of DATABASE_URL. GET handlers
+take their session from app.database.get_read_db, which:
+
+- picks the next healthy replica round-robin, falling back to the primary
+  when there is none;
+- stays on the primary for a client that wrote within the last
+  READ_YOUR_WRITES_SECONDS, so an order just placed is there when the
+  client reads it back. ReadYourWritesMiddleware marks such clients with a
+  short-lived cookie on every successful write, and also remembers the
+  client's address (scope["client"], as for rate limits), for clients
+  that drop cookies, like the Telegram bot and API scripts.
+
+The remembered addresses are per process: a cookieless client whose read
+lands on another worker than its write may still read from a lagging
+replica. Clients sharing an address (behind NAT, or a proxy without
+--proxy-headers) read from the primary after any of them writes.
+
+ReplicaMonitor probes every replica each REPLICA_CHECK_SECONDS; a replica
+that fails the probe, or drops a connection mid-request, takes no reads
+until a later probe succeeds. The probe reads the orders table, so a
+replica without the schema never serves.
+
+For local testing a replica can be a copy of the SQLite primary, refreshed
+periodically:
+
+    python -m app.replicas ./eato-replica.db --every 5
+"""
+import argparse
+import asyncio
+import functools
+import itertools
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import closing
+from typing import Dict, Optional, Sequence
+
+from sqlalchemy import event, make_url, text
+from sqlalchemy.exc import SQLAlchemyError
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import HTTPConnection
+
+logger = logging.getLogger(__name__)
+
+# Seconds a client reads from the primary after a write
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+REPLICA_CHECK_SECONDS = float(os.getenv("REPLICA_CHECK_SECONDS", "5"))
+# Holds the time until which the client reads from the primary
+PIN_COOKIE = "eato_primary_until"
+SAFE_METHODS = frozenset(("GET", "HEAD", "OPTIONS"))
+
+_PROBE = text("SELECT 1 FROM orders LIMIT 1")
+
+
+class ReplicaSet:
+    """
+    The replicas of one database (app.database.Shard objects), handed out
+    round-robin among those passing their health check.
+    """
+
+    def __init__(self, replicas: Sequence = ()):
+        self.replicas = tuple(replicas)
+        self._healthy = self.replicas
+        self._turn = itertools.count()
+        self._lock = threading.Lock()
+        for replica in self.replicas:
+            engines = [replica.engine]
+            if replica.async_engine is not None:
+                engines.append(replica.async_engine.sync_engine)
+            for engine in engines:
+                event.listen(engine, "handle_error", functools.partial(self._on_error, replica))
+
+    def __bool__(self) -> bool:
+        return bool(self.replicas)
+
+    @property
+    def healthy(self) -> tuple:
+        return self._healthy
+
+    def pick(self):
+        """The next healthy replica, or None when every one is down."""
+        healthy = self._healthy
+        if not healthy:
+            return None
+        return healthy[next(self._turn) % len(healthy)]
+
+    def check(self) -> Dict[str, bool]:
+        """Probe every replica and update which ones take reads. Returns url -> healthy."""
+        status = {}
+        for replica in self.replicas:
+            try:
+                with replica.engine.connect() as conn:
+                    conn.execute(_PROBE)
+                status[replica.url] = True
+            except SQLAlchemyError as exc:
+                status[replica.url] = False
+                if replica in self._healthy:
+                    logger.warning("Replica %s failed its health check: %s", safe_url(replica.url), exc)
+            self._mark(replica, status[replica.url])
+        return status
+
+    def _mark(self, replica, up: bool) -> None:
+        with self._lock:
+            if (replica in self._healthy) == up:
+                return
+            if up:
+                logger.info("Replica %s is back", safe_url(replica.url))
+            healthy = set(self._healthy) | {replica} if up else set(self._healthy) - {replica}
+            # keep configuration order, so the round-robin stays even
+            self._healthy = tuple(r for r in self.replicas if r in healthy)
+
+    def _on_error(self, replica, context) -> None:
+        if context.is_disconnect:
+            logger.warning("Replica %s dropped a connection; reading elsewhere", safe_url(replica.url))
+            self._mark(replica, False)
+
+
+def safe_url(url: str) -> str:
+    return make_url(url).render_as_string(hide_password=True)
+
+
+class ReplicaMonitor:
+    """Runs ReplicaSet.check on a set of replica sets, in the background, on the running loop."""
+
+    def __init__(self, interval: float = REPLICA_CHECK_SECONDS):
+        self.interval = interval
+        self._sets: Sequence[ReplicaSet] = ()
+        self._task: Optional[asyncio.Task] = None
+
+    def check(self) -> None:
+        for replicas in self._sets:
+            replicas.check()
+
+    async def start(self, replica_sets: Sequence[ReplicaSet]) -> None:
+        """Probe once right away, then every ``interval`` seconds."""
+        self._sets = [replicas for replicas in replica_sets if replicas]
+        if not self._sets or self._task is not None:
+            return
+        await run_in_threadpool(self.check)
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await run_in_threadpool(self.check)
+            except Exception:
+                logger.exception("Replica health check failed")
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is None:
+            return
+        task.cancel()
+        if task.get_loop() is asyncio.get_running_loop():
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+
+replica_monitor = ReplicaMonitor()
+
+
+# ---------------------------------------------------
+# Read-your-writes
+# ---------------------------------------------------
+class RecentWriters:
+    """Clients that wrote lately, by address, the least recently used dropped past ``max_clients``."""
+
+    def __init__(self, max_clients: int = 10_000):
+        self.max_clients = max_clients
+        # client -> time until which it reads from the primary
+        self._until: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def wrote(self, client: str, seconds: float) -> None:
+        with self._lock:
+            self._until.pop(client, None)
+            self._until[client] = time.time() + seconds
+            while len(self._until) > self.max_clients:
+                self._until.popitem(last=False)
+
+    def pinned(self, client: str) -> bool:
+        return self._until.get(client, 0) > time.time()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._until.clear()
+
+
+recent_writers = RecentWriters()
+
+
+def _client(scope) -> str:
+    return (scope.get("client") or ("unknown",))[0]
+
+
+def pinned_to_primary(connection: HTTPConnection) -> bool:
+    """Whether the client wrote recently enough that it must read from the primary."""
+    if recent_writers.pinned(_client(connection.scope)):
+        return True
+    try:
+        return float(connection.cookies.get(PIN_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+class ReadYourWritesMiddleware:
+    """
+    Sets PIN_COOKIE on every successful write and records the client in
+    ``writers`` (pure ASGI, like MetricsMiddleware).
+    """
+
+    def __init__(self, app, seconds: float = READ_YOUR_WRITES_SECONDS, writers: RecentWriters = None):
+        self.app = app
+        self.seconds = seconds
+        self.writers = writers if writers is not None else recent_writers
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in SAFE_METHODS or self.seconds <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                self.writers.wrote(_client(scope), self.seconds)
+                cookie = (
+                    f"{PIN_COOKIE}={time.time() + self.seconds:.3f}; Max-Age={max(1, round(self.seconds))}; "
+                    "Path=/; HttpOnly; SameSite=Lax"
+                )
+                message["headers"] = list(message.get("headers", ())) + [(b"set-cookie", cookie.encode())]
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+
+# ---------------------------------------------------
+# Local SQLite replicas
+# ---------------------------------------------------
+def copy_sqlite(source: str, target: str) -> None:
+    """Copy the SQLite file ``source`` onto ``target`` with the online backup API (consistent while writers run)."""
+    with closing(sqlite3.connect(source)) as src, closing(sqlite3.connect(target)) as dst:
+        src.backup(dst)
+
+
+def main():
+    from app.database import DATABASE_URL, is_sqlite
+
+    parser = argparse.ArgumentParser(description="Refresh a local SQLite replica of DATABASE_URL.")
+    parser.add_argument("target", help="replica file to write")
+    parser.add_argument("--every", type=float, default=0, help="seconds between copies (default: copy once)")
+    args = parser.parse_args()
+    if not is_sqlite(DATABASE_URL):
+        parser.error("DATABASE_URL is not SQLite; use the database's own replication")
+
+    logging.basicConfig(level="INFO")
+    source = make_url(DATABASE_URL).database
+    while True:
+        started = time.perf_counter()
+        copy_sqlite(source, args.target)
+        logger.info("Copied %s to %s in %.2fs", source, args.target, time.perf_counter() - started)
+        if args.every <= 0:
+            break
+        time.sleep(args.every)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+# ---------------------------------------------------
+# app/routers/analytics.py
+# ---------------------------------------------------
+from datetime import datetime
+from fastapi import APIRouter, Depends, Query
+from typing import List, Literal, Optional
+
+import app.async_crud as crud
+import app.schemas as schemas
+from app.database import DbSession, get_read_db
+
+router = APIRouter(
+    prefix="/analytics",
+    tags=["Analytics"],
+)
+
+@router.get("/revenue", response_model=List[schemas.RevenueBucket])
+async def read_revenue(
+    period: Literal["hour", "day"] = "hour",
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    db: DbSession = Depends(get_read_db),
+):
+    """
+    Orders and revenue per hour or per day, oldest first.
+    - since/until: UTC range [since, until), rounded down to the period
+    - Buckets without orders are omitted.
+    """
+    return await crud.get_revenue(db, period=period, since=since, until=until)
+
+@router.get("/top-items", response_model=List[schemas.TopItem])
+async def read_top_items(
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    limit: int = Query(10, ge=1, le=100),
+    db: DbSession = Depends(get_read_db),
+):
+    """
+    Best-selling menu items by units sold, with their revenue.
+    - since/until: UTC range [since, until), rounded down to the hour
+    """
+    return await crud.get_top_items(db, since=since, until=until, limit=limit)
+
+@router.get("/ticket-size", response_model=schemas.TicketStats)
+async def read_ticket_size(
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    db: DbSession = Depends(get_read_db),
+):
+    """
+    Average ticket size (revenue per order) over a range.
+    - since/until: UTC range [since, until), rounded down to the hour
+    """
+    return await crud.get_ticket_stats(db, since=since, until=until)
@@ -1,10 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from typing import List, Optional
 
-import app.crud as crud
+import app.async_crud as crud
 import app.schemas as schemas
-from app.database import get_db
+from app.bulk import read_rows
+from app.crud import DuplicateNameError
+from app.database import DbSession, get_db, get_read_db
+from app.pagination import NEXT_CURSOR_HEADER, id_cursor, next_cursor, parse_id_cursor
+from app.projection import RowsResponse
 
 router = APIRouter(
     prefix="/inventory",
@@ -15,34 +18,84 @@ router = APIRouter(
 @router.post("/", response_model=schemas.InventoryItem, status_code=201)
 async def create_inventory(
     item: schemas.InventoryItemCreate,
-    db: Session = Depends(get_db)
+    db: DbSession = Depends(get_db)
 ):
     """
     Add a new ingredient to inventory.
+    409 if an ingredient with the same name exists.
     """
-    return crud.create_inventory_item(db, item)
+    try:
+        return await crud.create_inventory_item(db, item)
+    except DuplicateNameError as exc:
+        raise HTTPException(status_code=409, detail=str(exc))
+
+@router.post("/bulk", response_model=schemas.BulkResult)
+async def bulk_upsert_inventory(request: Request, db: DbSession = Depends(get_db)):
+    """
+    Create or update many inventory items at once, matched by name.
+    - Body: JSON array, NDJSON or CSV with a header row (by Content-Type).
+    - Valid rows are upserted in batches inside one transaction; low-stock
+      flags and alerts follow the new quantities.
+    - Invalid or duplicate rows are listed in errors and skipped.
+    """
+    items, errors = await read_rows(request, schemas.InventoryItemCreate)
+    created, updated = await crud.upsert_inventory_items(db, items)
+    return {"created": created, "updated": updated, "errors": errors}
 
 @router.get("/", response_model=List[schemas.InventoryItem])
 async def read_inventory(
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db)
+    after: Optional[str] = None,
+    db: DbSession = Depends(get_read_db)
+):
+    """
+    List inventory items in ID order, with keyset pagination.
+    - after: cursor from the previous page's X-Next-Cursor header
+    """
+    items = await crud.get_inventory_item_rows(db, skip=skip, limit=limit, after=parse_id_cursor(after))
+    cursor = next_cursor(items, limit, id_cursor)
+    return RowsResponse(items, headers={NEXT_CURSOR_HEADER: cursor} if cursor else None)
+
+@router.get("/low-stock", response_model=List[schemas.InventoryItem])
+async def read_low_stock(
+    response: Response,
+    limit: int = 100,
+    after: Optional[str] = None,
+    db: DbSession = Depends(get_read_db)
+):
+    """
+    List inventory items at or below their alert threshold.
+    Cost depends on the number of low items, not the inventory size.
+    """
+    items = await crud.get_low_stock_items(db, limit=limit, after=parse_id_cursor(after))
+    cursor = next_cursor(items, limit, id_cursor)
+    if cursor:
+        response.headers[NEXT_CURSOR_HEADER] = cursor
+    return items
+
+@router.get("/changes", response_model=schemas.InventoryChanges)
+async def read_inventory_changes(
+    since: int = Query(0, ge=0),
+    limit: int = Query(500, ge=1, le=5000),
+    db: DbSession = Depends(get_read_db)
 ):
     """
-    List all inventory items, with pagination.
+    Delta sync: inventory items written or deleted after change version since.
+    Stock deducted by orders counts as a write. Same protocol as GET /menu/changes.
     """
-    return crud.get_inventory_items(db, skip=skip, limit=limit)
+    return await crud.get_inventory_changes(db, since=since, limit=limit)
 
 @router.get("/{item_id}", response_model=schemas.InventoryItem)
 async def read_inventory_item(
     item_id: int,
-    db: Session = Depends(get_db)
+    db: DbSession = Depends(get_read_db)
 ):
     """
     Fetch a single inventory item by its ID.
     Raises 404 if not found.
     """
-    db_item = crud.get_inventory_item(db, item_id)
+    db_item = await crud.get_inventory_item(db, item_id)
     if not db_item:
         raise HTTPException(status_code=404, detail="Inventory item not found")
     return db_item
@@ -51,12 +104,16 @@ async def read_inventory_item(
 async def update_inventory(
     item_id: int,
     item: schemas.InventoryItemCreate,
-    db: Session = Depends(get_db)
+    db: DbSession = Depends(get_db)
 ):
     """
     Update an existing inventory record.
+    409 if the new name is taken.
     """
-    db_item = crud.update_inventory_item(db, item_id, item)
+    try:
+        db_item = await crud.update_inventory_item(db, item_id, item)
+    except DuplicateNameError as exc:
+        raise HTTPException(status_code=409, detail=str(exc))
     if not db_item:
         raise HTTPException(status_code=404, detail="Inventory item not found")
     return db_item
@@ -64,12 +121,12 @@ async def update_inventory(
 @router.delete("/{item_id}", status_code=204)
 async def delete_inventory(
     item_id: int,
-    db: Session = Depends(get_db)
+    db: DbSession = Depends(get_db)
 ):
     """
     Remove an inventory item by ID.
     Returns 204 on success or 404 if missing.
     """
-    success = crud.delete_inventory_item(db, item_id)
+    success = await crud.delete_inventory_item(db, item_id)
     if not success:
         raise HTTPException(status_code=404, detail="Inventory item not found")
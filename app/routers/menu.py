@@ -1,13 +1,18 @@
 # ---------------------------------------------------
 # app/routers/menu.py
 # ---------------------------------------------------
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from pydantic import TypeAdapter
+from typing import List, Optional
 
-import app.crud as crud
+import app.async_crud as crud
 import app.schemas as schemas
-from app.database import get_db
+from app.bulk import read_rows
+from app.cache import cached_response, get_or_fill, menu_cache
+from app.crud import DuplicateNameError, MenuItemOrderedError, UnknownInventoryItemError
+from app.database import DbSession, get_branch_id, get_db, get_read_db
+from app.pagination import NEXT_CURSOR_HEADER, id_cursor, next_cursor, parse_id_cursor
+from app.projection import dump_rows
 
 # APIRouter groups all /menu endpoints together
 router = APIRouter(
@@ -16,56 +21,190 @@ router = APIRouter(
     responses={404: {"description": "Not Found"}},
 )
 
+# Serializers for the cached GET responses (same JSON FastAPI would emit)
+_menu_list_adapter = TypeAdapter(List[schemas.MenuItem])
+
+# The cached GET handlers fill from the primary (get_db), not a replica: an
+# entry lives until the next menu write, so a fill from a lagging replica
+# would keep serving the old menu. Cache misses are rare enough for that.
+# Each lookup first reads the menu version, which every worker's writes bump.
+
 @router.post("/", response_model=schemas.MenuItem, status_code=201)
 async def create_menu_item(
     item: schemas.MenuItemCreate, 
-    db: Session = Depends(get_db),
+    db: DbSession = Depends(get_db),
     ):
     """
     Create a new menu item.
     - item: validated payload from MenuItemCreate schema.
     - db: database session injected.
     Returns the created MenuItem with its generated ID.
+    409 if an item with the same name exists.
+    """
+    try:
+        return await crud.create_menu_item(db, item)
+    except DuplicateNameError as exc:
+        raise HTTPException(status_code=409, detail=str(exc))
+
+@router.post("/bulk", response_model=schemas.BulkResult)
+async def bulk_upsert_menu_items(request: Request, db: DbSession = Depends(get_db)):
+    """
+    Create or update many menu items at once, matched by name.
+    - Body: JSON array, NDJSON or CSV with a header row (by Content-Type).
+    - Valid rows are upserted in batches inside one transaction.
+    - Invalid or duplicate rows are listed in errors and skipped.
+    """
+    items, errors = await read_rows(request, schemas.MenuItemCreate)
+    created, updated = await crud.upsert_menu_items(db, items)
+    return {"created": created, "updated": updated, "errors": errors}
+
+@router.get("/cache/stats", response_model=schemas.CacheStats)
+async def read_menu_cache_stats():
     """
-    return crud.create_menu_item(db, item)
+    Hit/miss counters of the in-process menu cache.
+    """
+    return menu_cache.stats()
 
 @router.get("/", response_model=List[schemas.MenuItem])
-async def read_menu_items(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+async def read_menu_items(
+    request: Request,
+    skip: int = 0,
+    limit: int = 100,
+    after: Optional[str] = None,
+    db: DbSession = Depends(get_db),
+    branch_id: int = Depends(get_branch_id),
+):
     """
-    List menu items with pagination.
-    - skip: number of records to skip
+    List menu items in ID order, with keyset pagination.
+    - after: cursor from the previous page's X-Next-Cursor header
     - limit: max number of records to return
+    - skip: number of records to skip (prefer after for deep pages)
+    Served from the menu cache; honours If-None-Match with a 304.
+    """
+    after_id = parse_id_cursor(after)
+
+    async def fill():
+        items = await crud.get_menu_item_rows(db, skip=skip, limit=limit, after=after_id)
+        body = dump_rows(items)
+        cursor = next_cursor(items, limit, id_cursor)
+        return body, {NEXT_CURSOR_HEADER: cursor} if cursor else None
+
+    version = await crud.get_menu_version(db)
+    entry = await get_or_fill(menu_cache, ("list", branch_id, skip, limit, after_id), fill, version)
+    return cached_response(request, entry)
+
+@router.get("/search", response_model=List[schemas.MenuItem])
+async def search_menu_items(
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=200),
+    category: Optional[str] = None,
+    available: Optional[bool] = None,
+    limit: int = Query(20, ge=1, le=100),
+    db: DbSession = Depends(get_db),
+    branch_id: int = Depends(get_branch_id),
+):
+    """
+    Search menu items by name, category and ingredients, best match first.
+    - q: words to find; each matches as a prefix ("nas gor" finds "Nasi Goreng")
+      and misspelled words fall back to the closest known terms
+    - category, available: exact-match filters
+    Served from the menu cache; honours If-None-Match with a 304.
+    """
+    async def fill():
+        items = await crud.search_menu_items(db, q, category=category, available=available, limit=limit)
+        return _menu_list_adapter.dump_json(_menu_list_adapter.validate_python(items, from_attributes=True))
+
+    version = await crud.get_menu_version(db)
+    entry = await get_or_fill(menu_cache, ("search", branch_id, q, category, available, limit), fill, version)
+    return cached_response(request, entry)
+
+@router.get("/changes", response_model=schemas.MenuChanges)
+async def read_menu_changes(
+    since: int = Query(0, ge=0),
+    limit: int = Query(500, ge=1, le=5000),
+    db: DbSession = Depends(get_read_db),
+):
     """
-    return crud.get_menu_items(db, skip=skip, limit=limit)
+    Delta sync: menu items written or deleted after change version since.
+    - since: version from the previous response (0 for everything)
+    - Apply deleted, then changed; repeat while more is true.
+    - A version below since means the server's history was reset: sync from 0.
+    """
+    return await crud.get_menu_changes(db, since=since, limit=limit)
 
 @router.get("/{item_id}", response_model=schemas.MenuItem)
-async def read_menu_item(item_id: int, db: Session = Depends(get_db)):
+async def read_menu_item(
+    request: Request, item_id: int, db: DbSession = Depends(get_db), branch_id: int = Depends(get_branch_id)
+):
     """
     Fetch a single menu item by ID.
     Raises 404 if not found.
+    Served from the menu cache; honours If-None-Match with a 304.
     """
-    db_item = crud.get_menu_item(db, item_id)
-    if db_item is None:
+    async def fill():
+        db_item = await crud.get_menu_item(db, item_id)
+        if db_item is None:
+            return None
+        return schemas.MenuItem.model_validate(db_item).model_dump_json().encode()
+
+    version = await crud.get_menu_version(db)
+    entry = await get_or_fill(menu_cache, ("item", branch_id, item_id), fill, version)
+    if entry is None:
         raise HTTPException(status_code=404, detail="Menu item not found")
-    return db_item
+    return cached_response(request, entry)
+
+@router.get("/{item_id}/recipe", response_model=List[schemas.RecipeItem])
+async def read_recipe(item_id: int, db: DbSession = Depends(get_read_db)):
+    """
+    List the ingredients consumed by one portion of a menu item.
+    """
+    if await crud.get_menu_item(db, item_id) is None:
+        raise HTTPException(status_code=404, detail="Menu item not found")
+    return await crud.get_recipe(db, item_id)
+
+@router.put("/{item_id}/recipe", response_model=List[schemas.RecipeItem])
+async def replace_recipe(item_id: int, items: List[schemas.RecipeItemCreate], db: DbSession = Depends(get_db)):
+    """
+    Replace the recipe of a menu item.
+    Orders for this item deduct these quantities from inventory.
+    - Lines naming the same ingredient are merged, quantities summed
+    - 422 listing the inventory item IDs that do not exist in the branch
+    """
+    try:
+        db_items = await crud.set_recipe(db, item_id, items)
+    except UnknownInventoryItemError as exc:
+        raise HTTPException(
+            status_code=422,
+            detail={"message": "Unknown inventory items", "inventory_item_ids": exc.inventory_item_ids},
+        )
+    if db_items is None:
+        raise HTTPException(status_code=404, detail="Menu item not found")
+    return db_items
 
 @router.put("/{item_id}", response_model=schemas.MenuItem)
-async def update_menu_item(item_id: int, item: schemas.MenuItemCreate, db: Session = Depends(get_db)):
+async def update_menu_item(item_id: int, item: schemas.MenuItemCreate, db: DbSession = Depends(get_db)):
     """
     Update an existing menu item.
-    Returns updated item or 404 if not found.
+    Returns updated item or 404 if not found; 409 if the new name is taken.
     """
-    db_item = crud.update_menu_item(db, item_id, item)
+    try:
+        db_item = await crud.update_menu_item(db, item_id, item)
+    except DuplicateNameError as exc:
+        raise HTTPException(status_code=409, detail=str(exc))
     if db_item is None:
         raise HTTPException(status_code=404, detail="Menu item not found")
     return db_item
 
 @router.delete("/{item_id}", status_code=204)
-async def delete_menu_item(item_id: int, db: Session = Depends(get_db)):
+async def delete_menu_item(item_id: int, db: DbSession = Depends(get_db)):
     """
     Delete a menu item by ID.
-    Returns 204 No Content on success, or 404 if not found.
+    Returns 204 No Content on success, or 404 if not found; 409 while
+    orders reference it (mark it unavailable instead).
     """
-    success = crud.delete_menu_item(db, item_id)
+    try:
+        success = await crud.delete_menu_item(db, item_id)
+    except MenuItemOrderedError as exc:
+        raise HTTPException(status_code=409, detail=str(exc))
     if not success:
         raise HTTPException(status_code=404, detail="Menu item not found")
\ No newline at end of file
@@ -1,13 +1,19 @@
 # ---------------------------------------------------
 # app/routers/order.py
 # ---------------------------------------------------
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
+from datetime import datetime
+from fastapi import APIRouter, Depends, Header, HTTPException, Response
+from fastapi.responses import StreamingResponse
+from typing import List, Literal, Optional
 
-import app.crud as crud
+import app.async_crud as crud
 import app.schemas as schemas
-from app.database import get_db
+from app import export, idempotency
+from app.crud import InsufficientStockError, InvalidTransitionError, UnknownMenuItemError
+from app.database import DbSession, get_branch_id, get_db, get_read_db, read_session
+from app.feed import order_feed
+from app.pagination import NEXT_CURSOR_HEADER, next_cursor, order_cursor, parse_order_cursor
+from app.projection import RowsResponse
 
 # Reuse get_db for DB sessions
 router = APIRouter(
@@ -16,42 +22,187 @@ router = APIRouter(
     responses={404: {"description": "Not Found"}},
 )
 
+def _out_of_stock(exc: InsufficientStockError) -> HTTPException:
+    """409 listing how much of each ingredient is missing."""
+    return HTTPException(
+        status_code=409,
+        detail={"message": "Insufficient stock", "shortages": exc.shortages},
+    )
+
+def _unknown_items(exc: UnknownMenuItemError) -> HTTPException:
+    """422 listing the menu item IDs that do not exist."""
+    return HTTPException(
+        status_code=422,
+        detail={"message": "Unknown menu items", "menu_item_ids": exc.menu_item_ids},
+    )
+
 @router.post("/", response_model=schemas.Order, status_code=201)
 async def create_order(
     order: schemas.OrderCreate, 
-    db: Session = Depends(get_db),
+    db: DbSession = Depends(get_db),
+    branch_id: int = Depends(get_branch_id),
+    idempotency_key: Optional[str] = Header(None, min_length=1, max_length=idempotency.MAX_KEY_LENGTH),
     ):
     """
     Place a new order with nested items.
     - Validates items with OrderItemCreate schema.
-    - Returns the full Order with items.
+    - Returns the full Order with items, priced at the current menu price.
+    - 422 if a menu item does not exist.
+    - Deducts recipe stock atomically; 409 if an ingredient runs out.
+    - Publishes order.created (staff alert, kitchen feed) without waiting on them.
+    - Idempotency-Key header: a retry with the same key gets the first
+      response back (with Idempotent-Replayed: true) and places nothing;
+      422 if the key was used for a different order. Keys are per branch.
+    """
+    try:
+        if idempotency_key is None:
+            return await crud.create_order(db, order)
+        request_hash = idempotency.request_hash(order.model_dump_json())
+        stored, replayed = await idempotency.order_keys.run(
+            idempotency_key, request_hash, scope=branch_id,
+            lookup=lambda: crud.get_idempotency_record(db, idempotency_key),
+            execute=lambda: crud.create_order_once(db, order, idempotency_key, request_hash),
+        )
+    except UnknownMenuItemError as exc:
+        raise _unknown_items(exc)
+    except InsufficientStockError as exc:
+        raise _out_of_stock(exc)
+    except idempotency.KeyReusedError as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+    except idempotency.KeyInUseError as exc:
+        raise HTTPException(status_code=409, detail=str(exc))
+    return Response(
+        content=stored.body, status_code=stored.status_code, media_type="application/json",
+        headers={idempotency.REPLAYED_HEADER: "true"} if replayed else None,
+    )
+
+@router.post("/batch", response_model=List[schemas.Order], status_code=201)
+async def create_orders_batch(
+    orders: List[schemas.OrderCreate],
+    db: DbSession = Depends(get_db),
+    ):
+    """
+    Ingest a batch of orders (e.g. queued offline by a POS terminal)
+    in a single transaction.
+    - Either every order is stored or none is.
+    - Returns the created Orders in the submitted order.
     """
-    return crud.create_order(db, order)
+    try:
+        db_orders = await crud.create_orders(db, orders)
+    except UnknownMenuItemError as exc:
+        raise _unknown_items(exc)
+    except InsufficientStockError as exc:
+        raise _out_of_stock(exc)
+    return db_orders
 
 @router.get("/", response_model=List[schemas.Order])
-async def read_orders(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+async def read_orders(
+    skip: int = 0,
+    limit: int = 100,
+    after: Optional[str] = None,
+    status: Optional[str] = None,
+    table_number: Optional[int] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    db: DbSession = Depends(get_read_db),
+):
+    """
+    List orders oldest first, with keyset pagination.
+    - after: cursor from the previous page's X-Next-Cursor header
+    - status, table_number: exact-match filters
+    - since (inclusive) / until (exclusive): order timestamp range
+    """
+    orders = await crud.get_order_rows(
+        db, skip=skip, limit=limit, after=parse_order_cursor(after),
+        status=status, table_number=table_number, since=since, until=until,
+    )
+    cursor = next_cursor(orders, limit, order_cursor)
+    return RowsResponse(orders, headers={NEXT_CURSOR_HEADER: cursor} if cursor else None)
+
+@router.get("/export", response_class=StreamingResponse)
+async def export_orders(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    branch_id: int = Depends(get_branch_id),
+):
+    """
+    Export every order and line of the branch, oldest first, streamed as it is read.
+    - format=ndjson: one order per line, shaped like GET /orders/{id}
+    - format=csv: one row per order line, with the order columns repeated
+    - since (inclusive) / until (exclusive): order timestamp range
+    - Reads the live tables: orders moved to the archive are not included.
+    """
+    return StreamingResponse(
+        export.stream_orders(
+            format, since=since, until=until, branch_id=branch_id, session_factory=lambda: read_session(branch_id)
+        ),
+        media_type=export.FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="orders.{format}"'},
+    )
+
+@router.get("/active", response_model=List[schemas.Order])
+async def read_active_orders(
+    status: Optional[schemas.ActiveOrderStatus] = None,
+    db: DbSession = Depends(get_read_db),
+):
+    """
+    The kitchen queue: every order not yet Served or Cancelled, oldest first.
+    - status: only orders in this active status (e.g. Received)
+    - Reads a partial index over active orders, so it stays fast however
+      long the order history grows.
+    """
+    return await crud.get_active_orders(db, status=status)
+
+@router.get("/stream", response_class=StreamingResponse)
+async def stream_orders(
+    last_event_id: Optional[int] = None,
+    last_event_id_header: Optional[int] = Header(None, alias="Last-Event-ID"),
+    branch_id: int = Depends(get_branch_id),
+):
     """
-    List orders with pagination.
+    Server-Sent Events feed of the branch's order.created and order.status_changed.
+    - Each event's data is the order as returned by GET /orders/{id}.
+    - Reconnect with Last-Event-ID (header, or last_event_id query) to
+      receive the events missed in between; a "reset" event means the gap
+      is too old and the client should reload GET /orders/.
     """
-    return crud.get_orders(db, skip=skip, limit=limit)
+    subscription = order_feed.subscribe(
+        last_event_id if last_event_id is not None else last_event_id_header, branch_id=branch_id
+    )
+    return StreamingResponse(
+        order_feed.stream(subscription),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 @router.get("/{order_id}", response_model=schemas.Order)
-async def read_order(order_id: int, db: Session = Depends(get_db)):
+async def read_order(order_id: int, db: DbSession = Depends(get_read_db)):
     """
     Fetch a single order by ID, including its items.
+    Archived orders (see app.archive) are found too.
     Raises 404 if not found.
     """
-    db_order = crud.get_order(db, order_id)
+    db_order = await crud.get_order(db, order_id)
     if db_order is None:
         raise HTTPException(status_code=404, detail="Order not found")
     return db_order
 
 @router.put("/{order_id}/status", response_model=schemas.Order)
-async def update_status(order_id: int, status: str, db: Session = Depends(get_db)):
+async def update_status(order_id: int, status: schemas.OrderStatus, db: DbSession = Depends(get_db)):
     """
-    Update only the status of an existing order.
+    Move an existing order to its next status.
+    - Received -> In Kitchen -> Ready -> Served; any active order may be Cancelled.
+    - Stamps in_kitchen_at / ready_at / served_at / cancelled_at.
+    - 409 (with the allowed next statuses) if the step is not allowed.
     """
-    db_order = crud.update_order_status(db, order_id, status)
+    try:
+        db_order = await crud.update_order_status(db, order_id, status)
+    except InvalidTransitionError as exc:
+        raise HTTPException(
+            status_code=409,
+            detail={"message": str(exc), "status": exc.current, "allowed": exc.allowed},
+        )
     if db_order is None:
         raise HTTPException(status_code=404, detail="Order not found")
     return db_order
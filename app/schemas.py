@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import List, Optional
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional
 from datetime import datetime
 
 # ---------------------------------------------------
@@ -20,6 +20,8 @@ class MenuItemCreate(MenuItemBase):
 class MenuItem(MenuItemBase):
     # Response schema includes the database-generated ID
     id: int
+    branch_id: int              # Branch (restaurant) the item belongs to
+    version: int                # Change version of the latest write (see MenuChanges)
 
     model_config = {
         "from_attributes": True
@@ -31,7 +33,7 @@ class MenuItem(MenuItemBase):
 # ---------------------------------------------------
 class OrderItemBase(BaseModel):
     menu_item_id: int           # ID of the menu item being ordered
-    quantity: int               # Quantity of the item in this order
+    quantity: int = Field(gt=0) # Quantity of the item in this order
 
 class OrderItemCreate(OrderItemBase):
     # For creating new OrderItem records
@@ -39,6 +41,7 @@ class OrderItemCreate(OrderItemBase):
 
 class OrderItem(OrderItemBase):
     id: int                     # Database-generated ID for each order line
+    unit_price: float           # Menu price when the order was placed
 
     model_config = {
         "from_attributes": True
@@ -55,13 +58,24 @@ class OrderBase(BaseModel):
 
 class OrderCreate(OrderBase):
     # Creation schema includes list of order items
-    items: List[OrderItemCreate]
+    items: List[OrderItemCreate] = Field(min_length=1)
+
+# Order lifecycle (see models.ORDER_TRANSITIONS)
+OrderStatus = Literal["Received", "In Kitchen", "Ready", "Served", "Cancelled"]
+ActiveOrderStatus = Literal["Received", "In Kitchen", "Ready"]
 
 class Order(OrderBase):
     id: int                     # Database-generated order ID
-    status: str                 # Current status: Received, In Kitchen, Ready
+    branch_id: int              # Branch (restaurant) that took the order
+    status: str                 # Current status: Received, In Kitchen, Ready, Served, Cancelled
     timestamp: datetime         # When the order was placed
+    total: float                # Sum of quantity * unit_price
+    item_count: int             # Number of portions ordered
     items: List[OrderItem]      # Nested list of ordered items
+    in_kitchen_at: Optional[datetime] = None  # When each later status was entered
+    ready_at: Optional[datetime] = None
+    served_at: Optional[datetime] = None
+    cancelled_at: Optional[datetime] = None
 
     model_config = {
         "from_attributes": True
@@ -83,7 +97,97 @@ class InventoryItemCreate(InventoryItemBase):
 
 class InventoryItem(InventoryItemBase):
     id: int                     # Database-generated ID for each stock item
+    branch_id: int              # Branch (restaurant) holding the stock
+    version: int                # Change version of the latest write (see InventoryChanges)
+
+    model_config = {
+        "from_attributes": True
+    }
+
+
+# ---------------------------------------------------
+# RecipeItem Schemas (stock used per portion of a menu item)
+# ---------------------------------------------------
+class RecipeItemBase(BaseModel):
+    inventory_item_id: int              # Ingredient consumed
+    quantity: float = Field(gt=0)       # Amount per portion, in the ingredient's unit
+
+class RecipeItemCreate(RecipeItemBase):
+    pass
+
+class RecipeItem(RecipeItemBase):
+    id: int
+    menu_item_id: int
+
+    model_config = {
+        "from_attributes": True
+    }
+
+
+# ---------------------------------------------------
+# Delta sync Schemas (GET /menu/changes, GET /inventory/changes)
+# ---------------------------------------------------
+class MenuChanges(BaseModel):
+    version: int                # Pass as since next time; below the since sent means re-sync from 0
+    more: bool                  # More changes follow: ask again right away
+    changed: List[MenuItem]     # Rows created or updated, in version order
+    deleted: List[int]          # IDs of deleted rows; apply before changed
+
+class InventoryChanges(BaseModel):
+    version: int
+    more: bool
+    changed: List[InventoryItem]
+    deleted: List[int]
+
+
+# ---------------------------------------------------
+# Cache Schemas
+# ---------------------------------------------------
+class CacheStats(BaseModel):
+    entries: int                # Responses currently cached
+    hits: int                   # Lookups served from the cache
+    misses: int                 # Lookups that went to the database
+    invalidations: int          # Times a write cleared the cache
+    hit_ratio: float            # hits / (hits + misses)
+
+
+# ---------------------------------------------------
+# Analytics Schemas (read from the sales rollups)
+# ---------------------------------------------------
+class RevenueBucket(BaseModel):
+    bucket: datetime            # Start of the hour or day (UTC)
+    orders: int                 # Orders placed in the bucket
+    revenue: float              # Their combined value
 
     model_config = {
         "from_attributes": True
     }
+
+class TopItem(BaseModel):
+    menu_item_id: int
+    name: Optional[str] = None  # None if the menu item has since been deleted
+    quantity: int               # Units sold in the range
+    revenue: float
+
+    model_config = {
+        "from_attributes": True
+    }
+
+class TicketStats(BaseModel):
+    orders: int                 # Orders placed in the range
+    revenue: float              # Their combined value
+    average_ticket: float       # revenue / orders (0 when there are none)
+
+
+# ---------------------------------------------------
+# Bulk import Schemas
+# ---------------------------------------------------
+class BulkRowError(BaseModel):
+    row: int                    # 1-based position in the upload (CSV: not counting the header)
+    name: Optional[str] = None  # Item name, when the row had one
+    error: str                  # Why the row was skipped
+
+class BulkResult(BaseModel):
+    created: int                # Rows inserted
+    updated: int                # Rows that matched an existing name and were overwritten
+    errors: List[BulkRowError]  # Rows skipped; every other row was imported
@@ -0,0 +1,127 @@
+# ---------------------------------------------------
+# app/search.py
+# ---------------------------------------------------
+"""
+Menu search over name, category and ingredients (GET /menu/search).
+
+SQLite reads the menu_search FTS5 index declared in app.models. Every
+query word matches as a prefix, so "nas gor" finds "Nasi Goreng". Results
+are ordered by bm25 rank. When a query finds nothing, each word that is
+not a prefix of any indexed term is swapped for the closest indexed terms
+of similar length (read from the fts5vocab table), and the query runs
+again. That absorbs most typos without slowing down ordinary queries.
+
+Postgres ranks by pg_trgm word_similarity over the same columns, through
+the GIN trigram index. Trigrams tolerate typos natively.
+"""
+import difflib
+import re
+from typing import List, Optional
+
+from sqlalchemy import bindparam, column, func, literal_column, select, table, text
+from sqlalchemy.orm import Session
+
+import app.models as models
+
+# Closest vocabulary terms tried per misspelled word
+MAX_CORRECTIONS = 3
+# difflib ratio a term needs to count as a correction
+CORRECTION_CUTOFF = 0.7
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+# The FTS5 table, as far as queries need to see it
+_menu_search = table("menu_search", column("rowid"), column("rank"))
+
+
+def query_words(q: str) -> List[str]:
+    return _WORD.findall(q.lower())
+
+
+def _fts_query(alternatives: List[List[str]]) -> str:
+    """AND of words, each an OR of quoted prefix terms: ("nasi"* OR "nas"*) "gor"*."""
+    groups = []
+    for terms in alternatives:
+        quoted = " OR ".join(f'"{term}"*' for term in terms)
+        groups.append(f"({quoted})" if len(terms) > 1 else quoted)
+    return " ".join(groups)
+
+
+def _is_indexed_prefix(db: Session, word: str) -> bool:
+    return db.execute(
+        text("SELECT 1 FROM menu_search_vocab WHERE term >= :word AND term < :upper LIMIT 1"),
+        {"word": word, "upper": word + "￿"},
+    ).first() is not None
+
+
+def _corrections(db: Session, word: str) -> List[str]:
+    """Indexed terms close to ``word``: same first letter, similar length."""
+    terms = db.execute(
+        text(
+            "SELECT term FROM menu_search_vocab WHERE term >= :first AND term < :upper "
+            "AND length(term) BETWEEN :shortest AND :longest"
+        ),
+        {"first": word[0], "upper": word[0] + "￿", "shortest": len(word) - 2, "longest": len(word) + 2},
+    ).scalars().all()
+    return difflib.get_close_matches(word, terms, n=MAX_CORRECTIONS, cutoff=CORRECTION_CUTOFF)
+
+
+def _filtered(stmt, category: Optional[str], available: Optional[bool]):
+    if category is not None:
+        stmt = stmt.where(models.MenuItem.category == category)
+    if available is not None:
+        stmt = stmt.where(models.MenuItem.available.is_(available))
+    return stmt
+
+
+def _sqlite_search(db: Session, words, category, available, limit) -> List[models.MenuItem]:
+    def run(match: str) -> List[models.MenuItem]:
+        stmt = (
+            select(models.MenuItem)
+            .join(_menu_search, _menu_search.c.rowid == models.MenuItem.id)
+            .where(literal_column("menu_search").op("MATCH")(match))
+            .order_by(_menu_search.c.rank)
+            .limit(limit)
+        )
+        return db.scalars(_filtered(stmt, category, available)).all()
+
+    items = run(_fts_query([[word] for word in words]))
+    if items:
+        return items
+    alternatives = []
+    for word in words:
+        if _is_indexed_prefix(db, word):
+            alternatives.append([word])
+        else:
+            corrections = _corrections(db, word)
+            if not corrections:
+                return []
+            alternatives.append(corrections)
+    if all(len(terms) == 1 and terms[0] == word for terms, word in zip(alternatives, words)):
+        return []
+    return run(_fts_query(alternatives))
+
+
+def _postgres_search(db: Session, q: str, category, available, limit) -> List[models.MenuItem]:
+    document = literal_column(models.MENU_SEARCH_TEXT)
+    query = bindparam("q", q)
+    stmt = (
+        select(models.MenuItem)
+        # word_similarity above pg_trgm.word_similarity_threshold, via the GIN index
+        .where(query.op("<%")(document))
+        .order_by(func.word_similarity(query, document).desc(), models.MenuItem.id)
+        .limit(limit)
+    )
+    return db.scalars(_filtered(stmt, category, available)).all()
+
+
+def search_menu_items(
+    db: Session, q: str, category: Optional[str] = None, available: Optional[bool] = None, limit: int = 20
+) -> List[models.MenuItem]:
+    """Best matches for ``q``, most relevant first."""
+    words = query_words(q)
+    if not words:
+        return []
+    if db.get_bind().dialect.name == "postgresql":
+        return _postgres_search(db, " ".join(words), category, available, limit)
+    return _sqlite_search(db, words, category, available, limit)
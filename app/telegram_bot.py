@@ -1,65 +1,90 @@
+"""
+Telegram delivery for staff alerts.
+
+Importing this module has no side effects: .env is read when the settings
+are first asked for, and python-telegram-bot is imported and the Bot built
+when the first message goes out, so a worker boots without either.
+"""
+import asyncio
+import functools
+import importlib.util
+import inspect
 import os
+from typing import Tuple
+
 from dotenv import load_dotenv
-from telegram import Bot
-from telegram.error import TelegramError
 from sqlalchemy.orm import Session
 
-from app.database import SessionLocal
-from app.models import Order, MenuItem
+from app.alerts import AlertDispatcher, fetch_order_summaries, format_order_alert
+from app.database import DEFAULT_BRANCH, branch_session
+
+
+@functools.lru_cache(maxsize=None)
+def telegram_settings() -> Tuple[str, int]:
+    """(token, chat ID) from the environment or .env; raises ValueError when one is missing."""
+    load_dotenv()
+    token, chat_id = os.getenv("TELEGRAM_TOKEN"), os.getenv("TELEGRAM_CHAT_ID")
+    if not token or not chat_id:
+        raise ValueError("Missing TELEGRAM_TOKEN or TELEGRAM_CHAT_ID in .env")
+    return token, int(chat_id)
+
+
+@functools.lru_cache(maxsize=None)
+def get_bot():
+    """The Telegram Bot, built on first use."""
+    from telegram import Bot
 
-# Load environment variables from .env
-load_dotenv()
+    token, _ = telegram_settings()
+    return Bot(token=token)
 
-TELEGRAM_TOKEN = os.getenv("TELEGRAM_TOKEN")
-TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
 
-if not TELEGRAM_TOKEN or not TELEGRAM_CHAT_ID:
-    raise ValueError("Missing TELEGRAM_TOKEN or TELEGRAM_CHAT_ID in .env")
+class LazyBot:
+    """Stands in for the Bot in the dispatcher; the Bot is built with the first alert."""
 
-# Initialize the Telegram Bot
-bot = Bot(token=TELEGRAM_TOKEN)
+    async def send_message(self, **kwargs):
+        # the first call imports python-telegram-bot; keep that off the loop
+        bot = await asyncio.to_thread(get_bot)
+        if inspect.iscoroutinefunction(bot.send_message):
+            return await bot.send_message(**kwargs)
+        return await asyncio.to_thread(bot.send_message, **kwargs)
 
 
-def send_order_alert(order_id: int):
+def build_dispatcher() -> AlertDispatcher:
     """
-    Fetch order details and send a Telegram alert to staff.
+    Background alert pipeline bound to the staff chat.
+    Started by app.main; handlers feed it through app.alerts.notify_order_created.
+    Raises ValueError when the bot is not configured, ImportError when
+    python-telegram-bot is not installed.
+    """
+    _, chat_id = telegram_settings()
+    if importlib.util.find_spec("telegram") is None:
+        raise ImportError("python-telegram-bot is not installed")
+    return AlertDispatcher(LazyBot(), chat_id)
+
+
+def send_order_alert(order_id: int, branch_id: int = DEFAULT_BRANCH):
+    """
+    Fetch order details and send a Telegram alert to staff, synchronously.
+    Prefer the background dispatcher; this is kept for scripts and manual use.
 
-    1. Open a DB session
-    2. Query the Order and its items
+    1. Open a DB session on the order's branch
+    2. Load the Order, its items and menu names in one joined query
     3. Build a user-friendly message, handling missing references
     4. Send via Telegram
     5. Close the session
     """
-    db: Session = SessionLocal()
+    from telegram.error import TelegramError
+
+    db: Session = branch_session(branch_id)
     try:
-        order = db.query(Order).filter(Order.id == order_id).first()
-        if not order:
+        summaries = fetch_order_summaries(db, [order_id])
+        if not summaries:
             return
 
-        # Construct message lines
-        lines = [
-            f"📣 *New Order Alert!* Order #{order.id}",
-            f"👤 Customer: {order.customer_name or 'Guest'}",
-            f"🍽️ Table: {order.table_number or 'N/A'}",
-            "🧾 Items:"
-        ]
-
-        # Append each ordered item, handling missing menu items gracefully
-        for item in order.items:
-            menu_item = db.query(MenuItem).filter(MenuItem.id == item.menu_item_id).first()
-            if menu_item:
-                item_name = menu_item.name
-            else:
-                item_name = f"[Unknown Item ID {item.menu_item_id}]"
-            lines.append(f"- {item_name} x {item.quantity}")
-
-        # Join into a single message
-        message = "\n".join(lines)
-
         # Send the message (Markdown for formatting)
-        bot.send_message(
-            chat_id=int(TELEGRAM_CHAT_ID),
-            text=message,
+        get_bot().send_message(
+            chat_id=telegram_settings()[1],
+            text=format_order_alert(summaries[0]),
             parse_mode="Markdown"
         )
     except TelegramError as e:
@@ -0,0 +1,146 @@
+# ---------------------------------------------------
+# benchmarks/bench_admission.py
+# ---------------------------------------------------
+"""
+Load-test admission control: write latency while reads saturate the app.
+
+Kitchen tablets place orders and move them into the kitchen (POST /orders/,
+PUT /orders/{id}/status) while customer devices flood the menu and the
+analytics endpoints. Each device is a client address of its own, like on
+the restaurant Wi-Fi. The app runs in-process as in benchmarks.load, and
+the writes are timed three ways:
+
+- alone, as the baseline;
+- under the read flood with admission control off;
+- under the read flood with admission control on (app.admission defaults).
+
+    python -m benchmarks.bench_admission --readers 64 --writers 4 --writes 100 -o admission.json
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+from collections import Counter
+from typing import Dict, List
+
+from benchmarks.common import latency_summary, write_results
+
+READ_PATHS = ("/menu/", "/menu/search?q=nasi", "/analytics/top-items", "/analytics/revenue")
+
+
+def _client(app, address: str):
+    import httpx
+
+    transport = httpx.ASGITransport(app=app, client=(address, 5000))
+    return httpx.AsyncClient(transport=transport, base_url="http://bench")
+
+
+async def _writer(app, address: str, writes: int, menu_items: int, rng: random.Random, latencies: List[float]):
+    async with _client(app, address) as client:
+        for _ in range(writes):
+            start = time.perf_counter()
+            response = await client.post("/orders/", json={
+                "table_number": rng.randint(1, 40),
+                "items": [{"menu_item_id": rng.randint(1, menu_items), "quantity": 1}],
+            })
+            latencies.append(time.perf_counter() - start)
+            response.raise_for_status()
+            start = time.perf_counter()
+            response = await client.put(f"/orders/{response.json()['id']}/status", params={"status": "In Kitchen"})
+            latencies.append(time.perf_counter() - start)
+            response.raise_for_status()
+
+
+async def _reader(app, address: str, stop: asyncio.Event, rng: random.Random, statuses: Counter):
+    async with _client(app, address) as client:
+        while not stop.is_set():
+            response = await client.get(rng.choice(READ_PATHS))
+            statuses[response.status_code] += 1
+            if response.status_code in (429, 503):
+                # devices honour Retry-After, or the stop, whichever comes first
+                try:
+                    await asyncio.wait_for(stop.wait(), float(response.headers["retry-after"]))
+                except asyncio.TimeoutError:
+                    pass
+
+
+async def _phase(app, case: str, readers: int, args, counts: Dict[str, int], rng: random.Random) -> dict:
+    stop, statuses, latencies = asyncio.Event(), Counter(), []
+    flood = [
+        asyncio.ensure_future(_reader(app, f"10.0.{i // 250}.{i % 250 + 1}", stop, rng, statuses))
+        for i in range(readers)
+    ]
+    await asyncio.sleep(args.ramp if readers else 0)
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        _writer(app, f"10.1.0.{i + 1}", args.writes, counts["menu_items"], rng, latencies)
+        for i in range(args.writers)
+    ))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await asyncio.gather(*flood)
+
+    result = {"case": case, **latency_summary(latencies, elapsed)}
+    result.update(
+        reads=sum(statuses.values()),
+        reads_ok=statuses[200],
+        reads_shed=statuses[429] + statuses[503],
+    )
+    print(f"{case:<28} writes p50 {result['p50_ms']:7.2f}  p95 {result['p95_ms']:7.2f}  p99 {result['p99_ms']:7.2f} ms"
+          f"  reads {result['reads']:>6} (shed {result['reads_shed']})")
+    return result
+
+
+async def run(args, counts: Dict[str, int]) -> List[dict]:
+    from app.admission import ADMISSION_CONCURRENCY, RATE_LIMIT_PER_SECOND, admission_gate, rate_limiter
+    from app.main import app
+
+    rng = random.Random(args.seed)
+    results = []
+    async with app.router.lifespan_context(app):
+        for case, readers, admission in (
+            ("writes alone", 0, True),
+            ("reads flood, admission off", args.readers, False),
+            ("reads flood, admission on", args.readers, True),
+        ):
+            admission_gate.limit = ADMISSION_CONCURRENCY if admission else 0
+            rate_limiter.rate = RATE_LIMIT_PER_SECOND if admission else 0
+            rate_limiter.clear()
+            results.append(await _phase(app, case, readers, args, counts, rng))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--orders", type=int, default=20_000)
+    parser.add_argument("--menu-items", type=int, default=200)
+    parser.add_argument("--readers", type=int, default=64, help="customer devices reading in a loop")
+    parser.add_argument("--writers", type=int, default=4, help="kitchen tablets writing")
+    parser.add_argument("--writes", type=int, default=100, help="orders per writer (each placed, then moved)")
+    parser.add_argument("--ramp", type=float, default=1.0, help="seconds of flood before timing writes")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("-o", "--output", help="JSON results file (default: stdout)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # must be set before app.database is imported
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        from sqlalchemy import create_engine
+        from app.database import configure_engine
+        from benchmarks.seed import seed
+
+        engine = configure_engine(create_engine(os.environ["DATABASE_URL"]))
+        counts = seed(engine, args.menu_items, orders=args.orders, seed=args.seed)
+        engine.dispose()
+
+        results = asyncio.run(run(args, counts))
+
+    params = {k: v for k, v in vars(args).items() if k != "output"}
+    params["db_mode"] = os.getenv("DB_MODE", "async")
+    write_results(args.output, "admission", params, results)
+
+
+if __name__ == "__main__":
+    main()
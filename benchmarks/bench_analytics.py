@@ -0,0 +1,130 @@
+# ---------------------------------------------------
+# benchmarks/bench_analytics.py
+# ---------------------------------------------------
+"""
+Benchmark the analytics queries: rollup tables vs raw aggregates.
+
+Seeds (or reuses) a SQLite file, then times each dashboard query two ways:
+through the crud functions, which read the hourly/daily rollups, and as
+the equivalent GROUP BY over orders, order_items and menu_items. Ranges
+cover the last day, the last week and the whole history, so the growth of
+the raw queries with history length is visible next to the flat rollups.
+
+    python -m benchmarks.bench_analytics --db /tmp/eato-10m.db --orders 3400000 --lines-per-order 3
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import timedelta
+from typing import Callable, Dict, List, Tuple
+
+from sqlalchemy import create_engine, func
+from sqlalchemy.orm import sessionmaker
+
+import app.crud as crud
+import app.models as models
+from app.database import configure_engine, engine_options
+from benchmarks.common import percentile, write_results
+from benchmarks.seed import seed
+
+
+def _orders_in(query, since, until):
+    return query.filter(models.Order.timestamp >= since, models.Order.timestamp < until)
+
+
+def _raw_revenue(db, since, until):
+    hour = func.strftime("%Y-%m-%d %H", models.Order.timestamp)
+    return (
+        _orders_in(db.query(hour, func.count(models.Order.id), func.sum(models.Order.total)), since, until)
+        .group_by(hour).order_by(hour).all()
+    )
+
+
+def _raw_top_items(db, since, until):
+    line = models.OrderItem
+    quantity = func.sum(line.quantity)
+    query = (
+        db.query(line.menu_item_id, models.MenuItem.name, quantity, func.sum(line.quantity * line.unit_price))
+        .join(models.Order, models.Order.id == line.order_id)
+        .outerjoin(models.MenuItem, models.MenuItem.id == line.menu_item_id)
+    )
+    return (
+        _orders_in(query, since, until)
+        .group_by(line.menu_item_id, models.MenuItem.name)
+        .order_by(quantity.desc()).limit(10).all()
+    )
+
+
+def _raw_ticket_size(db, since, until):
+    return _orders_in(db.query(func.count(models.Order.id), func.sum(models.Order.total)), since, until).one()
+
+
+def _time(Session, fn: Callable, repeat: int) -> Dict[str, float]:
+    samples = []
+    for _ in range(repeat):
+        with Session() as db:
+            start = time.perf_counter()
+            fn(db)
+            samples.append(time.perf_counter() - start)
+    return {"p50_ms": percentile(samples, 50) * 1000, "max_ms": max(samples) * 1000}
+
+
+def run(path: str, orders: int, lines_per_order: int, repeat: int) -> Tuple[List[Dict], int]:
+    url = f"sqlite:///{path}"
+    engine = configure_engine(create_engine(url, **engine_options(url)))
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        started = time.perf_counter()
+        counts = seed(engine, orders=orders, lines_per_order=lines_per_order)
+        print(f"seeded {counts} in {time.perf_counter() - started:.1f}s")
+    Session = sessionmaker(bind=engine, expire_on_commit=False)
+
+    with Session() as db:
+        first, last = db.query(func.min(models.Order.timestamp), func.max(models.Order.timestamp)).one()
+        lines = db.query(func.count(models.OrderItem.id)).scalar()
+    until = last + timedelta(seconds=1)
+    ranges = {"day": until - timedelta(days=1), "week": until - timedelta(days=7), "all": first}
+
+    results = []
+    for label, since in ranges.items():
+        cases = [
+            ("revenue/hour", lambda db: crud.get_revenue(db, since=since, until=until),
+             lambda db: _raw_revenue(db, since, until)),
+            ("top-items", lambda db: crud.get_top_items(db, since=since, until=until),
+             lambda db: _raw_top_items(db, since, until)),
+            ("ticket-size", lambda db: crud.get_ticket_stats(db, since=since, until=until),
+             lambda db: _raw_ticket_size(db, since, until)),
+        ]
+        for name, rollup, raw in cases:
+            result = {
+                "name": f"{name} [{label}]",
+                "rollup": _time(Session, rollup, repeat),
+                "raw": _time(Session, raw, max(1, repeat // 5)),
+            }
+            result["speedup"] = result["raw"]["p50_ms"] / max(result["rollup"]["p50_ms"], 1e-9)
+            results.append(result)
+            print(f"{result['name']:<26} rollup {result['rollup']['p50_ms']:9.2f} ms"
+                  f"   raw {result['raw']['p50_ms']:10.2f} ms   x{result['speedup']:.0f}")
+    engine.dispose()
+    return results, lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--db", help="SQLite file to reuse (seeded if missing); default: a temporary file")
+    parser.add_argument("--orders", type=int, default=100_000)
+    parser.add_argument("--lines-per-order", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("-o", "--output", help="write JSON results here")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.db or os.path.join(tmp, "analytics.db")
+        results, lines = run(path, args.orders, args.lines_per_order, args.repeat)
+    if args.output:
+        write_results(args.output, "analytics", {"orders": args.orders, "order_lines": lines,
+                                                 "repeat": args.repeat}, results)
+
+
+if __name__ == "__main__":
+    main()
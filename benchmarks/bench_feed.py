@@ -0,0 +1,76 @@
+# ---------------------------------------------------
+# benchmarks/bench_feed.py
+# ---------------------------------------------------
+"""
+Load test for the kitchen feed: what do idle SSE subscribers cost?
+
+Opens N subscribers on an EventFeed, each consumed by the same generator
+that GET /orders/stream serves, then measures memory per subscriber, CPU
+burned while everyone sits idle, and the time to fan one event out to all.
+
+    python -m benchmarks.bench_feed --subscribers 500 --idle 2
+"""
+import argparse
+import asyncio
+import time
+import tracemalloc
+
+from app.events import ORDER_CREATED, bus
+from app.feed import EventFeed
+
+
+async def _consume(feed, subscription, received):
+    async for frame in feed.stream(subscription):
+        if frame.startswith("id:"):
+            received.append(time.perf_counter())
+
+
+async def run(subscribers: int, idle: float, events: int):
+    feed = EventFeed("order.")
+    feed.start()
+    received = []
+
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    tasks = [
+        asyncio.create_task(_consume(feed, feed.subscribe(), received))
+        for _ in range(subscribers)
+    ]
+    await asyncio.sleep(0.1)  # let every consumer reach its first await
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    cpu_start = time.process_time()
+    await asyncio.sleep(idle)
+    idle_cpu = time.process_time() - cpu_start
+
+    latencies = []
+    for n in range(events):
+        received.clear()
+        start = time.perf_counter()
+        bus.publish(ORDER_CREATED, {"id": n, "status": "Received", "items": []})
+        while len(received) < subscribers:
+            await asyncio.sleep(0)
+        latencies.append(max(received) - start)
+
+    feed.stop()
+    await asyncio.gather(*tasks)
+
+    print(f"subscribers:            {subscribers}")
+    print(f"memory per subscriber:  {(after - before) / subscribers / 1024:.1f} KiB")
+    print(f"idle CPU over {idle:.0f}s:      {idle_cpu * 1000:.1f} ms ({idle_cpu / idle * 100:.2f}% of a core)")
+    print(f"fan-out to all (mean):  {sum(latencies) / len(latencies) * 1000:.2f} ms")
+    print(f"fan-out to all (max):   {max(latencies) * 1000:.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--subscribers", type=int, default=500)
+    parser.add_argument("--idle", type=float, default=2.0, help="seconds to sit idle")
+    parser.add_argument("--events", type=int, default=20, help="events to fan out")
+    args = parser.parse_args()
+    asyncio.run(run(args.subscribers, args.idle, args.events))
+
+
+if __name__ == "__main__":
+    main()
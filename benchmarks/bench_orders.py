@@ -0,0 +1,104 @@
+# ---------------------------------------------------
+# benchmarks/bench_orders.py
+# ---------------------------------------------------
+"""
+Measure order ingest throughput (orders/sec) against a temporary SQLite file.
+
+Compares the previous two-commit `create_order` (plus the lazy load of
+`Order.items` during serialization) with the single-transaction path and
+with `create_orders` batches.
+
+    python -m benchmarks.bench_orders --orders 2000 --items 4 --batch 50
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import app.crud as crud
+import app.models as models
+import app.schemas as schemas
+from app.database import Base
+
+
+def _legacy_create_order(db, order: schemas.OrderCreate) -> models.Order:
+    """The pre-optimization implementation, kept here as the baseline."""
+    db_order = models.Order(customer_name=order.customer_name, table_number=order.table_number)
+    db.add(db_order)
+    db.commit()
+    db.refresh(db_order)
+    for item in order.items:
+        db.add(models.OrderItem(order_id=db_order.id, menu_item_id=item.menu_item_id, quantity=item.quantity))
+    db.commit()
+    db.refresh(db_order)
+    return db_order
+
+
+def _make_session(path: str, expire_on_commit: bool):
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=expire_on_commit, bind=engine)
+    with Session() as db:
+        db.add_all(
+            models.MenuItem(name=f"Dish {i}", price=10.0 + i, category="Food") for i in range(20)
+        )
+        db.commit()
+    return engine, Session
+
+
+def _payloads(count: int, items: int):
+    return [
+        schemas.OrderCreate(
+            customer_name=f"Guest {n}",
+            table_number=n % 30,
+            items=[schemas.OrderItemCreate(menu_item_id=(n + i) % 20 + 1, quantity=1 + i) for i in range(items)],
+        )
+        for n in range(count)
+    ]
+
+
+def _run(label, expire_on_commit, payloads, ingest):
+    with tempfile.TemporaryDirectory() as tmp:
+        engine, Session = _make_session(os.path.join(tmp, "bench.db"), expire_on_commit)
+        with Session() as db:
+            start = time.perf_counter()
+            for db_order in ingest(db, payloads):
+                # serialize like the router does, so lazy loads are counted
+                schemas.Order.model_validate(db_order).model_dump_json()
+            elapsed = time.perf_counter() - start
+        engine.dispose()
+    rate = len(payloads) / elapsed
+    print(f"{label:<28} {len(payloads):>7} orders  {elapsed:8.3f}s  {rate:10.1f} orders/sec")
+    return rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--orders", type=int, default=2000)
+    parser.add_argument("--items", type=int, default=4, help="lines per order")
+    parser.add_argument("--batch", type=int, default=50, help="orders per create_orders call")
+    args = parser.parse_args()
+
+    payloads = _payloads(args.orders, args.items)
+
+    def legacy(db, orders):
+        return (_legacy_create_order(db, order) for order in orders)
+
+    def single(db, orders):
+        return (crud.create_order(db, order) for order in orders)
+
+    def batched(db, orders):
+        for start in range(0, len(orders), args.batch):
+            yield from crud.create_orders(db, orders[start:start + args.batch])
+
+    before = _run("legacy create_order", True, payloads, legacy)
+    after = _run("create_order", False, payloads, single)
+    _run(f"create_orders (batch={args.batch})", False, payloads, batched)
+    print(f"single-order speedup: {after / before:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+# ---------------------------------------------------
+# benchmarks/bench_search.py
+# ---------------------------------------------------
+"""
+Benchmark menu search: the FTS5 index vs a LIKE scan.
+
+Builds a catalog of generated dish names (default 50k items) and times
+prefix queries, multi-word queries, misspelled queries (which take the
+correction path) and filtered queries through crud.search_menu_items,
+next to the '%word%' LIKE filter the menu list would otherwise need.
+
+    python -m benchmarks.bench_search --items 50000 --repeat 50
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from typing import Dict, List
+
+from sqlalchemy import create_engine, insert, or_
+from sqlalchemy.orm import sessionmaker
+
+import app.crud as crud
+import app.models as models
+from app.database import Base, configure_engine, engine_options
+from benchmarks.common import percentile, write_results
+
+BASES = ["nasi", "mie", "bihun", "kwetiau", "soto", "sate", "bakso", "gado", "rawon", "pecel", "lontong",
+         "ketoprak", "martabak", "roti", "bubur", "sop", "ayam", "bebek", "ikan", "udang", "cumi", "tahu"]
+STYLES = ["goreng", "rebus", "bakar", "panggang", "kuah", "penyet", "geprek", "balado", "rica", "kecap",
+          "pedas", "manis", "asam", "madura", "padang", "betawi", "bali", "jawa", "special", "komplit"]
+INGREDIENTS = ["rice", "egg", "chili", "garlic", "shallot", "peanut", "coconut", "lime", "tamarind", "ginger",
+               "lemongrass", "turmeric", "soy", "palm sugar", "cabbage", "sprouts", "tofu", "tempeh", "beef",
+               "chicken", "shrimp", "squid", "noodles", "cucumber", "tomato", "basil", "candlenut"]
+CATEGORIES = ["Food", "Noodles", "Rice", "Soup", "Grill", "Snack", "Dessert", "Drink"]
+
+QUERIES = {
+    "prefix": ["nas", "gor", "sat", "bak", "ren"],
+    "two words": ["nasi goreng", "mie kuah", "ayam bakar", "sate madura", "soto betawi"],
+    "typo": ["nasu goreng", "mie gorneg", "ayam bakra", "sotto betawi", "rawn"],
+}
+
+
+def _catalog(items: int, rng: random.Random) -> List[Dict]:
+    rows = []
+    for n in range(items):
+        words = [rng.choice(BASES), rng.choice(STYLES)]
+        if rng.random() < 0.5:
+            words.append(rng.choice(STYLES))
+        rows.append({
+            "name": f"{' '.join(words).title()} {n}",
+            "price": round(rng.uniform(1, 15), 2),
+            "category": rng.choice(CATEGORIES),
+            "available": rng.random() < 0.9,
+            "ingredients": ", ".join(rng.sample(INGREDIENTS, 4)),
+        })
+    return rows
+
+
+def _like(db, q: str, limit: int = 20):
+    query = db.query(models.MenuItem)
+    for word in q.split():
+        pattern = f"%{word}%"
+        query = query.filter(or_(models.MenuItem.name.ilike(pattern), models.MenuItem.category.ilike(pattern),
+                                 models.MenuItem.ingredients.ilike(pattern)))
+    return query.limit(limit).all()
+
+
+def _time(Session, fn, queries: List[str], repeat: int) -> Dict[str, float]:
+    samples = []
+    with Session() as db:
+        for _ in range(repeat):
+            for q in queries:
+                start = time.perf_counter()
+                fn(db, q)
+                samples.append(time.perf_counter() - start)
+    return {"p50_ms": percentile(samples, 50) * 1000, "p95_ms": percentile(samples, 95) * 1000}
+
+
+def run(path: str, items: int, repeat: int) -> List[Dict]:
+    url = f"sqlite:///{path}"
+    engine = configure_engine(create_engine(url, **engine_options(url)))
+    Base.metadata.create_all(bind=engine)
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        conn.execute(insert(models.MenuItem), _catalog(items, random.Random(42)))
+    print(f"indexed {items} items in {time.perf_counter() - started:.1f}s")
+    Session = sessionmaker(bind=engine, expire_on_commit=False)
+
+    cases = [(label, queries, lambda db, q: crud.search_menu_items(db, q)) for label, queries in QUERIES.items()]
+    cases.append(("filtered", QUERIES["two words"],
+                  lambda db, q: crud.search_menu_items(db, q, category="Rice", available=True)))
+    results = []
+    for label, queries, search in cases:
+        result = {"name": label, "fts": _time(Session, search, queries, repeat)}
+        if label != "typo":  # LIKE finds nothing for typos, so the timing says little
+            result["like"] = _time(Session, _like, queries, max(1, repeat // 5))
+        results.append(result)
+        like = f"   LIKE p50 {result['like']['p50_ms']:8.2f} ms" if "like" in result else ""
+        print(f"{label:<10} search p50 {result['fts']['p50_ms']:6.2f} ms  p95 {result['fts']['p95_ms']:6.2f} ms{like}")
+    engine.dispose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--items", type=int, default=50_000)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("-o", "--output", help="write JSON results here")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        results = run(os.path.join(tmp, "search.db"), args.items, args.repeat)
+    if args.output:
+        write_results(args.output, "search", {"items": args.items, "repeat": args.repeat}, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+# ---------------------------------------------------
+# benchmarks/bench_serialization.py
+# ---------------------------------------------------
+"""
+Benchmark list serialization: ORM + response_model vs column projection.
+
+Times one page of GET /orders/, /menu/ and /inventory/ from query to
+response bytes, both the way FastAPI renders ORM objects through
+response_model (validate into schemas.*, jsonable_encoder, json.dumps) and
+through the crud ``*_rows`` projections encoded by app.projection, and
+reports rows per second for each.
+
+    python -m benchmarks.bench_serialization --orders 20000 --limit 100 --repeat 200
+"""
+import argparse
+import os
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import app.crud as crud
+import app.schemas as schemas
+from app.database import DEFAULT_BRANCH, configure_engine, engine_options
+from app.projection import dump_rows
+from benchmarks.common import percentile, write_results
+from benchmarks.seed import seed
+
+
+def _response_model(schema, load: Callable) -> Callable:
+    adapter = TypeAdapter(List[schema])
+
+    def render(db, limit):
+        return JSONResponse(jsonable_encoder(adapter.validate_python(load(db, limit), from_attributes=True))).body
+    return render
+
+
+def _projection(load: Callable) -> Callable:
+    return lambda db, limit: dump_rows(load(db, limit))
+
+
+CASES = {
+    "orders": (
+        _response_model(schemas.Order, lambda db, limit: crud.get_orders(db, limit=limit)),
+        _projection(lambda db, limit: crud.get_order_rows(db, limit=limit)),
+    ),
+    "menu": (
+        _response_model(schemas.MenuItem, lambda db, limit: crud.get_menu_items(db, limit=limit)),
+        _projection(lambda db, limit: crud.get_menu_item_rows(db, limit=limit)),
+    ),
+    "inventory": (
+        _response_model(schemas.InventoryItem, lambda db, limit: crud.get_inventory_items(db, limit=limit)),
+        _projection(lambda db, limit: crud.get_inventory_item_rows(db, limit=limit)),
+    ),
+}
+
+
+def _time(Session, render: Callable, limit: int, repeat: int) -> Dict[str, float]:
+    samples = []
+    # a fresh session per page, like a request: nothing left in the identity map
+    for _ in range(repeat):
+        with Session(info={"branch_id": DEFAULT_BRANCH}) as db:
+            start = time.perf_counter()
+            render(db, limit)
+            samples.append(time.perf_counter() - start)
+    return {
+        "rows_per_sec": limit * len(samples) / sum(samples),
+        "p50_ms": percentile(samples, 50) * 1000,
+        "p95_ms": percentile(samples, 95) * 1000,
+    }
+
+
+def run(path: str, orders: int, limit: int, repeat: int) -> List[Dict]:
+    url = f"sqlite:///{path}"
+    engine = configure_engine(create_engine(url, **engine_options(url)))
+    seed(engine, menu_items=max(limit, 200), inventory_items=max(limit, 500), orders=orders)
+    Session = sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+
+    results = []
+    for endpoint, (orm, projected) in CASES.items():
+        with Session(info={"branch_id": DEFAULT_BRANCH}) as db:
+            assert orm(db, limit) == projected(db, limit), f"{endpoint}: projected JSON differs"
+        for path_name, render in (("response_model", orm), ("projection", projected)):
+            result = {"case": f"{endpoint} {path_name}", **_time(Session, render, limit, repeat)}
+            results.append(result)
+            print(f"{result['case']:<26} {result['rows_per_sec']:>10,.0f} rows/s"
+                  f"  p50 {result['p50_ms']:7.2f} ms  p95 {result['p95_ms']:7.2f} ms")
+    engine.dispose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--orders", type=int, default=20_000)
+    parser.add_argument("--limit", type=int, default=100, help="rows per page")
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("-o", "--output", help="write JSON results here")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        results = run(os.path.join(tmp, "serialization.db"), args.orders, args.limit, args.repeat)
+    if args.output:
+        write_results(
+            args.output, "serialization", {"orders": args.orders, "limit": args.limit, "repeat": args.repeat}, results
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+# ---------------------------------------------------
+# benchmarks/bench_startup.py
+# ---------------------------------------------------
+"""
+Benchmark app boot: import time, startup hooks and first-request latency.
+
+Each repeat is a fresh interpreter (as a new worker is), which imports
+app.main, runs the startup hooks, then serves GET /menu/ twice through an
+ASGI client; the first request pays for whatever was left lazy, the second
+is the warm comparison. The parent seeds and migrates a temporary SQLite
+database first and reports the percentiles of each stage, plus the whole
+process from exec to exit.
+
+    python -m benchmarks.bench_startup --repeat 20 -o startup.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+from benchmarks.common import percentile, write_results
+
+STAGES = ("import", "startup", "first_request", "second_request", "process")
+
+
+def child() -> None:
+    """One boot, timed from inside the worker; prints the stage timings as JSON."""
+    started = time.perf_counter()
+    from app.main import app
+    imported = time.perf_counter()
+
+    import httpx
+
+    async def boot() -> Dict[str, float]:
+        timings = {"import": imported - started}
+        start = time.perf_counter()
+        async with app.router.lifespan_context(app):
+            timings["startup"] = time.perf_counter() - start
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+                for stage in ("first_request", "second_request"):
+                    start = time.perf_counter()
+                    (await client.get("/menu/")).raise_for_status()
+                    timings[stage] = time.perf_counter() - start
+        return timings
+
+    print(json.dumps(asyncio.run(boot())))
+
+
+def run(path: str, repeat: int) -> List[Dict]:
+    env = {**os.environ, "DATABASE_URL": f"sqlite:///{path}", "LOG_LEVEL": "WARNING"}
+    samples: Dict[str, List[float]] = {stage: [] for stage in STAGES}
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_startup", "--child"],
+            env=env, capture_output=True, text=True, check=True,
+        ).stdout
+        samples["process"].append(time.perf_counter() - start)
+        for stage, seconds in json.loads(output.splitlines()[-1]).items():
+            samples[stage].append(seconds)
+
+    results = []
+    for stage in STAGES:
+        result = {
+            "case": stage,
+            "p50_ms": percentile(samples[stage], 50) * 1000,
+            "p95_ms": percentile(samples[stage], 95) * 1000,
+            "max_ms": max(samples[stage]) * 1000,
+        }
+        results.append(result)
+        print(f"{stage:<16} p50 {result['p50_ms']:8.2f}  p95 {result['p95_ms']:8.2f}  max {result['max_ms']:8.2f} ms")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--menu-items", type=int, default=200)
+    parser.add_argument("--orders", type=int, default=2_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("-o", "--output", help="JSON results file (default: stdout)")
+    args = parser.parse_args()
+    if args.child:
+        child()
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "startup.db")
+        from sqlalchemy import create_engine
+        from app.database import configure_engine
+        from app.migrations import migrate
+        from benchmarks.seed import seed
+
+        engine = configure_engine(create_engine(f"sqlite:///{path}"))
+        seed(engine, args.menu_items, orders=args.orders)
+        migrate(engine)
+        engine.dispose()
+        results = run(path, args.repeat)
+
+    params = {k: v for k, v in vars(args).items() if k not in ("output", "child")}
+    write_results(args.output, "startup", params, results)
+
+
+if __name__ == "__main__":
+    main()
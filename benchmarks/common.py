@@ -0,0 +1,63 @@
+# ---------------------------------------------------
+# benchmarks/common.py
+# ---------------------------------------------------
+"""Shared helpers for the benchmark suite: percentiles and JSON results."""
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence
+
+
+def percentile(samples: Sequence[float], pct: float) -> float:
+    """Nearest-rank percentile of ``samples`` (pct in 0..100)."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def latency_summary(samples: Sequence[float], elapsed: float) -> Dict[str, float]:
+    """p50/p95/p99/max in milliseconds plus throughput for one run."""
+    return {
+        "requests": len(samples),
+        "rps": len(samples) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(samples, 50) * 1000,
+        "p95_ms": percentile(samples, 95) * 1000,
+        "p99_ms": percentile(samples, 99) * 1000,
+        "max_ms": max(samples) * 1000 if samples else 0.0,
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def write_results(path: Optional[str], suite: str, params: Dict[str, Any], results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Write a results document (to ``path``, or stdout when it is None or "-")."""
+    document = {
+        "suite": suite,
+        "commit": _git_commit(),
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "params": params,
+        "results": results,
+    }
+    text = json.dumps(document, indent=2)
+    if path in (None, "-"):
+        print(text)
+    else:
+        with open(path, "w") as f:
+            f.write(text + "\n")
+    return document
@@ -0,0 +1,56 @@
+# ---------------------------------------------------
+# benchmarks/compare.py
+# ---------------------------------------------------
+"""
+Compare two benchmark result files (from load.py, micro.py, bench_serialization.py,
+bench_admission.py or bench_startup.py).
+
+    python -m benchmarks.compare before.json after.json
+"""
+import argparse
+import json
+
+# metric per suite, and whether higher is better
+METRICS = {
+    "load": [("rps", True), ("p50_ms", False), ("p99_ms", False)],
+    "micro": [("ops_per_sec", True), ("p50_us", False), ("p95_us", False)],
+    "serialization": [("rows_per_sec", True), ("p50_ms", False), ("p95_ms", False)],
+    "admission": [("p50_ms", False), ("p95_ms", False), ("p99_ms", False)],
+    "startup": [("p50_ms", False), ("p95_ms", False)],
+}
+
+
+def _key(result: dict):
+    return result.get("case") or (result["endpoint"], result["concurrency"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("before")
+    parser.add_argument("after")
+    args = parser.parse_args()
+
+    with open(args.before) as f:
+        before = json.load(f)
+    with open(args.after) as f:
+        after = json.load(f)
+    if before["suite"] != after["suite"]:
+        parser.error(f"cannot compare {before['suite']} results with {after['suite']} results")
+
+    print(f"{before['suite']}: {before.get('commit')} -> {after.get('commit')}")
+    previous = {_key(r): r for r in before["results"]}
+    for result in after["results"]:
+        old = previous.get(_key(result))
+        if old is None:
+            continue
+        label = " c=".join(str(part) for part in _key(result)) if isinstance(_key(result), tuple) else _key(result)
+        cells = []
+        for metric, higher_is_better in METRICS[after["suite"]]:
+            change = (result[metric] - old[metric]) / old[metric] * 100 if old[metric] else 0.0
+            better = change > 0 if higher_is_better else change < 0
+            cells.append(f"{metric} {old[metric]:9.2f} -> {result[metric]:9.2f} ({change:+6.1f}%{'' if better or not change else ' !'})")
+        print(f"{label:<42} " + "  ".join(cells))
+
+
+if __name__ == "__main__":
+    main()
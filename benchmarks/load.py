@@ -0,0 +1,134 @@
+# ---------------------------------------------------
+# benchmarks/load.py
+# ---------------------------------------------------
+"""
+Load-test the real FastAPI app in-process at fixed concurrency levels.
+
+Seeds a temporary SQLite database, points DATABASE_URL at it, imports
+app.main:app and drives it through an ASGI client (no network, no
+uvicorn), so the numbers reflect the app itself. For each endpoint and
+concurrency level it reports p50/p95/p99 latency and requests/sec, and
+writes everything to JSON for diffing between commits:
+
+    python -m benchmarks.load --orders 100000 --concurrency 1 10 50 -o load.json
+    DB_MODE=sync python -m benchmarks.load -o load-sync.json
+    python -m benchmarks.compare load-sync.json load.json
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+from typing import Callable, Dict, List, Tuple
+
+from benchmarks.common import latency_summary, write_results
+
+# (name, method, path factory, JSON body factory)
+Endpoint = Tuple[str, str, Callable[[random.Random], str], Callable[[random.Random], object]]
+
+
+def endpoints(counts: Dict[str, int]) -> List[Endpoint]:
+    menu, orders, inventory = counts["menu_items"], counts["orders"], counts["inventory_items"]
+    no_body = lambda rng: None
+    return [
+        ("GET /menu/", "GET", lambda rng: "/menu/", no_body),
+        ("GET /menu/{id}", "GET", lambda rng: f"/menu/{rng.randint(1, menu)}", no_body),
+        ("GET /orders/", "GET", lambda rng: "/orders/?limit=50", no_body),
+        ("GET /orders/?status", "GET", lambda rng: "/orders/?status=Received&limit=50", no_body),
+        ("GET /orders/active", "GET", lambda rng: "/orders/active", no_body),
+        ("GET /orders/{id}", "GET", lambda rng: f"/orders/{rng.randint(1, orders)}", no_body),
+        ("GET /inventory/", "GET", lambda rng: "/inventory/", no_body),
+        ("GET /inventory/{id}", "GET", lambda rng: f"/inventory/{rng.randint(1, inventory)}", no_body),
+        ("GET /inventory/low-stock", "GET", lambda rng: "/inventory/low-stock", no_body),
+        ("POST /orders/", "POST", lambda rng: "/orders/", lambda rng: {
+            "table_number": rng.randint(1, 40),
+            "items": [{"menu_item_id": rng.randint(1, menu), "quantity": 1} for _ in range(3)],
+        }),
+    ]
+
+
+async def _run_level(client, endpoint: Endpoint, concurrency: int, requests: int, rng: random.Random):
+    name, method, make_path, make_body = endpoint
+    latencies: List[float] = []
+    errors = 0
+    remaining = requests
+
+    async def worker():
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            body = make_body(rng)
+            start = time.perf_counter()
+            response = await client.request(method, make_path(rng), json=body)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    result = latency_summary(latencies, time.perf_counter() - started)
+    result.update(endpoint=name, concurrency=concurrency, errors=errors)
+    return result
+
+
+async def run(args, counts: Dict[str, int]) -> List[dict]:
+    import httpx
+    from app.admission import rate_limiter
+    from app.main import app
+
+    # one client stands in for a whole restaurant; per-client limits would
+    # measure the limiter (benchmarks.bench_admission covers admission control)
+    rate_limiter.rate = 0
+    rng = random.Random(args.seed)
+    selected = [e for e in endpoints(counts) if not args.endpoint or e[0] in args.endpoint]
+    results = []
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for endpoint in selected:
+                # warm-up: caches, connection pool, code paths
+                await _run_level(client, endpoint, 1, args.warmup, rng)
+                for concurrency in args.concurrency:
+                    result = await _run_level(client, endpoint, concurrency, args.requests, rng)
+                    results.append(result)
+                    print(f"{result['endpoint']:<26} c={concurrency:<4} {result['rps']:9.1f} req/s  "
+                          f"p50 {result['p50_ms']:7.2f}  p95 {result['p95_ms']:7.2f}  "
+                          f"p99 {result['p99_ms']:7.2f} ms  errors {result['errors']}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--orders", type=int, default=20_000)
+    parser.add_argument("--menu-items", type=int, default=200)
+    parser.add_argument("--inventory-items", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--requests", type=int, default=500, help="requests per endpoint and level")
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--endpoint", action="append", help="only run this endpoint (repeatable)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("-o", "--output", help="JSON results file (default: stdout)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        # must be set before app.database is imported
+        os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+        from sqlalchemy import create_engine
+        from app.database import configure_engine
+        from benchmarks.seed import seed
+
+        engine = configure_engine(create_engine(os.environ["DATABASE_URL"]))
+        counts = seed(engine, args.menu_items, args.inventory_items, args.orders, seed=args.seed)
+        engine.dispose()
+
+        results = asyncio.run(run(args, counts))
+
+    params = {k: v for k, v in vars(args).items() if k != "output"}
+    params["db_mode"] = os.getenv("DB_MODE", "async")
+    write_results(args.output, "load", params, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+# ---------------------------------------------------
+# benchmarks/micro.py
+# ---------------------------------------------------
+"""
+Micro-benchmarks for every app.crud function and for schemas serialization.
+
+Each case runs against a freshly seeded temporary SQLite file with a new
+session per call, the way a request would. Results (ops/sec, p50/p95 in
+microseconds) go to JSON for diffing between commits:
+
+    python -m benchmarks.micro --orders 50000 -o micro.json
+"""
+import argparse
+import itertools
+import os
+import random
+import tempfile
+import time
+from typing import Callable, Dict, List, Tuple
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import app.crud as crud
+import app.schemas as schemas
+from app.database import configure_engine, engine_options
+from benchmarks.common import percentile, write_results
+from benchmarks.seed import seed
+
+
+def _cases(counts: Dict[str, int], rng: random.Random) -> List[Tuple[str, Callable]]:
+    menu, orders, inventory = counts["menu_items"], counts["orders"], counts["inventory_items"]
+    menu_ids = itertools.count(menu, -1)
+    inventory_ids = itertools.count(inventory, -1)
+    # orders placed by the create_order cases are Received; walk them into the kitchen
+    new_order_ids = itertools.count(orders + 1)
+    menu_payload = lambda: schemas.MenuItemCreate(name=f"Bench {rng.random()}", price=5.0, category="Food")
+    stock_payload = lambda: schemas.InventoryItemCreate(name=f"Bench {rng.random()}", quantity=500.0, unit="kg")
+    order_payload = lambda: schemas.OrderCreate(
+        table_number=rng.randint(1, 40),
+        items=[schemas.OrderItemCreate(menu_item_id=rng.randint(1, menu), quantity=1) for _ in range(3)],
+    )
+    return [
+        ("crud.get_menu_items", lambda db: crud.get_menu_items(db)),
+        ("crud.get_menu_item", lambda db: crud.get_menu_item(db, rng.randint(1, menu))),
+        ("crud.create_menu_item", lambda db: crud.create_menu_item(db, menu_payload())),
+        ("crud.update_menu_item", lambda db: crud.update_menu_item(db, rng.randint(1, menu), menu_payload())),
+        ("crud.upsert_menu_items[500]", lambda db: crud.upsert_menu_items(db, [menu_payload() for _ in range(500)])),
+        ("crud.get_recipe", lambda db: crud.get_recipe(db, rng.randint(1, menu))),
+        ("crud.create_order", lambda db: crud.create_order(db, order_payload())),
+        ("crud.create_orders[50]", lambda db: crud.create_orders(db, [order_payload() for _ in range(50)])),
+        ("crud.get_order", lambda db: crud.get_order(db, rng.randint(1, orders))),
+        ("crud.get_orders", lambda db: crud.get_orders(db, limit=50)),
+        ("crud.get_orders(status)", lambda db: crud.get_orders(db, limit=50, status="Received")),
+        ("crud.get_active_orders", lambda db: crud.get_active_orders(db)),
+        ("crud.update_order_status", lambda db: crud.update_order_status(db, next(new_order_ids), "In Kitchen")),
+        ("crud.get_inventory_items", lambda db: crud.get_inventory_items(db)),
+        ("crud.get_inventory_item", lambda db: crud.get_inventory_item(db, rng.randint(1, inventory))),
+        ("crud.get_low_stock_items", lambda db: crud.get_low_stock_items(db)),
+        ("crud.create_inventory_item", lambda db: crud.create_inventory_item(db, stock_payload())),
+        ("crud.update_inventory_item", lambda db: crud.update_inventory_item(db, rng.randint(1, inventory), stock_payload())),
+        ("crud.set_recipe", lambda db: crud.set_recipe(db, rng.randint(1, menu), [
+            schemas.RecipeItemCreate(inventory_item_id=rng.randint(1, inventory), quantity=0.1)
+        ])),
+        # deletes run last and walk down from the highest seeded IDs
+        ("crud.delete_menu_item", lambda db: crud.delete_menu_item(db, next(menu_ids))),
+        ("crud.delete_inventory_item", lambda db: crud.delete_inventory_item(db, next(inventory_ids))),
+    ]
+
+
+def _serialization_cases(Session) -> List[Tuple[str, Callable]]:
+    with Session() as db:
+        orders = crud.get_orders(db, limit=100)
+        menu = crud.get_menu_items(db, limit=100)
+    return [
+        ("schemas.Order x100 validate+dump_json",
+         lambda _: [schemas.Order.model_validate(o).model_dump_json() for o in orders]),
+        ("schemas.MenuItem x100 validate+dump_json",
+         lambda _: [schemas.MenuItem.model_validate(m).model_dump_json() for m in menu]),
+    ]
+
+
+def _measure(name: str, fn: Callable, Session, iterations: int) -> dict:
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        with Session() as db:
+            fn(db)
+        timings.append(time.perf_counter() - start)
+    total = sum(timings)
+    result = {
+        "case": name,
+        "iterations": iterations,
+        "ops_per_sec": iterations / total if total else 0.0,
+        "p50_us": percentile(timings, 50) * 1e6,
+        "p95_us": percentile(timings, 95) * 1e6,
+    }
+    print(f"{name:<42} {result['ops_per_sec']:10.1f} ops/s  p50 {result['p50_us']:9.1f}  p95 {result['p95_us']:9.1f} us")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--orders", type=int, default=20_000)
+    parser.add_argument("--menu-items", type=int, default=200)
+    parser.add_argument("--inventory-items", type=int, default=500)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--case", action="append", help="only run cases containing this text (repeatable)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("-o", "--output", help="JSON results file (default: stdout)")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'micro.db')}"
+        engine = configure_engine(create_engine(url, **engine_options(url)))
+        counts = seed(engine, args.menu_items, args.inventory_items, args.orders, seed=args.seed)
+        Session = sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+
+        cases = _cases(counts, rng) + _serialization_cases(Session)
+        if args.case:
+            cases = [c for c in cases if any(text in c[0] for text in args.case)]
+        results = [_measure(name, fn, Session, args.iterations) for name, fn in cases]
+        engine.dispose()
+
+    params = {k: v for k, v in vars(args).items() if k != "output"}
+    write_results(args.output, "micro", params, results)
+
+
+if __name__ == "__main__":
+    main()
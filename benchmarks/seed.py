@@ -0,0 +1,134 @@
+# ---------------------------------------------------
+# benchmarks/seed.py
+# ---------------------------------------------------
+"""
+Seed a synthetic EATO dataset into a SQLite file.
+
+Rows go in with chunked executemany on the core tables, so millions of
+orders take seconds rather than the hours the ORM would need. The data is
+deterministic for a given --seed, so runs on different commits compare
+like with like.
+
+    python -m benchmarks.seed /tmp/eato-bench.db --orders 1000000
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Dict
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+import app.analytics as analytics
+import app.models as models
+from app.database import Base, configure_engine
+
+CATEGORIES = ["Food", "Drink", "Dessert", "Snack"]
+CHUNK = 10_000
+# The newest orders are still open in the kitchen; older ones are Served or Cancelled
+OPEN_ORDERS = 60
+# Minutes after placing at which a served order entered each later status
+STAGE_MINUTES = {"in_kitchen_at": 2, "ready_at": 12, "served_at": 15}
+
+
+def seed(
+    engine: Engine,
+    menu_items: int = 200,
+    inventory_items: int = 500,
+    orders: int = 10_000,
+    lines_per_order: int = 3,
+    days: int = 90,
+    seed: int = 42,
+) -> Dict[str, int]:
+    """Create the schema on ``engine`` and fill it. Returns row counts."""
+    rng = random.Random(seed)
+    Base.metadata.create_all(bind=engine)
+    start = datetime(2025, 1, 1)
+    span = days * 24 * 3600
+
+    menu_rows = [
+        {"id": i, "name": f"Dish {i}", "price": round(rng.uniform(1, 20), 2),
+         "category": rng.choice(CATEGORIES), "available": rng.random() > 0.05,
+         "ingredients": "rice, egg, chili", "version": i}
+        for i in range(1, menu_items + 1)
+    ]
+    prices = {row["id"]: row["price"] for row in menu_rows}
+    with engine.begin() as conn:
+        conn.execute(insert(models.MenuItem), menu_rows)
+        quantities = [rng.uniform(0, 1000) for _ in range(inventory_items)]
+        conn.execute(insert(models.InventoryItem), [
+            {"id": i, "name": f"Ingredient {i}", "quantity": quantity,
+             "unit": "kg", "threshold": 10.0, "low_stock": quantity <= 10.0, "version": i}
+            for i, quantity in enumerate(quantities, start=1)
+        ])
+        # each row written once, in ID order
+        conn.execute(insert(models.ChangeCounter), [
+            {"feed": "menu_items", "version": menu_items}, {"feed": "inventory_items", "version": inventory_items},
+        ])
+
+    order_id = item_id = 0
+    while order_id < orders:
+        batch = min(CHUNK, orders - order_id)
+        # timestamps increase with id, like real traffic
+        order_rows = []
+        item_rows = []
+        for _ in range(batch):
+            order_id += 1
+            timestamp = start + timedelta(seconds=span * order_id / orders)
+            open_order = orders - order_id < OPEN_ORDERS
+            order = {
+                "id": order_id,
+                "customer_name": f"Guest {order_id % 997}",
+                "table_number": rng.randint(1, 40),
+                "status": rng.choice(models.ACTIVE_STATUSES if open_order else ["Served"] * 19 + ["Cancelled"]),
+                "timestamp": timestamp,
+                "total": 0.0,
+                "item_count": 0,
+                "in_kitchen_at": None, "ready_at": None, "served_at": None, "cancelled_at": None,
+            }
+            if order["status"] == "Served":
+                order.update({column: timestamp + timedelta(minutes=minutes) for column, minutes in STAGE_MINUTES.items()})
+            elif order["status"] == "Cancelled":
+                order["cancelled_at"] = timestamp + timedelta(minutes=1)
+            order_rows.append(order)
+            for _ in range(lines_per_order):
+                item_id += 1
+                menu_item_id, quantity = rng.randint(1, menu_items), rng.randint(1, 3)
+                item_rows.append({
+                    "id": item_id, "order_id": order_id, "menu_item_id": menu_item_id,
+                    "quantity": quantity, "unit_price": prices[menu_item_id],
+                })
+                order["total"] += quantity * prices[menu_item_id]
+                order["item_count"] += quantity
+        with engine.begin() as conn:
+            conn.execute(insert(models.Order), order_rows)
+            conn.execute(insert(models.OrderItem), item_rows)
+
+    # derived tables, as the app would have maintained them
+    with Session(engine) as db:
+        analytics.rebuild(db)
+
+    return {"menu_items": menu_items, "inventory_items": inventory_items,
+            "orders": orders, "order_items": item_id}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("path", help="SQLite file to create (must not exist)")
+    parser.add_argument("--menu-items", type=int, default=200)
+    parser.add_argument("--inventory-items", type=int, default=500)
+    parser.add_argument("--orders", type=int, default=10_000)
+    parser.add_argument("--lines-per-order", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    engine = configure_engine(create_engine(f"sqlite:///{args.path}"))
+    started = time.perf_counter()
+    counts = seed(engine, args.menu_items, args.inventory_items, args.orders, args.lines_per_order, seed=args.seed)
+    print(f"seeded {counts} in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
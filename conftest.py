@@ -0,0 +1,51 @@
+# conftest.py
+
+import pytest
+from fastapi import Depends
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.admission import rate_limiter
+from app.database import Base, configure_engine, engine_options, get_branch_id, get_db, get_read_db
+from app.main import app
+
+
+@pytest.fixture(autouse=True)
+def fresh_rate_limits():
+    # every TestClient is the same client address; without this, whichever
+    # test runs after the bucket empties gets a 429
+    rate_limiter.clear()
+
+
+@pytest.fixture
+def engine(tmp_path):
+    """A new SQLite database with the app's pragmas and the full schema."""
+    url = f"sqlite:///{tmp_path / 'eato.db'}"
+    engine = configure_engine(create_engine(url, **engine_options(url)))
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def Session(engine):
+    return sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+
+
+@pytest.fixture
+def db(Session):
+    with Session(info={"branch_id": 1}) as db:
+        yield db
+
+
+@pytest.fixture
+def client(Session):
+    """A TestClient whose reads and writes go to the test database, scoped to the request's branch."""
+    def get_test_db(branch_id: int = Depends(get_branch_id)):
+        with Session(info={"branch_id": branch_id}) as db:
+            yield db
+
+    app.dependency_overrides[get_db] = app.dependency_overrides[get_read_db] = get_test_db
+    yield TestClient(app)
+    app.dependency_overrides.clear()
@@ -1,2 +1,2 @@
 #!/bin/bash
-uvicorn app.main:app --reload --port 8000
+python -m app.migrations && uvicorn app.main:app --reload --port 8000
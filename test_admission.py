@@ -0,0 +1,118 @@
+# test_admission.py
+
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+import app.metrics as metrics
+from app.admission import (
+    CRITICAL, EXEMPT, LOW, NORMAL, POLICIES, AdmissionMiddleware, Policy, PriorityGate, RateLimiter, Rejected, classify,
+)
+
+
+def test_classify():
+    assert classify("POST", "/orders/") == classify("PUT", "/orders/12/status") == CRITICAL
+    assert classify("GET", "/menu/") == classify("GET", "/menu/3/recipe") == classify("GET", "/analytics/revenue") == LOW
+    assert classify("GET", "/orders/active") == classify("PUT", "/menu/3") == NORMAL
+    assert classify("GET", "/orders/stream") is classify("GET", "/metrics") is EXEMPT
+
+
+def test_gate_prefers_critical_and_sheds_low_over_target():
+    async def scenario():
+        gate = PriorityGate(limit=1, reserved=0)
+        low = Policy(max_wait=1.0, shed_after=0.05, rate_limited=True)
+        await gate.acquire(NORMAL, POLICIES[NORMAL])
+        admitted = []
+
+        async def request(priority, policy):
+            await gate.acquire(priority, policy)
+            admitted.append(priority)
+            gate.release(priority)
+
+        waiting_low = asyncio.ensure_future(request(LOW, low))
+        await asyncio.sleep(0.01)
+        waiting_critical = asyncio.ensure_future(request(CRITICAL, POLICIES[CRITICAL]))
+        await asyncio.sleep(0.06)
+        # the oldest waiter has queued past the target: a new low request is shed at once
+        with pytest.raises(Rejected) as shed:
+            await gate.acquire(LOW, low)
+        assert (shed.value.status_code, shed.value.reason) == (503, "overloaded")
+
+        gate.release(NORMAL)
+        await asyncio.gather(waiting_low, waiting_critical)
+        assert admitted == [CRITICAL, LOW] and gate.active == 0
+
+        # a request that waits longer than its class allows is shed too
+        await gate.acquire(NORMAL, POLICIES[NORMAL])
+        with pytest.raises(Rejected) as shed:
+            await gate.acquire(NORMAL, Policy(max_wait=0.01, shed_after=None, rate_limited=True))
+        assert shed.value.reason == "queue_timeout"
+        assert gate.queued(NORMAL) == 0
+
+    asyncio.run(scenario())
+
+
+def test_reserved_slots_are_kept_for_critical_requests():
+    async def scenario():
+        gate = PriorityGate(limit=2, reserved=1)
+        assert await gate.acquire(LOW, POLICIES[LOW]) == 0
+        with pytest.raises(Rejected):
+            await gate.acquire(NORMAL, Policy(max_wait=0.01, shed_after=None, rate_limited=True))
+        assert await gate.acquire(CRITICAL, POLICIES[CRITICAL]) == 0
+        assert gate.active == 2
+
+    asyncio.run(scenario())
+
+
+def test_rate_limit_per_client():
+    limiter = RateLimiter(rate=10, burst=2)
+    assert limiter.take("a") == limiter.take("a") == 0
+    assert 0 < limiter.take("a") <= 0.1
+    assert limiter.take("b") == 0
+
+
+def test_middleware_rejects_with_retry_after():
+    api = FastAPI()
+    api.get("/menu/")(lambda: [])
+    api.post("/orders/")(lambda: {})
+    client = TestClient(AdmissionMiddleware(api, PriorityGate(limit=4), RateLimiter(rate=1, burst=1)))
+
+    assert client.get("/menu/").status_code == 200
+    shed = client.get("/menu/")
+    assert shed.status_code == 429 and shed.headers["retry-after"] == "1"
+    assert 'eato_admission_shed_total{priority="low",reason="rate_limited"}' in metrics.render()
+    # orders are never rate-limited
+    assert [client.post("/orders/").status_code for _ in range(3)] == [200] * 3
+
+
+def test_streaming_export_releases_its_slot():
+    async def scenario():
+        api, done = FastAPI(), asyncio.Event()
+
+        @api.get("/orders/export")
+        def export_orders():
+            async def rows():
+                yield "id\n"
+                await done.wait()
+                yield "1\n"
+            return StreamingResponse(rows(), media_type="text/csv")
+
+        api.get("/orders/active")(lambda: [])
+        gate = PriorityGate(limit=1, reserved=0)
+        transport = httpx.ASGITransport(app=AdmissionMiddleware(api, gate, RateLimiter(rate=0)))
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            export = asyncio.ensure_future(client.get("/orders/export"))
+            await asyncio.sleep(0.05)
+            # the export is still streaming, without its slot
+            assert not export.done() and gate.active == 0
+            response = await asyncio.wait_for(client.get("/orders/active"), 1)
+            assert response.status_code == 200
+            done.set()
+            assert (await export).text == "id\n1\n"
+        assert gate.active == 0
+
+    asyncio.run(scenario())
@@ -0,0 +1,73 @@
+# test_alerts.py
+
+import asyncio
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+import app.models as models
+from app.alerts import AlertDispatcher, fetch_order_summaries
+from app.database import Base
+
+
+class StubBot:
+    """Records messages instead of calling Telegram; can fail a few times first."""
+
+    def __init__(self, failures: int = 0):
+        self.failures = failures
+        self.messages = []
+
+    async def send_message(self, chat_id, text, parse_mode=None):
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("network down")
+        self.messages.append((chat_id, text))
+
+
+@pytest.fixture
+def Session(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'alerts.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine, expire_on_commit=False)
+    with Session() as db:
+        db.add_all([models.MenuItem(name="Nasi Goreng", price=3.5, category="Food"),
+                    models.MenuItem(name="Es Teh", price=1.0, category="Drink")])
+        for table in (1, 2, 3):
+            db.add(models.Order(table_number=table, items=[
+                models.OrderItem(menu_item_id=1, quantity=2, unit_price=3.5),
+                models.OrderItem(menu_item_id=2, quantity=1, unit_price=1.0),
+                models.OrderItem(menu_item_id=99, quantity=1, unit_price=2.0),
+            ], total=10.0, item_count=4))
+        db.commit()
+    return Session
+
+
+def test_summaries_use_one_query(Session):
+    statements = []
+    with Session() as db:
+        event.listen(db.get_bind(), "before_cursor_execute", lambda *args: statements.append(args[2]))
+        summaries = fetch_order_summaries(db, [1, 2, 3])
+    assert len(statements) == 1
+    assert [s.id for s in summaries] == [1, 2, 3]
+    assert summaries[0].lines == [("Nasi Goreng", 2), ("Es Teh", 1), ("[Unknown Item ID 99]", 1)]
+
+
+def test_burst_is_coalesced_and_retried(Session):
+    bot = StubBot(failures=1)
+
+    async def scenario():
+        dispatcher = AlertDispatcher(bot, chat_id=42, session_factory=Session,
+                                     coalesce_window=0.05, min_interval=0, backoff=0.01)
+        dispatcher.start()
+        for order_id in (1, 2, 3):
+            dispatcher.enqueue(order_id)
+        await dispatcher.stop()
+        return dispatcher
+
+    dispatcher = asyncio.run(scenario())
+    assert dispatcher.sent == 1 and dispatcher.failed == 0
+    assert len(bot.messages) == 1
+    chat_id, text = bot.messages[0]
+    assert chat_id == 42
+    assert all(f"Order #{order_id}" in text for order_id in (1, 2, 3))
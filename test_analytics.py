@@ -0,0 +1,82 @@
+# test_analytics.py
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import func
+
+import app.analytics as analytics
+import app.crud as crud
+import app.models as models
+import app.schemas as schemas
+
+START = datetime(2025, 3, 1, 6)
+
+
+@pytest.fixture
+def db(db):
+    db.add_all([
+        models.MenuItem(id=1, name="Nasi Goreng", price=3.0, category="Food"),
+        models.MenuItem(id=2, name="Es Teh", price=1.0, category="Drink"),
+    ])
+    db.commit()
+    # 60 orders, one every 97 minutes, spanning several days
+    for n in range(60):
+        order = crud.create_order(db, schemas.OrderCreate(items=[
+            schemas.OrderItemCreate(menu_item_id=1, quantity=1 + n % 2),
+            schemas.OrderItemCreate(menu_item_id=2, quantity=2),
+        ]))
+        order.timestamp = START + timedelta(minutes=97 * n)
+    db.commit()
+    # timestamps were moved after the rollups were written: recompute
+    analytics.rebuild(db)
+    return db
+
+
+def _raw_totals(db, since, until):
+    revenue = models.OrderItem.quantity * models.MenuItem.price
+    return db.query(func.count(func.distinct(models.Order.id)), func.sum(revenue)).join(
+        models.OrderItem, models.OrderItem.order_id == models.Order.id
+    ).join(models.MenuItem, models.MenuItem.id == models.OrderItem.menu_item_id).filter(
+        models.Order.timestamp >= since, models.Order.timestamp < until
+    ).one()
+
+
+@pytest.mark.parametrize("since, until", [
+    (START, START + timedelta(days=5)),                                   # days plus ragged ends
+    (START + timedelta(hours=20), START + timedelta(hours=30)),           # across midnight
+    (START + timedelta(hours=3), START + timedelta(hours=4)),             # a single hour
+    (datetime(2025, 3, 2), datetime(2025, 3, 4)),                         # whole days only
+])
+def test_rollup_ranges_match_raw_aggregates(db, since, until):
+    orders, revenue = _raw_totals(db, since, until)
+    stats = crud.get_ticket_stats(db, since=since, until=until)
+    assert stats["orders"] == orders
+    assert stats["revenue"] == pytest.approx(revenue or 0.0)
+    top = crud.get_top_items(db, since=since, until=until)
+    assert sum(row.revenue for row in top) == pytest.approx(revenue or 0.0)
+
+
+def test_incremental_rollups_match_rebuild(db):
+    for _ in range(3):
+        crud.create_order(db, schemas.OrderCreate(items=[schemas.OrderItemCreate(menu_item_id=1, quantity=2)]))
+    incremental = crud.get_revenue(db, period=analytics.DAY)
+    analytics.rebuild(db)
+    assert crud.get_revenue(db, period=analytics.DAY) == incremental
+
+
+def test_rejected_lines_leave_totals_and_rollups_positive(db, client):
+    before = client.get("/analytics/ticket-size").json()
+    rejected = [
+        {"items": []},
+        {"items": [{"menu_item_id": 1, "quantity": 5}, {"menu_item_id": 1, "quantity": -5}]},
+        {"items": [{"menu_item_id": 2, "quantity": -3}]},
+    ]
+    for order in rejected:
+        assert client.post("/orders/", json=order).status_code == 422
+    assert client.post("/orders/batch", json=rejected).status_code == 422
+
+    assert client.get("/analytics/ticket-size").json() == before
+    assert db.query(func.min(models.Order.total), func.min(models.Order.item_count)).one() == (5.0, 3)
+    assert all(row["quantity"] > 0 and row["revenue"] > 0 for row in client.get("/analytics/top-items").json())
+    assert all(bucket["revenue"] > 0 for bucket in client.get("/analytics/revenue").json())
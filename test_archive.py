@@ -0,0 +1,101 @@
+# test_archive.py
+
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import event
+
+import app.analytics as analytics
+import app.crud as crud
+import app.models as models
+import app.schemas as schemas
+from app.archive import TERMINAL_STATUSES, archive_orders
+from benchmarks.seed import OPEN_ORDERS, seed
+
+ORDERS = 1000
+
+
+@pytest.fixture
+def seeded(engine):
+    # orders spread over the last 30 days; the newest OPEN_ORDERS are active
+    seed(engine, menu_items=20, inventory_items=5, orders=ORDERS, lines_per_order=2)
+
+
+def _revenue(db):
+    return [(b.bucket, b.orders, round(b.revenue, 6)) for b in crud.get_revenue(db, period="day")]
+
+
+def test_archive_resumes_and_keeps_orders_readable(seeded, Session):
+    with Session() as db:
+        revenue = _revenue(db)
+        oldest = db.query(models.Order).order_by(models.Order.timestamp).first()
+        expected = crud.get_order(db, oldest.id)
+        expected = (expected.status, expected.total, [(i.menu_item_id, i.quantity) for i in expected.items])
+
+    # interrupted after two batches, then resumed with the same cutoff
+    first = archive_orders(Session, older_than=timedelta(0), batch_size=100, max_batches=2)
+    assert first.archived == 200 and first.finished_at is None
+    done = archive_orders(Session, older_than=timedelta(days=1000), batch_size=100)
+    assert done.cutoff == first.cutoff and done.finished_at is not None
+
+    with Session() as db:
+        live = db.query(models.Order).all()
+        # only active orders stay
+        assert {o.status for o in live} <= set(models.ACTIVE_STATUSES)
+        assert len(live) <= OPEN_ORDERS
+        assert db.query(models.OrderArchive).count() == done.archived == ORDERS - len(live)
+        assert db.query(models.OrderItem).count() == 2 * len(live)
+
+        archived = crud.get_order(db, oldest.id)
+        assert isinstance(archived, models.OrderArchive)
+        assert (archived.status, archived.total, [(i.menu_item_id, i.quantity) for i in archived.items]) == expected
+
+        analytics.rebuild(db)
+        assert _revenue(db) == revenue
+
+
+def test_archived_ids_are_not_reused(Session):
+    with Session(info={"branch_id": 1}) as db:
+        dish = crud.create_menu_item(db, schemas.MenuItemCreate(name="Es Teh", price=1.0, category="Drink"))
+        # an old order holding the highest line ID, then a newer one without
+        # lines (no longer accepted, but older databases hold some)
+        old = crud.create_order(db, schemas.OrderCreate(items=[{"menu_item_id": dish.id, "quantity": 1}]))
+        empty = models.Order(total=0.0, item_count=0)
+        db.add(empty)
+        for order in (old, empty):
+            order.status = "Served"
+        db.commit()
+
+    assert archive_orders(Session, older_than=timedelta(0)).archived == 2
+    with Session(info={"branch_id": 1}) as db:
+        again = crud.create_order(db, schemas.OrderCreate(items=[{"menu_item_id": dish.id, "quantity": 1}]))
+        assert again.id > empty.id and again.items[0].id > old.items[0].id
+        again.status = "Served"
+        db.commit()
+    assert archive_orders(Session, older_than=timedelta(0)).archived == 1
+
+
+def test_active_orders_are_never_read(Session, engine):
+    with Session(info={"branch_id": 1}) as db:
+        # long-forgotten orders that never reached a terminal status
+        db.add_all(models.Order(total=1.0, item_count=1) for _ in range(50))
+        db.add(models.Order(status="Served", total=1.0, item_count=1))
+        db.commit()
+
+    plans = []
+
+    def explain(conn, cursor, statement, parameters, *args):
+        if statement.lstrip().startswith("SELECT orders.id, orders.timestamp"):
+            plan = cursor.connection.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)
+            plans.append(" ".join(row[-1] for row in plan))
+
+    event.listen(engine, "before_cursor_execute", explain)
+    assert archive_orders(Session, older_than=timedelta(0), batch_size=10).archived == 1
+    event.remove(engine, "before_cursor_execute", explain)
+
+    with Session() as db:
+        assert db.query(models.Order).count() == 50
+    # one seek per terminal status, no residual filter and no sort
+    assert plans == [
+        "SEARCH orders USING COVERING INDEX ix_orders_status_timestamp_id (branch_id=? AND status=? AND timestamp<?)"
+    ] * len(TERMINAL_STATUSES)
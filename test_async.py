@@ -0,0 +1,54 @@
+# test_async.py
+
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+import app.database as database
+from app.cache import menu_cache
+from app.main import app
+from app.migrations import migrate
+
+pytestmark = pytest.mark.skipif(database.DB_MODE != "async", reason="the routers use AsyncSessions with DB_MODE=async")
+
+
+@pytest.fixture
+def shard(tmp_path, monkeypatch):
+    """A migrated database as the app's only shard, reached through its real dependencies."""
+    url = f"sqlite:///{tmp_path / 'async.db'}"
+    shard = database._open_shard(url)
+    migrate(shard.engine)
+    monkeypatch.setattr(database, "default_shard", shard)
+    monkeypatch.setattr(database, "_shards", {url: shard})
+    menu_cache.invalidate()  # entries from other tests' databases
+    yield shard
+    shard.engine.dispose()
+    asyncio.run(shard.async_engine.dispose())
+
+
+def test_orders_and_stock_through_async_sessions(shard):
+    assert app.dependency_overrides == {}
+    statements = {"async": [], "sync": []}
+    event.listen(shard.async_engine.sync_engine, "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: statements["async"].append(statement))
+    event.listen(shard.engine, "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: statements["sync"].append(statement))
+
+    client = TestClient(app)
+    dish = client.post("/menu/", json={"name": "Nasi Goreng", "price": 3.5, "category": "Food"}).json()
+    rice = client.post("/inventory/", json={"name": "Rice", "quantity": 5, "unit": "kg", "threshold": 2}).json()
+    client.put(f"/menu/{dish['id']}/recipe", json=[{"inventory_item_id": rice["id"], "quantity": 1}])
+
+    order = client.post("/orders/", json={"table_number": 4, "items": [{"menu_item_id": dish["id"], "quantity": 2}]})
+    assert order.status_code == 201 and order.json()["total"] == 7.0
+    assert client.put(f"/orders/{order.json()['id']}/status", params={"status": "In Kitchen"}).status_code == 200
+    assert client.get(f"/inventory/{rice['id']}").json()["quantity"] == 3
+
+    restocked = client.put(f"/inventory/{rice['id']}", json={"name": "Rice", "quantity": 1, "unit": "kg"})
+    assert restocked.json()["quantity"] == 1
+    assert [item["name"] for item in client.get("/inventory/low-stock").json()] == ["Rice"]
+    assert [o["status"] for o in client.get("/orders/active").json()] == ["In Kitchen"]
+
+    assert statements["async"] and statements["sync"] == []
@@ -0,0 +1,55 @@
+# test_batch.py
+
+from sqlalchemy import event
+
+
+def _menu(client):
+    dish = client.post("/menu/", json={"name": "Nasi Goreng", "price": 3.5, "category": "Food"}).json()
+    tea = client.post("/menu/", json={"name": "Es Teh", "price": 1.0, "category": "Drink"}).json()
+    rice = client.post("/inventory/", json={"name": "Rice", "quantity": 3, "unit": "kg"}).json()
+    client.put(f"/menu/{dish['id']}/recipe", json=[{"inventory_item_id": rice["id"], "quantity": 1}])
+    return dish, tea, rice
+
+
+def _order(*lines):
+    return {"table_number": 4, "items": [{"menu_item_id": item, "quantity": quantity} for item, quantity in lines]}
+
+
+def test_failing_line_rolls_back_the_batch(client):
+    dish, tea, rice = _menu(client)
+
+    unknown = client.post("/orders/batch", json=[_order((tea["id"], 1)), _order((dish["id"], 1), (9999, 1))])
+    assert unknown.status_code == 422 and unknown.json()["detail"]["menu_item_ids"] == [9999]
+
+    # 2 + 2 portions of a 3 kg stock: the second order fails, the first goes too
+    short = client.post("/orders/batch", json=[_order((dish["id"], 2)), _order((dish["id"], 2), (tea["id"], 1))])
+    assert short.status_code == 409 and short.json()["detail"]["shortages"]
+
+    assert client.get("/orders/").json() == []
+    assert client.get(f"/inventory/{rice['id']}").json()["quantity"] == 3
+
+
+def test_batch_response_needs_no_lazy_loads(client, engine):
+    dish, tea, _ = _menu(client)
+    selects = []
+
+    def count(conn, cursor, statement, *args):
+        if statement.lstrip().upper().startswith("SELECT"):
+            selects.append(statement)
+
+    event.listen(engine, "before_cursor_execute", count)
+
+    def place(orders):
+        selects.clear()
+        response = client.post("/orders/batch", json=orders)
+        assert response.status_code == 201
+        return response.json(), list(selects)
+
+    small, few = place([_order((tea["id"], 1))] * 2)
+    large, many = place([_order((dish["id"], 1), (tea["id"], 2))] * 3 + [_order((tea["id"], 1))] * 7)
+    # prices and recipes are read once per batch; the lines are serialized
+    # from what the INSERT returned, never loaded back one order at a time
+    assert len(few) == len(many) == 2
+    assert not any("order_items" in statement for statement in few + many)
+    assert [len(order["items"]) for order in small + large] == [1, 1] + [2] * 3 + [1] * 7
+    assert large[0]["total"] == 5.5 and large[0]["items"][1]["quantity"] == 2
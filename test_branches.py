@@ -0,0 +1,72 @@
+# test_branches.py
+
+import pytest
+
+import app.analytics as analytics
+import app.crud as crud
+import app.models as models
+import app.schemas as schemas
+from app.database import parse_branch_databases
+
+
+def _stocked_menu(db, price):
+    """A dish using 1 unit of rice per portion, with 5 units in stock."""
+    dish = crud.create_menu_item(db, schemas.MenuItemCreate(name="Nasi Goreng", price=price, category="Food"))
+    rice = crud.create_inventory_item(db, schemas.InventoryItemCreate(name="Rice", quantity=5, unit="kg", threshold=1))
+    crud.set_recipe(db, dish.id, [schemas.RecipeItemCreate(inventory_item_id=rice.id, quantity=1)])
+    return dish, rice
+
+
+def test_branches_sharing_a_database_are_isolated(Session):
+    with Session(info={"branch_id": 1}) as one, Session(info={"branch_id": 2}) as two:
+        dish_one, rice_one = _stocked_menu(one, 3.0)
+        dish_two, rice_two = _stocked_menu(two, 4.0)  # same names, other branch
+        assert (dish_one.branch_id, dish_two.branch_id) == (1, 2)
+
+        order = crud.create_order(one, schemas.OrderCreate(items=[
+            schemas.OrderItemCreate(menu_item_id=dish_one.id, quantity=2),
+        ]))
+        assert order.branch_id == 1
+        with pytest.raises(crud.UnknownMenuItemError):
+            crud.create_order(two, schemas.OrderCreate(items=[
+                schemas.OrderItemCreate(menu_item_id=dish_one.id, quantity=1),
+            ]))
+
+        assert [item.name for item in crud.get_menu_items(two)] == ["Nasi Goreng"]
+        assert crud.get_menu_item(two, dish_one.id) is None
+        assert crud.get_order(two, order.id) is None
+        assert crud.get_orders(two) == []
+        one.expire_all()  # stock is deducted with a set-based UPDATE
+        assert crud.get_inventory_item(two, rice_two.id).quantity == 5
+        assert crud.get_inventory_item(one, rice_one.id).quantity == 3
+        assert crud.update_order_status(two, order.id, "In Kitchen") is None
+        assert crud.get_ticket_stats(one)["orders"] == 1
+        assert crud.get_ticket_stats(two)["orders"] == 0
+
+        # bulk upserts match names within the branch only
+        repriced = [schemas.MenuItemCreate(name="Nasi Goreng", price=5, category="Food")]
+        assert crud.upsert_menu_items(two, repriced) == (0, 1)
+        assert one.get(models.MenuItem, dish_one.id).price == 3.0
+
+    with Session() as everything:
+        assert everything.query(models.MenuItem).count() == 2
+        assert analytics.rebuild(everything)["ticket_rollups"] == 2  # hour and day, branch 1 only
+
+
+def test_branch_header_selects_the_branch(client):
+    item = {"name": "Es Teh", "price": 1.0, "category": "Drink"}
+    created = client.post("/menu/", json=item, headers={"X-Branch-ID": "2"}).json()
+    assert created["branch_id"] == 2
+    assert client.get("/menu/").json() == []
+    assert client.get("/menu/", headers={"X-Branch-ID": "2"}).json() == [created]
+    assert client.get(f"/menu/{created['id']}").status_code == 404
+    assert client.get("/menu/", headers={"X-Branch-ID": "0"}).status_code == 422
+
+
+def test_parse_branch_databases():
+    assert parse_branch_databases("") == {}
+    assert parse_branch_databases("2=sqlite:///./branch2.db, 3=postgresql://db/eato") == {
+        2: "sqlite:///./branch2.db", 3: "postgresql://db/eato",
+    }
+    with pytest.raises(ValueError):
+        parse_branch_databases("north=sqlite:///./north.db")
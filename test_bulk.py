@@ -0,0 +1,68 @@
+# test_bulk.py
+
+import pytest
+
+import app.crud as crud
+import app.models as models
+import app.schemas as schemas
+from app.events import LOW_STOCK, bus
+
+
+def test_upsert_menu_items_by_name_in_batches(db):
+    items = [schemas.MenuItemCreate(name=f"Dish {i}", price=i, category="Food") for i in range(1200)]
+    assert crud.upsert_menu_items(db, items, batch_size=500) == (1200, 0)
+
+    changed = [schemas.MenuItemCreate(name="Dish 7", price=99, category="Special"),
+               schemas.MenuItemCreate(name="Dish new", price=1, category="Food")]
+    assert crud.upsert_menu_items(db, changed) == (1, 1)
+    assert db.query(models.MenuItem).count() == 1201
+    dish = db.query(models.MenuItem).filter_by(name="Dish 7").one()
+    assert (dish.id, dish.price, dish.category) == (8, 99, "Special")
+
+    with pytest.raises(crud.DuplicateNameError):
+        crud.create_menu_item(db, schemas.MenuItemCreate(name="Dish 7", price=1, category="Food"))
+
+
+def test_upsert_inventory_items_flags_low_stock(db):
+    crossings = []
+    unsubscribe = bus.subscribe(LOW_STOCK, crossings.append)
+    try:
+        crud.upsert_inventory_items(db, [schemas.InventoryItemCreate(name="Rice", quantity=50, unit="kg"),
+                                         schemas.InventoryItemCreate(name="Egg", quantity=5, unit="pcs")])
+        crud.upsert_inventory_items(db, [schemas.InventoryItemCreate(name="Rice", quantity=2, unit="kg")])
+    finally:
+        unsubscribe()
+    assert [event.data["name"] for event in crossings] == ["Egg", "Rice"]
+    assert [item.name for item in crud.get_low_stock_items(db)] == ["Rice", "Egg"]
+
+
+def test_updates_keep_fields_left_out(db):
+    dish = crud.create_menu_item(db, schemas.MenuItemCreate(
+        name="Es Teh", price=1.0, category="Drink", available=False, ingredients="tea, sugar",
+    ))
+    crud.update_menu_item(db, dish.id, schemas.MenuItemCreate(name="Es Teh", price=1.5, category="Drink"))
+    assert (dish.price, dish.available, dish.ingredients) == (1.5, False, "tea, sugar")
+
+    rice = crud.create_inventory_item(db, schemas.InventoryItemCreate(name="Rice", quantity=5, unit="kg", threshold=2))
+    crud.update_inventory_item(db, rice.id, schemas.InventoryItemCreate(name="Rice", quantity=8, unit="kg"))
+    assert (rice.quantity, rice.threshold) == (8, 2)
+
+
+def test_bulk_import_keeps_fields_left_out(client):
+    client.post("/menu/", json={"name": "Nasi", "price": 3.0, "category": "Food", "available": False,
+                                "ingredients": "rice, egg"})
+    csv = "name,price,category\nNasi,3.5,Food\nMie,4.0,Food\n"
+    result = client.post("/menu/bulk", content=csv, headers={"Content-Type": "text/csv"}).json()
+    assert (result["created"], result["updated"], result["errors"]) == (1, 1, [])
+    menu = {item["name"]: item for item in client.get("/menu/").json()}
+    assert (menu["Nasi"]["price"], menu["Nasi"]["available"], menu["Nasi"]["ingredients"]) == (3.5, False, "rice, egg")
+    assert (menu["Mie"]["available"], menu["Mie"]["ingredients"]) == (True, None)
+
+    # rows of one upload may carry different fields
+    client.post("/inventory/", json={"name": "Rice", "quantity": 5, "unit": "kg", "threshold": 2})
+    client.post("/inventory/bulk", json=[{"name": "Rice", "quantity": 8, "unit": "kg"},
+                                         {"name": "Egg", "quantity": 3, "unit": "pcs", "threshold": 5},
+                                         {"name": "Salt", "quantity": 1, "unit": "kg"}])
+    stock = {item["name"]: (item["quantity"], item["threshold"]) for item in client.get("/inventory/").json()}
+    assert stock == {"Rice": (8, 2), "Egg": (3, 5), "Salt": (1, 10)}
+    assert [item["name"] for item in client.get("/inventory/low-stock").json()] == ["Egg", "Salt"]
@@ -0,0 +1,84 @@
+# test_cache.py
+
+import asyncio
+
+import pytest
+
+import app.models as models
+from app.cache import MenuCache, get_or_fill, menu_cache
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    menu_cache.invalidate()  # entries from other tests' databases
+
+
+def test_writes_through_another_worker_invalidate(client, Session):
+    item = client.post("/menu/", json={"name": "Es Teh", "price": 1.0, "category": "Drink"}).json()
+    assert client.get(f"/menu/{item['id']}").json()["price"] == 1.0
+
+    # another worker's write: committed to the database, this process's
+    # cache never told
+    with Session(info={"branch_id": 1}) as db:
+        db.get(models.MenuItem, item["id"]).price = 1.5
+        db.commit()
+
+    assert client.get(f"/menu/{item['id']}").json()["price"] == 1.5
+    assert client.get("/menu/").json()[0]["price"] == 1.5
+
+
+def test_etag_and_not_modified(client):
+    client.post("/menu/", json={"name": "Es Teh", "price": 1.0, "category": "Drink"})
+    first = client.get("/menu/")
+    etag = first.headers["etag"]
+    assert first.status_code == 200 and first.json()[0]["name"] == "Es Teh"
+
+    hits = menu_cache.stats()["hits"]
+    for header in (etag, f"W/{etag}", f'"other", {etag}', "*"):
+        cached = client.get("/menu/", headers={"If-None-Match": header})
+        assert cached.status_code == 304 and cached.content == b"" and cached.headers["etag"] == etag
+    assert menu_cache.stats()["hits"] == hits + 4
+    assert client.get("/menu/", headers={"If-None-Match": '"other"'}).status_code == 200
+
+
+def test_menu_writes_invalidate(client):
+    item = client.post("/menu/", json={"name": "Es Teh", "price": 1.0, "category": "Drink"}).json()
+    writes = [
+        lambda: client.put(f"/menu/{item['id']}", json={"name": "Es Teh", "price": 1.5, "category": "Drink"}),
+        lambda: client.post("/menu/bulk", json=[{"name": "Kopi", "price": 2.0, "category": "Drink"}]),
+        lambda: client.post("/menu/", json={"name": "Nasi Goreng", "price": 3.5, "category": "Food"}),
+        lambda: client.delete(f"/menu/{item['id']}"),
+    ]
+    expected = [
+        [("Es Teh", 1.5)],
+        [("Es Teh", 1.5), ("Kopi", 2.0)],
+        [("Es Teh", 1.5), ("Kopi", 2.0), ("Nasi Goreng", 3.5)],
+        [("Kopi", 2.0), ("Nasi Goreng", 3.5)],
+    ]
+    etag = client.get("/menu/").headers["etag"]
+    for write, menu in zip(writes, expected):
+        invalidations = menu_cache.stats()["invalidations"]
+        assert write().status_code < 300
+        assert menu_cache.stats()["invalidations"] == invalidations + 1
+        assert menu_cache.stats()["entries"] == 0
+        response = client.get("/menu/", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert [(i["name"], i["price"]) for i in response.json()] == menu
+        etag = response.headers["etag"]
+
+
+def test_fill_racing_a_write_is_not_cached():
+    cache = MenuCache()
+
+    async def fill():
+        cache.invalidate()  # a write commits while the stale page is being read
+        return b"[]"
+
+    async def scenario():
+        entry = await get_or_fill(cache, "menu", fill)
+        assert entry.body == b"[]"  # served to this request
+        assert cache.get("menu") is None  # but not kept for the next
+        assert (await get_or_fill(cache, "menu", lambda: asyncio.sleep(0, b"[1]"))).body == b"[1]"
+        assert cache.get("menu").body == b"[1]"
+
+    asyncio.run(scenario())
@@ -0,0 +1,69 @@
+# test_changes.py
+
+import app.crud as crud
+import app.schemas as schemas
+
+
+def _dish(name, price=3.0):
+    return schemas.MenuItemCreate(name=name, price=price, category="Food")
+
+
+def _sync(db, get_changes, since=0, limit=500):
+    """Replay the feed like a tablet: {id: row} and the version to resume from."""
+    rows = {}
+    while True:
+        page = get_changes(db, since=since, limit=limit)
+        for row_id in page["deleted"]:
+            rows.pop(row_id, None)
+        rows.update((row["id"], row) for row in page["changed"])
+        since = page["version"]
+        if not page["more"]:
+            return rows, since
+
+
+def test_menu_writes_and_deletes_are_versioned(Session):
+    with Session(info={"branch_id": 1}) as db:
+        nasi, mie, soto = (crud.create_menu_item(db, _dish(name)) for name in ("Nasi", "Mie", "Soto"))
+        assert [nasi.version, mie.version, soto.version] == [1, 2, 3]
+        rows, version = _sync(db, crud.get_menu_changes)
+        assert set(rows) == {nasi.id, mie.id, soto.id} and version == 3
+
+        crud.update_menu_item(db, mie.id, _dish("Mie", 4.0))
+        crud.delete_menu_item(db, nasi.id)
+        assert crud.upsert_menu_items(db, [_dish("Soto", 5.0), _dish("Bakso")]) == (1, 1)
+        page = crud.get_menu_changes(db, since=version)
+        assert [(row["name"], row["price"]) for row in page["changed"]] == [("Mie", 4.0), ("Soto", 5.0), ("Bakso", 3.0)]
+        assert page["deleted"] == [nasi.id]
+        assert (page["version"], page["more"]) == (7, False)
+
+        # paging one change at a time ends in the same state as a full sync
+        assert _sync(db, crud.get_menu_changes, limit=1) == _sync(db, crud.get_menu_changes)
+        assert crud.get_menu_changes(db, since=7) == {"version": 7, "more": False, "changed": [], "deleted": []}
+        assert crud.get_menu_changes(db, since=100)["version"] == 7  # behind since: re-sync
+
+    with Session(info={"branch_id": 2}) as other:
+        assert crud.create_menu_item(other, _dish("Nasi")).version == 1
+        assert crud.get_menu_changes(other)["version"] == 1
+
+
+def test_stock_deductions_are_inventory_changes(Session):
+    with Session(info={"branch_id": 1}) as db:
+        dish = crud.create_menu_item(db, _dish("Nasi"))
+        rice = crud.create_inventory_item(db, schemas.InventoryItemCreate(name="Rice", quantity=5, unit="kg"))
+        egg = crud.create_inventory_item(db, schemas.InventoryItemCreate(name="Egg", quantity=9, unit="pcs"))
+        crud.set_recipe(db, dish.id, [schemas.RecipeItemCreate(inventory_item_id=rice.id, quantity=1)])
+        _, version = _sync(db, crud.get_inventory_changes)
+
+        crud.create_order(db, schemas.OrderCreate(items=[schemas.OrderItemCreate(menu_item_id=dish.id, quantity=2)]))
+        page = crud.get_inventory_changes(db, since=version)
+        assert [(row["id"], row["quantity"]) for row in page["changed"]] == [(rice.id, 3)]
+        crud.delete_inventory_item(db, egg.id)
+        assert crud.get_inventory_changes(db, since=page["version"])["deleted"] == [egg.id]
+
+
+def test_changes_endpoint(client):
+    created = client.post("/menu/", json={"name": "Es Teh", "price": 1.0, "category": "Drink"}).json()
+    assert client.get("/menu/changes").json() == {"version": 1, "more": False, "changed": [created], "deleted": []}
+    client.delete(f"/menu/{created['id']}")
+    assert client.get("/menu/changes", params={"since": 1}).json()["deleted"] == [created["id"]]
+    assert client.get("/inventory/changes", params={"since": -1}).status_code == 422
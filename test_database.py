@@ -0,0 +1,47 @@
+# test_database.py
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+import app.database as database
+from app.database import SQLITE_PRAGMAS, configure_engine, engine_options
+
+
+def test_new_connections_get_the_pragmas(engine):
+    with engine.connect() as conn:
+        pragmas = {name: conn.exec_driver_sql(f"PRAGMA {name}").scalar()
+                   for name in ("journal_mode", "foreign_keys", "busy_timeout", "synchronous")}
+    assert pragmas == {
+        "journal_mode": "wal", "foreign_keys": 1, "busy_timeout": SQLITE_PRAGMAS["busy_timeout"],
+        "synchronous": 1,  # NORMAL
+    }
+
+
+def test_check_database_reports_settings_and_fails_when_unreachable(engine, tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "engine", engine)
+    settings = database.check_database()
+    assert (settings["journal_mode"], settings["foreign_keys"]) == ("wal", 1)
+
+    # a directory that does not exist: SQLite cannot open the file
+    url = f"sqlite:///{tmp_path / 'missing' / 'eato.db'}"
+    monkeypatch.setattr(database, "engine", configure_engine(create_engine(url, **engine_options(url))))
+    with pytest.raises(OperationalError):
+        database.check_database()
+
+
+def test_ordered_menu_items_are_not_deleted(client, engine):
+    dish = client.post("/menu/", json={"name": "Nasi Goreng", "price": 3.5, "category": "Food"}).json()
+    rice = client.post("/inventory/", json={"name": "Rice", "quantity": 10, "unit": "kg"}).json()
+    client.put(f"/menu/{dish['id']}/recipe", json=[{"inventory_item_id": rice["id"], "quantity": 1}])
+    client.post("/orders/", json={"items": [{"menu_item_id": dish["id"], "quantity": 1}]})
+
+    assert client.delete(f"/menu/{dish['id']}").status_code == 409
+    # an ingredient goes with its recipe lines
+    assert client.delete(f"/inventory/{rice['id']}").status_code == 204
+    assert client.get(f"/menu/{dish['id']}/recipe").json() == []
+
+    with engine.begin() as conn:
+        with pytest.raises(IntegrityError, match="FOREIGN KEY"):
+            conn.execute(text("INSERT INTO order_items (order_id, menu_item_id, quantity, unit_price) "
+                              "VALUES (9999, 1, 1, 1.0)"))
@@ -0,0 +1,41 @@
+# test_export.py
+
+import os
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import engine_options
+from app.export import stream_orders
+from benchmarks.seed import seed
+
+# 1M by default; e.g. EXPORT_TEST_ORDERS=20000 for a quick run
+ORDERS = int(os.getenv("EXPORT_TEST_ORDERS", "1000000"))
+# Resident memory the export may add on top of the process, at any size
+MEMORY_CEILING = 32 * 1024 * 1024
+
+
+def _rss() -> int:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+@pytest.mark.skipif(not os.path.exists("/proc/self/statm"), reason="reads RSS from /proc")
+def test_export_streams_in_constant_memory(tmp_path):
+    url = f"sqlite:///{tmp_path / 'export.db'}"
+    # plain engine: without the mmap/page-cache pragmas, RSS growth is what
+    # the export itself holds
+    engine = create_engine(url, **engine_options(url))
+    seed(engine, menu_items=50, inventory_items=10, orders=ORDERS, lines_per_order=1)
+    Session = sessionmaker(bind=engine, expire_on_commit=False)
+
+    for format, expected_lines in (("ndjson", ORDERS), ("csv", ORDERS + 1)):
+        baseline = peak = _rss()
+        lines = 0
+        for chunk in stream_orders(format, session_factory=Session):
+            lines += chunk.count("\n")
+            peak = max(peak, _rss())
+        assert lines == expected_lines
+        assert peak - baseline < MEMORY_CEILING, f"{format} export grew RSS by {(peak - baseline) / 2**20:.1f} MiB"
+    engine.dispose()
@@ -0,0 +1,33 @@
+# test_feed.py
+
+import asyncio
+
+from app.events import ORDER_CREATED, ORDER_STATUS_CHANGED, bus
+from app.feed import EventFeed
+
+
+def test_resume_and_slow_client():
+    async def scenario():
+        feed = EventFeed("order.", buffer_size=10, client_queue_size=3)
+        feed.start()
+        slow = feed.subscribe()
+        ids = [bus.publish(ORDER_CREATED, {"id": n}).id for n in range(4)]
+        bus.publish("inventory.other", {})
+
+        # the slow client overflowed its queue and was disconnected
+        assert feed.subscriber_count == 0 and feed.disconnected_slow == 1
+        assert [frame async for frame in feed.stream(slow)] == ["retry: 2000\n\n"]
+
+        # reconnecting with Last-Event-ID replays only what was missed
+        resumed = feed.subscribe(last_event_id=ids[1])
+        assert not resumed.reset
+        assert [resumed.queue.get_nowait().id for _ in range(2)] == ids[2:]
+
+        # an ID the feed never issued means the client must reload
+        assert feed.subscribe(last_event_id=ids[-1] + 100).reset
+
+        bus.publish(ORDER_STATUS_CHANGED, {"id": 0})
+        assert resumed.queue.get_nowait().topic == ORDER_STATUS_CHANGED
+        feed.stop()
+
+    asyncio.run(scenario())
@@ -0,0 +1,62 @@
+# test_idempotency.py
+
+import asyncio
+
+import httpx
+import pytest
+
+import app.crud as crud
+import app.models as models
+import app.schemas as schemas
+from app.idempotency import KeyInUseError, order_keys
+from app.main import app
+
+CLIENTS = 50
+
+
+@pytest.fixture(autouse=True)
+def menu(db):
+    db.add(models.MenuItem(id=1, name="Nasi Goreng", price=3.5, category="Food"))
+    db.commit()
+    order_keys.clear()
+    yield
+    order_keys.clear()
+
+
+def test_concurrent_retries_place_one_order(client, Session):
+    order = {"table_number": 4, "items": [{"menu_item_id": 1, "quantity": 2}]}
+
+    async def submit_all():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await asyncio.gather(*(
+                client.post("/orders/", json=order, headers={"Idempotency-Key": "tablet-7-0042"})
+                for _ in range(CLIENTS)
+            ))
+
+    responses = asyncio.run(submit_all())
+
+    assert {response.status_code for response in responses} == {201}
+    assert len({response.content for response in responses}) == 1
+    assert sum(response.headers.get("Idempotent-Replayed") != "true" for response in responses) == 1
+    with Session() as db:
+        assert db.query(models.Order).count() == 1
+        assert db.query(models.IdempotencyKey).count() == 1
+
+    # after a restart the retry is answered from the table; another body is refused
+    order_keys.clear()
+    retry = client.post("/orders/", json=order, headers={"Idempotency-Key": "tablet-7-0042"})
+    assert retry.content == responses[0].content
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    changed = client.post("/orders/", json={**order, "table_number": 5}, headers={"Idempotency-Key": "tablet-7-0042"})
+    assert changed.status_code == 422
+
+
+def test_key_stored_by_another_process(Session):
+    order = schemas.OrderCreate(items=[schemas.OrderItemCreate(menu_item_id=1, quantity=1)])
+    with Session() as db:
+        crud.create_order_once(db, order, "tablet-3-0001", "hash")
+    with Session() as db:
+        with pytest.raises(KeyInUseError):
+            crud.create_order_once(db, order, "tablet-3-0001", "hash")
+        assert db.query(models.Order).count() == 1
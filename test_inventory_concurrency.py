@@ -0,0 +1,67 @@
+# test_inventory_concurrency.py
+
+import threading
+
+import pytest
+
+import app.crud as crud
+import app.models as models
+import app.schemas as schemas
+from app.events import LOW_STOCK, bus
+
+THREADS = 16
+ORDERS_PER_THREAD = 10
+STOCK = 50.0
+
+
+@pytest.fixture(autouse=True)
+def stock(db):
+    db.add(models.MenuItem(id=1, name="Nasi Goreng", price=3.5, category="Food"))
+    db.add(models.InventoryItem(id=1, name="Rice", quantity=STOCK, unit="kg"))
+    db.add(models.RecipeItem(menu_item_id=1, inventory_item_id=1, quantity=1.0))
+    db.commit()
+
+
+def test_concurrent_orders_never_oversell(Session):
+    order = schemas.OrderCreate(items=[schemas.OrderItemCreate(menu_item_id=1, quantity=1)])
+    placed, rejected, errors, crossings = [], [], [], []
+    unsubscribe = bus.subscribe(LOW_STOCK, crossings.append)
+
+    def place_orders():
+        for _ in range(ORDERS_PER_THREAD):
+            with Session() as db:
+                try:
+                    placed.append(crud.create_order(db, order).id)
+                except crud.InsufficientStockError:
+                    rejected.append(1)
+                except Exception as exc:  # e.g. "database is locked"
+                    errors.append(exc)
+
+    threads = [threading.Thread(target=place_orders) for _ in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    unsubscribe()
+
+    assert errors == []
+    assert len(placed) == STOCK
+    assert len(rejected) == THREADS * ORDERS_PER_THREAD - STOCK
+    with Session() as db:
+        assert db.get(models.InventoryItem, 1).quantity == 0
+        assert db.query(models.Order).count() == STOCK
+    # one threshold crossing (default threshold 10) -> exactly one event
+    assert [event.data["inventory_item_id"] for event in crossings] == [1]
+
+
+@pytest.mark.parametrize("items", [
+    [],
+    [{"menu_item_id": 1, "quantity": 0}],
+    [{"menu_item_id": 1, "quantity": -5}],
+    [{"menu_item_id": 1, "quantity": 5}, {"menu_item_id": 1, "quantity": -5}],
+])
+def test_orders_cannot_put_stock_back(client, items):
+    for path, body in (("/orders/", {"items": items}), ("/orders/batch", [{"items": items}])):
+        assert client.post(path, json=body).status_code == 422
+    assert client.get("/inventory/1").json()["quantity"] == STOCK
+    assert client.get("/orders/").json() == []
@@ -0,0 +1,61 @@
+# test_metrics.py
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.pool import QueuePool
+
+import app.database as database
+import app.metrics as metrics
+from app.main import app
+from app.migrations import migrate
+
+
+@pytest.fixture(autouse=True)
+def migrated(tmp_path, monkeypatch):
+    # the app checks the schema on startup but never creates it; serve a
+    # migrated temporary database, instrumented like the real ones
+    url = f"sqlite:///{tmp_path / 'metrics.db'}"
+    shard = database._open_shard(url)
+    for engine in (shard.engine, shard.async_engine and shard.async_engine.sync_engine):
+        if engine is not None:
+            metrics.instrument_engine(engine)
+    migrate(shard.engine)
+    monkeypatch.setattr(database, "default_shard", shard)
+    monkeypatch.setattr(database, "_shards", {url: shard})
+    monkeypatch.setattr(database, "engine", shard.engine)
+    yield
+    shard.engine.dispose()
+
+
+def _sample(text, prefix):
+    for line in text.splitlines():
+        if line.startswith(prefix):
+            return float(line.rsplit(" ", 1)[1])
+    return 0.0
+
+
+def test_metrics_counts_requests_and_sql_statements():
+    with TestClient(app) as client:
+        before = _sample(metrics.render(), 'eato_db_statements_per_request_count{route="/inventory/"}')
+        client.get("/inventory/")
+        text = client.get("/metrics").text
+
+    assert 'eato_http_requests_total{method="GET",route="/inventory/",status="200"}' in text
+    assert _sample(text, 'eato_db_statements_per_request_count{route="/inventory/"}') == before + 1
+    assert _sample(text, 'eato_db_statements_per_request_sum{route="/inventory/"}') >= 1
+    assert "eato_db_pool_checkout_wait_seconds_count" in text
+
+
+def test_pool_checkouts_are_timed(tmp_path):
+    url = f"sqlite:///{tmp_path / 'pool.db'}"
+    engine = create_engine(url, **database.engine_options(url))
+    assert isinstance(engine.pool, QueuePool)
+    checkouts = _sample(metrics.render(), "eato_db_pool_checkout_wait_seconds_count")
+    with engine.connect():
+        pass
+    engine.dispose()  # the new pool is built from the same class
+    with engine.connect():
+        pass
+    assert _sample(metrics.render(), "eato_db_pool_checkout_wait_seconds_count") == checkouts + 2
+    engine.dispose()
@@ -0,0 +1,154 @@
+# test_migrations.py
+
+from sqlalchemy import create_engine, inspect, text
+
+from app.database import Base, configure_engine, engine_options
+from app.migrations import (
+    add_order_totals, autoincrement_order_ids, branch_scoping, change_versions, low_stock_flag, order_lifecycle,
+    unique_item_names,
+)
+
+
+def test_add_order_totals_backfills_old_rows(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as conn:
+        # order tables as created before prices were snapshotted
+        conn.execute(text("CREATE TABLE menu_items (id INTEGER PRIMARY KEY, name VARCHAR NOT NULL, "
+                          "price FLOAT NOT NULL, category VARCHAR NOT NULL, available BOOLEAN NOT NULL, "
+                          "ingredients VARCHAR)"))
+        conn.execute(text("CREATE TABLE orders (id INTEGER PRIMARY KEY, customer_name VARCHAR, "
+                          "table_number INTEGER, status VARCHAR NOT NULL, timestamp DATETIME)"))
+        conn.execute(text("CREATE TABLE order_items (id INTEGER PRIMARY KEY, order_id INTEGER NOT NULL, "
+                          "menu_item_id INTEGER NOT NULL, quantity INTEGER NOT NULL)"))
+        conn.execute(text("INSERT INTO menu_items VALUES (1, 'Nasi Goreng', 3.5, 'Food', 1, NULL)"))
+        conn.execute(text("INSERT INTO orders VALUES (1, NULL, 4, 'Ready', '2025-01-01 12:00:00.000000'), "
+                          "(2, NULL, 5, 'Ready', '2025-01-01 13:00:00.000000')"))
+        conn.execute(text("INSERT INTO order_items VALUES (1, 1, 1, 2), (2, 1, 99, 1), (3, 2, 1, 1)"))
+    Base.metadata.create_all(bind=engine)
+
+    assert add_order_totals(engine, chunk=1) == 2
+    assert add_order_totals(engine, chunk=1) == 0  # idempotent
+
+    assert "unit_price" in {c["name"] for c in inspect(engine).get_columns("order_items")}
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT id, total, item_count FROM orders ORDER BY id")).all() == [
+            (1, 7.0, 3), (2, 3.5, 1),
+        ]
+        assert conn.execute(text("SELECT unit_price FROM order_items ORDER BY id")).scalars().all() == [3.5, 0.0, 3.5]
+
+
+def test_unique_item_names_skips_tables_with_duplicates(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE menu_items (id INTEGER PRIMARY KEY, name VARCHAR NOT NULL)"))
+        conn.execute(text("CREATE INDEX ix_menu_items_name ON menu_items (name)"))
+        conn.execute(text("CREATE TABLE inventory_items (id INTEGER PRIMARY KEY, name VARCHAR NOT NULL)"))
+        conn.execute(text("CREATE INDEX ix_inventory_items_name ON inventory_items (name)"))
+        conn.execute(text("INSERT INTO menu_items (name) VALUES ('Es Teh'), ('Kopi')"))
+        conn.execute(text("INSERT INTO inventory_items (name) VALUES ('Rice'), ('Rice')"))
+
+    branch_scoping(engine)
+    unique_item_names(engine)
+
+    unique = {table: {ix["name"]: ix["unique"] for ix in inspect(engine).get_indexes(table)}
+              for table in ("menu_items", "inventory_items")}
+    assert unique["menu_items"]["ix_menu_items_branch_name"]
+    assert "ix_menu_items_name" not in unique["menu_items"]
+    assert not unique["inventory_items"]["ix_inventory_items_name"]
+    assert "ix_inventory_items_branch_name" not in unique["inventory_items"]
+
+
+def test_order_lifecycle_adds_stamps_and_active_index(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE orders (id INTEGER PRIMARY KEY, customer_name VARCHAR, "
+                          "table_number INTEGER, status VARCHAR NOT NULL, timestamp DATETIME, "
+                          "total FLOAT, item_count INTEGER)"))
+        conn.execute(text("INSERT INTO orders VALUES (1, NULL, 4, 'Ready', '2025-01-01 12:00:00.000000', 7.0, 2)"))
+
+    order_lifecycle(engine)
+    order_lifecycle(engine)  # idempotent
+    branch_scoping(engine)
+
+    columns = {c["name"] for c in inspect(engine).get_columns("orders")}
+    assert {"in_kitchen_at", "ready_at", "served_at", "cancelled_at"} <= columns
+    assert "ix_orders_active_timestamp_id" in {ix["name"] for ix in inspect(engine).get_indexes("orders")}
+
+
+def test_change_versions_backfill_existing_rows(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE menu_items (id INTEGER PRIMARY KEY, name VARCHAR NOT NULL, "
+                          "branch_id INTEGER NOT NULL DEFAULT 1)"))
+        conn.execute(text("CREATE TABLE inventory_items (id INTEGER PRIMARY KEY, name VARCHAR NOT NULL, "
+                          "branch_id INTEGER NOT NULL DEFAULT 1)"))
+        conn.execute(text("INSERT INTO menu_items (id, name, branch_id) VALUES (3, 'Es Teh', 1), (7, 'Kopi', 2)"))
+    Base.metadata.create_all(bind=engine)
+
+    change_versions(engine)
+    change_versions(engine)  # idempotent
+
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT id, version FROM menu_items ORDER BY id")).all() == [(3, 3), (7, 7)]
+        assert conn.execute(text("SELECT branch_id, feed, version FROM change_counters ORDER BY branch_id")).all() == [
+            (1, "menu_items", 3), (2, "menu_items", 7),
+        ]
+
+
+def test_autoincrement_order_ids_moves_past_the_archive(tmp_path):
+    url = f"sqlite:///{tmp_path / 'old.db'}"
+    engine = configure_engine(create_engine(url, **engine_options(url)))  # foreign keys enforced
+    with engine.begin() as conn:
+        # plain integer keys, as created before AUTOINCREMENT
+        conn.execute(text("CREATE TABLE orders (id INTEGER PRIMARY KEY, branch_id INTEGER NOT NULL, "
+                          "customer_name VARCHAR, table_number INTEGER, status VARCHAR NOT NULL, "
+                          "timestamp DATETIME, in_kitchen_at DATETIME, ready_at DATETIME, served_at DATETIME, "
+                          "cancelled_at DATETIME, total FLOAT NOT NULL, item_count INTEGER NOT NULL)"))
+        conn.execute(text("CREATE INDEX ix_orders_timestamp_id ON orders (branch_id, timestamp, id)"))
+        conn.execute(text("CREATE TABLE order_items (id INTEGER PRIMARY KEY, "
+                          "order_id INTEGER NOT NULL REFERENCES orders (id), menu_item_id INTEGER NOT NULL, "
+                          "quantity INTEGER NOT NULL, unit_price FLOAT NOT NULL)"))
+        conn.execute(text("INSERT INTO orders (id, branch_id, status, total, item_count) VALUES (2, 1, 'Received', 1, 1)"))
+        conn.execute(text("INSERT INTO order_items VALUES (3, 2, 1, 1, 1.0)"))
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO orders_archive (id, branch_id, status, total, item_count) "
+                          "VALUES (1, 1, 'Served', 1, 1)"))
+        conn.execute(text("INSERT INTO order_items_archive VALUES (7, 1, 1, 1, 1.0)"))
+        conn.execute(text("INSERT INTO menu_items (id, branch_id, name, price, category, available, version) "
+                          "VALUES (1, 1, 'Es Teh', 1.0, 'Drink', 1, 1)"))
+
+    autoincrement_order_ids(engine)
+    autoincrement_order_ids(engine)  # idempotent
+
+    with engine.begin() as conn:
+        for table in ("orders", "order_items"):
+            assert "AUTOINCREMENT" in conn.scalar(text(f"SELECT sql FROM sqlite_master WHERE name = '{table}'"))
+        assert "orders_old" not in conn.scalar(text("SELECT sql FROM sqlite_master WHERE name = 'order_items'"))
+        assert "ix_orders_timestamp_id" in {ix["name"] for ix in inspect(conn).get_indexes("orders")}
+        assert conn.execute(text("SELECT id, order_id FROM order_items")).all() == [(3, 2)]
+        conn.execute(text("INSERT INTO order_items (order_id, menu_item_id, quantity, unit_price) VALUES (2, 1, 1, 1.0)"))
+        assert conn.scalar(text("SELECT max(id) FROM order_items")) == 8
+
+
+def test_low_stock_flag_backfills_existing_rows(engine, client):
+    with engine.begin() as conn:
+        # inventory_items as it was before the flag
+        conn.execute(text("DROP TABLE inventory_items"))
+        conn.execute(text("CREATE TABLE inventory_items (id INTEGER PRIMARY KEY, branch_id INTEGER NOT NULL, "
+                          "name VARCHAR NOT NULL, quantity FLOAT NOT NULL, unit VARCHAR NOT NULL, threshold FLOAT, "
+                          "version BIGINT NOT NULL DEFAULT 0)"))
+        conn.execute(text("INSERT INTO inventory_items (id, branch_id, name, quantity, unit, threshold) VALUES "
+                          "(1, 1, 'Rice', 2, 'kg', 5), (2, 1, 'Egg', 30, 'pcs', 10), (3, 1, 'Salt', 0, 'kg', NULL), "
+                          "(4, 2, 'Tea', 1, 'kg', 1)"))
+
+    low_stock_flag(engine)
+    low_stock_flag(engine)  # idempotent
+
+    assert "ix_inventory_items_low_stock" in {ix["name"] for ix in inspect(engine).get_indexes("inventory_items")}
+    assert [item["name"] for item in client.get("/inventory/low-stock").json()] == ["Rice"]
+    assert [item["name"] for item in client.get("/inventory/low-stock", headers={"X-Branch-ID": "2"}).json()] == ["Tea"]
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT id, low_stock FROM inventory_items ORDER BY id")).all() == [
+            (1, 1), (2, 0), (3, 0), (4, 1),
+        ]
@@ -3,7 +3,6 @@
 import pytest
 from sqlalchemy import create_engine, inspect
 from app.database import Base
-import app.models   # this loads all your model classes
 
 @pytest.fixture(scope="module")
 def engine():
@@ -15,6 +14,10 @@ def engine():
 
 def test_table_names(engine):
     inspector = inspect(engine)
-    tables = set(inspector.get_table_names())
-    expected = {"menu_items", "orders", "order_items", "inventory_items"}
+    # menu_search* are the FTS5 search index and its shadow tables
+    tables = {name for name in inspector.get_table_names() if not name.startswith("menu_search")}
+    expected = {"menu_items", "orders", "order_items", "inventory_items", "recipe_items",
+                "sales_rollups", "ticket_rollups", "idempotency_keys",
+                "orders_archive", "order_items_archive", "archive_progress", "change_counters", "tombstones",
+                "schema_version"}
     assert tables == expected, f"Tables {tables} != expected {expected}"
@@ -0,0 +1,62 @@
+# test_order_status.py
+
+import pytest
+from sqlalchemy import event
+
+import app.crud as crud
+import app.models as models
+import app.schemas as schemas
+
+
+@pytest.fixture
+def db(db):
+    db.add(models.MenuItem(id=1, name="Nasi Goreng", price=3.5, category="Food"))
+    db.commit()
+    return db
+
+
+def _place(db, count):
+    order = schemas.OrderCreate(items=[schemas.OrderItemCreate(menu_item_id=1, quantity=1)])
+    return [crud.create_order(db, order).id for _ in range(count)]
+
+
+def test_transitions_are_enforced_and_stamped(db):
+    order_id = _place(db, 1)[0]
+    with pytest.raises(crud.InvalidTransitionError) as exc:
+        crud.update_order_status(db, order_id, "Ready")
+    assert exc.value.allowed == ["In Kitchen", "Cancelled"]
+
+    for status in ("In Kitchen", "Ready", "Served"):
+        db_order = crud.update_order_status(db, order_id, status)
+    assert db_order.status == "Served"
+    assert db_order.timestamp <= db_order.in_kitchen_at <= db_order.ready_at <= db_order.served_at
+    assert db_order.cancelled_at is None
+    with pytest.raises(crud.InvalidTransitionError):
+        crud.update_order_status(db, order_id, "Cancelled")  # terminal
+
+
+def test_active_orders_read_the_partial_index(db):
+    received, cooking, served, cancelled = _place(db, 4)
+    crud.update_order_status(db, cooking, "In Kitchen")
+    for status in ("In Kitchen", "Ready", "Served"):
+        crud.update_order_status(db, served, status)
+    crud.update_order_status(db, cancelled, "Cancelled")
+    # history outweighing the active orders, as in any real branch: with a
+    # handful of rows the indexes cost the same and SQLite picks by the
+    # order they were created in
+    for order_id in _place(db, 20):
+        crud.update_order_status(db, order_id, "Cancelled")
+
+    plans = []
+    listener = lambda conn, cursor, statement, parameters, *args: plans.append((statement, parameters))
+    event.listen(db.get_bind(), "before_cursor_execute", listener)
+    assert [o.id for o in crud.get_active_orders(db)] == [received, cooking]
+    event.remove(db.get_bind(), "before_cursor_execute", listener)
+    assert [o.id for o in crud.get_active_orders(db, status="In Kitchen")] == [cooking]
+
+    # once ANALYZE has run, SQLite prefers the partial index over the status
+    # index plus a sort (without statistics either one is bounded by active orders)
+    db.connection().exec_driver_sql("ANALYZE")
+    statement, parameters = plans[0]
+    plan = db.connection().exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).all()
+    assert [row[-1] for row in plan] == ["SEARCH orders USING INDEX ix_orders_active_timestamp_id (branch_id=?)"]
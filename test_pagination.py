@@ -0,0 +1,68 @@
+# test_pagination.py
+
+from datetime import datetime, timedelta
+
+import pytest
+
+import app.models as models
+from app.pagination import NEXT_CURSOR_HEADER, encode_cursor
+
+START = datetime(2025, 3, 1, 12, 0)
+STATUSES = ("Received", "Served", "Cancelled")
+
+
+@pytest.fixture(autouse=True)
+def orders(db):
+    # 30 orders, three to a timestamp, so pages split ties on id
+    db.add_all(
+        models.Order(timestamp=START + timedelta(minutes=i // 3), status=STATUSES[i % 3], total=1.0, item_count=1)
+        for i in range(30)
+    )
+    db.commit()
+
+
+def _walk(client, **params):
+    """Every order the cursor chain visits, page by page."""
+    seen, pages, after = [], 0, None
+    while True:
+        response = client.get("/orders/", params={**params, "limit": 4, **({"after": after} if after else {})})
+        assert response.status_code == 200
+        seen += response.json()
+        pages += 1
+        after = response.headers.get(NEXT_CURSOR_HEADER)
+        if after is None:
+            return seen, pages
+
+
+def test_cursor_walk_returns_each_order_once(client):
+    orders, pages = _walk(client)
+    assert [order["id"] for order in orders] == list(range(1, 31))
+    assert pages == 8  # the last page is short, and carries no cursor
+
+
+def test_filters_narrow_the_walk(client):
+    served, _ = _walk(client, status="Served")
+    assert [order["id"] for order in served] == list(range(2, 31, 3))
+
+    # since inclusive, until exclusive: minutes 2 to 4
+    window, _ = _walk(client, since=(START + timedelta(minutes=2)).isoformat(),
+                      until=(START + timedelta(minutes=5)).isoformat())
+    assert [order["id"] for order in window] == list(range(7, 16))
+
+    both, _ = _walk(client, status="Cancelled", since=(START + timedelta(minutes=8)).isoformat())
+    assert [order["id"] for order in both] == [27, 30]
+
+
+@pytest.mark.parametrize("cursor", [
+    "not a cursor!",
+    encode_cursor([]),
+    encode_cursor(["2025-03-01T12:00:00"]),
+    encode_cursor(["yesterday", 3]),
+    encode_cursor(["2025-03-01T12:00:00", "three"]),
+    "eyJhIjoxfQ",  # {"a":1}
+])
+def test_malformed_cursor_is_400(client, cursor):
+    response = client.get("/orders/", params={"after": cursor})
+    assert response.status_code == 400 and response.json()["detail"] == "Invalid cursor"
+    for path in ("/menu/", "/inventory/"):
+        assert client.get(path, params={"after": cursor}).status_code == 400
@@ -0,0 +1,52 @@
+# test_projection.py
+
+from typing import List
+
+import pytest
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+import app.crud as crud
+import app.schemas as schemas
+from app.cache import menu_cache
+from benchmarks.seed import seed
+
+
+@pytest.fixture(autouse=True)
+def seeded(engine, Session):
+    seed(engine, menu_items=30, inventory_items=30, orders=120, lines_per_order=3)
+    with Session(info={"branch_id": 2}) as other:
+        crud.create_menu_item(other, schemas.MenuItemCreate(name="Dish 1", price=1.5, category="Food"))
+    menu_cache.invalidate()  # entries from other tests' databases
+
+
+def _as_response_model(schema, rows) -> bytes:
+    """What FastAPI renders for ``rows`` through response_model=List[schema]."""
+    validated = TypeAdapter(List[schema]).validate_python(rows, from_attributes=True)
+    return JSONResponse(jsonable_encoder(validated)).body
+
+
+@pytest.mark.parametrize("path, schema, load", [
+    ("/orders/?limit=50&status=Served", schemas.Order, lambda db: crud.get_orders(db, limit=50, status="Served")),
+    ("/menu/?limit=20", schemas.MenuItem, lambda db: crud.get_menu_items(db, limit=20)),
+    ("/inventory/?limit=20", schemas.InventoryItem, lambda db: crud.get_inventory_items(db, limit=20)),
+])
+def test_projected_lists_match_response_model(client, Session, path, schema, load):
+    response = client.get(path)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+    with Session(info={"branch_id": 1}) as db:
+        expected = load(db)
+        assert response.content == _as_response_model(schema, expected)
+
+    # the cursor pages on exactly as before
+    following = client.get(path + "&after=" + response.headers["X-Next-Cursor"]).json()
+    assert following and not {row["id"] for row in following} & {row["id"] for row in response.json()}
+
+
+def test_projected_orders_keep_lines_in_order(client):
+    orders = client.get("/orders/?limit=100").json()
+    assert all(len(order["items"]) == 3 for order in orders)
+    assert all([line["id"] for line in order["items"]] == sorted(line["id"] for line in order["items"]) for order in orders)
+    assert [item["branch_id"] for item in client.get("/menu/", headers={"X-Branch-ID": "2"}).json()] == [2]
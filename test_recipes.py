@@ -0,0 +1,37 @@
+# test_recipes.py
+
+
+def _setup(client):
+    dish = client.post("/menu/", json={"name": "Nasi Goreng", "price": 3.5, "category": "Food"}).json()
+    rice = client.post("/inventory/", json={"name": "Rice", "quantity": 10, "unit": "kg"}).json()
+    other = client.post(
+        "/inventory/", json={"name": "Rice", "quantity": 10, "unit": "kg"}, headers={"X-Branch-ID": "2"}
+    ).json()
+    return dish, rice, other
+
+
+def test_recipe_rejects_unknown_and_foreign_ingredients(client):
+    dish, rice, other = _setup(client)
+    for missing in (9999, other["id"]):
+        response = client.put(f"/menu/{dish['id']}/recipe", json=[
+            {"inventory_item_id": rice["id"], "quantity": 1}, {"inventory_item_id": missing, "quantity": 1},
+        ])
+        assert response.status_code == 422
+        assert response.json()["detail"]["inventory_item_ids"] == [missing]
+
+    # the dish still sells: the rejected recipe replaced nothing
+    order = client.post("/orders/", json={"items": [{"menu_item_id": dish["id"], "quantity": 1}]})
+    assert order.status_code == 201
+    assert client.get(f"/menu/{dish['id']}/recipe").json() == []
+
+
+def test_recipe_merges_repeated_ingredients(client):
+    dish, rice, _ = _setup(client)
+    response = client.put(f"/menu/{dish['id']}/recipe", json=[
+        {"inventory_item_id": rice["id"], "quantity": 1}, {"inventory_item_id": rice["id"], "quantity": 0.5},
+    ])
+    assert response.status_code == 200
+    assert [(line["inventory_item_id"], line["quantity"]) for line in response.json()] == [(rice["id"], 1.5)]
+
+    client.post("/orders/", json={"items": [{"menu_item_id": dish["id"], "quantity": 2}]})
+    assert client.get(f"/inventory/{rice['id']}").json()["quantity"] == 7
@@ -0,0 +1,103 @@
+# test_replicas.py
+
+import sqlite3
+from contextlib import closing
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app.database as database
+from app.database import Base, get_db, get_read_db, get_sync_db, get_sync_read_db
+from app.main import app
+from app.replicas import PIN_COOKIE, ReplicaSet, copy_sqlite, recent_writers
+
+
+@pytest.fixture
+def databases(tmp_path, monkeypatch):
+    """A primary with two SQLite replicas; the second one starts empty (no schema)."""
+    monkeypatch.setattr(database, "DB_MODE", "sync")
+    paths = [str(tmp_path / name) for name in ("primary.db", "replica1.db", "replica2.db")]
+    primary, *replicas = [database._open_shard(f"sqlite:///{path}") for path in paths]
+    Base.metadata.create_all(bind=primary.engine)
+    copy_sqlite(paths[0], paths[1])
+    primary = primary._replace(replicas=ReplicaSet(replicas))
+    recent_writers.clear()
+    yield primary, paths
+    for shard in [primary, *replicas]:
+        shard.engine.dispose()
+
+
+def _break(path):
+    """Make the replica fail its health check, which reads the orders table."""
+    with closing(sqlite3.connect(path)) as conn:
+        conn.execute("DROP TABLE orders")
+
+
+def test_round_robin_over_healthy_replicas(databases):
+    primary, paths = databases
+    first, second = primary.replicas.replicas
+    assert primary.replicas.check() == {first.url: True, second.url: False}
+    assert {primary.replicas.pick() for _ in range(4)} == {first}
+
+    copy_sqlite(paths[0], paths[2])
+    primary.replicas.check()
+    picks = [primary.replicas.pick() for _ in range(4)]
+    assert picks.count(first) == picks.count(second) == 2
+
+    _break(paths[1])
+    primary.replicas.check()
+    assert primary.replicas.healthy == (second,)
+
+
+def test_reads_follow_replicas_except_after_a_write(databases, monkeypatch):
+    primary, paths = databases
+    primary.replicas.check()
+    monkeypatch.setattr(database, "default_shard", primary)
+    app.dependency_overrides.update({get_db: get_sync_db, get_read_db: get_sync_read_db})
+    try:
+        writer, reader = TestClient(app, client=("10.0.0.1", 50000)), TestClient(app, client=("10.0.0.2", 50000))
+        item = {"name": "Rice", "quantity": 5, "unit": "kg", "threshold": 1}
+        created = writer.post("/inventory/", json=item)
+        assert PIN_COOKIE in created.cookies
+
+        # the writer reads its own write from the primary; others see the replica
+        assert writer.get("/inventory/").json() == [created.json()]
+        assert reader.get("/inventory/").json() == []
+        copy_sqlite(paths[0], paths[1])
+        assert reader.get("/inventory/").json() == [created.json()]
+
+        # once the pin expires, the writer reads from the replica too
+        writer.put(f"/inventory/{created.json()['id']}", json={**item, "quantity": 7})
+        assert writer.get("/inventory/").json()[0]["quantity"] == 7
+        writer.cookies.set(PIN_COOKIE, "0")
+        recent_writers.clear()
+        assert writer.get("/inventory/").json()[0]["quantity"] == 5
+
+        # with no healthy replica, reads go to the primary
+        _break(paths[1])
+        primary.replicas.check()
+        assert reader.get("/inventory/").json()[0]["quantity"] == 7
+    finally:
+        app.dependency_overrides.clear()
+
+
+def test_clients_without_cookies_read_their_writes(databases, monkeypatch):
+    primary, paths = databases
+    primary.replicas.check()
+    monkeypatch.setattr(database, "default_shard", primary)
+    app.dependency_overrides.update({get_db: get_sync_db, get_read_db: get_sync_read_db})
+    try:
+        # the Telegram bot, or a script: the cookie comes back, and is dropped
+        bot, other = TestClient(app, client=("10.0.0.3", 50000)), TestClient(app, client=("10.0.0.4", 50000))
+        created = bot.post("/inventory/", json={"name": "Rice", "quantity": 5, "unit": "kg"})
+        bot.cookies.clear()
+
+        # recognised by its address, the bot reads from the primary
+        assert bot.get("/inventory/").json() == [created.json()]
+        assert other.get("/inventory/").json() == []
+
+        # until the pin runs out
+        monkeypatch.setattr(recent_writers, "_until", {"10.0.0.3": 0.0})
+        assert bot.get("/inventory/").json() == []
+    finally:
+        app.dependency_overrides.clear()
@@ -0,0 +1,68 @@
+# test_search.py
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+import app.crud as crud
+import app.schemas as schemas
+from app.migrations import branch_scoping, change_versions, menu_search_index
+
+MENU = [
+    ("Nasi Goreng", "Food", "rice, egg, chili", True),
+    ("Mie Goreng", "Food", "noodles, egg", True),
+    ("Es Teh Manis", "Drink", "tea, sugar", True),
+    ("Kopi Susu", "Drink", "coffee, milk", False),
+]
+
+
+@pytest.fixture
+def db(db):
+    crud.upsert_menu_items(db, [
+        schemas.MenuItemCreate(name=name, price=2, category=category, ingredients=ingredients, available=available)
+        for name, category, ingredients, available in MENU
+    ])
+    return db
+
+
+def names(db, q, **filters):
+    return [item.name for item in crud.search_menu_items(db, q, **filters)]
+
+
+def test_prefix_typo_and_filters(db):
+    assert names(db, "nas gor") == ["Nasi Goreng"]
+    assert sorted(names(db, "egg")) == ["Mie Goreng", "Nasi Goreng"]
+    assert names(db, "gorneg nasu") == ["Nasi Goreng"]  # typos fall back to close terms
+    assert names(db, "drink", available=True) == ["Es Teh Manis"]
+    assert names(db, "goreng", category="Drink") == []
+    assert names(db, "xyzzy") == names(db, '"*)') == []
+
+
+def test_index_follows_writes(db):
+    nasi = crud.search_menu_items(db, "nasi")[0]
+    crud.update_menu_item(db, nasi.id, schemas.MenuItemCreate(name="Nasi Uduk", price=3, category="Food"))
+    assert names(db, "goreng") == ["Mie Goreng"]
+    assert names(db, "uduk") == ["Nasi Uduk"]
+
+    crud.delete_menu_item(db, nasi.id)
+    assert names(db, "nasi") == []
+
+    crud.upsert_menu_items(db, [schemas.MenuItemCreate(name="Mie Goreng", price=3, category="Noodles")])
+    assert names(db, "noodles") == ["Mie Goreng"]
+
+
+def test_menu_search_index_builds_for_existing_rows(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE menu_items (id INTEGER PRIMARY KEY, name VARCHAR NOT NULL, "
+                          "price FLOAT NOT NULL, category VARCHAR NOT NULL, available BOOLEAN NOT NULL, "
+                          "ingredients VARCHAR)"))
+        conn.execute(text("INSERT INTO menu_items VALUES (1, 'Nasi Goreng', 3.5, 'Food', 1, NULL)"))
+
+    branch_scoping(engine)
+    change_versions(engine)
+    menu_search_index(engine)
+    menu_search_index(engine)  # idempotent
+
+    with sessionmaker(bind=engine)() as db:
+        assert names(db, "goreng") == ["Nasi Goreng"]
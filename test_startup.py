@@ -0,0 +1,87 @@
+# test_startup.py
+
+import sys
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+import app.database as database
+from app.main import create_app
+from app.migrations import SCHEMA_VERSION, SchemaVersionError, check_schema, migrate, schema_version
+
+
+def _shard(tmp_path, monkeypatch, name):
+    """Make a new database at tmp_path/name the app's only shard; returns its engine."""
+    url = f"sqlite:///{tmp_path / name}"
+    shard = database._open_shard(url)
+    monkeypatch.setattr(database, "DB_MODE", "sync")
+    monkeypatch.setattr(database, "default_shard", shard)
+    monkeypatch.setattr(database, "_shards", {url: shard})
+    return shard.engine
+
+
+def test_boot_checks_the_schema_without_changing_it(tmp_path, monkeypatch):
+    engine = _shard(tmp_path, monkeypatch, "boot.db")
+
+    with pytest.raises(SchemaVersionError, match="python -m app.migrations"):
+        with TestClient(create_app()):
+            pass
+    assert schema_version(engine) == 0  # the failed boot created nothing
+
+    assert migrate(engine) == SCHEMA_VERSION == check_schema(engine)
+    assert migrate(engine) == SCHEMA_VERSION  # nothing left to run
+    with TestClient(create_app()) as client:
+        client.app.dependency_overrides[database.get_db] = database.get_sync_db
+        assert client.get("/menu/").json() == []
+    engine.dispose()
+
+
+def test_older_databases_run_the_pending_steps(tmp_path, monkeypatch):
+    engine = _shard(tmp_path, monkeypatch, "old.db")
+    with engine.begin() as conn:
+        # the tables as the first release created them, before versioning
+        conn.execute(text("CREATE TABLE menu_items (id INTEGER PRIMARY KEY, name VARCHAR NOT NULL, "
+                          "price FLOAT NOT NULL, category VARCHAR NOT NULL, available BOOLEAN NOT NULL, "
+                          "ingredients VARCHAR)"))
+        conn.execute(text("CREATE TABLE orders (id INTEGER PRIMARY KEY, customer_name VARCHAR, "
+                          "table_number INTEGER, status VARCHAR NOT NULL, timestamp DATETIME)"))
+        conn.execute(text("CREATE TABLE order_items (id INTEGER PRIMARY KEY, "
+                          "order_id INTEGER NOT NULL REFERENCES orders (id), "
+                          "menu_item_id INTEGER NOT NULL REFERENCES menu_items (id), quantity INTEGER NOT NULL)"))
+        conn.execute(text("CREATE TABLE inventory_items (id INTEGER PRIMARY KEY, name VARCHAR NOT NULL, "
+                          "quantity FLOAT NOT NULL, unit VARCHAR NOT NULL, threshold FLOAT)"))
+        for table in ("menu_items", "inventory_items"):
+            conn.execute(text(f"CREATE INDEX ix_{table}_name ON {table} (name)"))
+        conn.execute(text("INSERT INTO menu_items VALUES (1, 'Nasi Goreng', 3.5, 'Food', 1, NULL)"))
+        conn.execute(text("INSERT INTO orders VALUES (1, NULL, 4, 'Received', '2025-01-01 12:00:00.000000')"))
+        conn.execute(text("INSERT INTO order_items VALUES (1, 1, 1, 2)"))
+        conn.execute(text("INSERT INTO inventory_items VALUES (1, 'Rice', 2, 'kg', 5), (2, 'Egg', 30, 'pcs', 10)"))
+
+    with pytest.raises(SchemaVersionError):
+        check_schema(engine)
+    assert migrate(engine) == SCHEMA_VERSION
+
+    with TestClient(create_app()) as client:
+        client.app.dependency_overrides[database.get_db] = database.get_sync_db
+        client.app.dependency_overrides[database.get_read_db] = database.get_sync_read_db
+        assert [item["name"] for item in client.get("/inventory/").json()] == ["Rice", "Egg"]
+        assert [item["name"] for item in client.get("/inventory/low-stock").json()] == ["Rice"]
+        egg = client.put("/inventory/2", json={"name": "Egg", "quantity": 4, "unit": "pcs"})
+        assert egg.status_code == 200 and egg.json()["threshold"] == 10
+        assert [item["name"] for item in client.get("/inventory/low-stock").json()] == ["Rice", "Egg"]
+        assert client.get("/orders/1").json()["total"] == 7.0
+    engine.dispose()
+
+
+def test_alerts_module_has_no_import_side_effects(monkeypatch):
+    monkeypatch.delenv("TELEGRAM_TOKEN", raising=False)
+    monkeypatch.delenv("TELEGRAM_CHAT_ID", raising=False)
+    monkeypatch.delitem(sys.modules, "app.telegram_bot", raising=False)
+    import app.telegram_bot as telegram_bot
+
+    assert "telegram" not in sys.modules
+    telegram_bot.telegram_settings.cache_clear()
+    monkeypatch.setattr(telegram_bot, "load_dotenv", lambda: None)
+    with pytest.raises(ValueError):
+        telegram_bot.build_dispatcher()